@@ -0,0 +1,11 @@
+from interfaces.batch import main
+from utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception as e:
+        logger.error(f"Batch run error: {str(e)}")
+        raise
@@ -0,0 +1,71 @@
+"""Compare per-request chain construction with the prepared chains.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_chain_setup
+"""
+import os
+import tempfile
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from langchain.chains import create_sql_query_chain
+from langchain_community.utilities import SQLDatabase
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+
+from config.settings import settings
+from core.document_store.vectorstore import RAG_PROMPT
+from core.sql.handler import SQL_PROMPT, SQLHandler
+from .fixtures import create_sample_chinook
+
+ITERATIONS = 200
+
+def _timeit(fn, iterations: int = ITERATIONS) -> float:
+    fn()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1000
+
+def main() -> None:
+    llm = FakeListChatModel(responses=["SELECT Name FROM Artist LIMIT 5;"])
+    context = "lorem ipsum " * 200
+
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.database_path = create_sample_chinook(os.path.join(tmp, "chinook.db"))
+        db = SQLDatabase.from_uri(settings.get_database_uri())
+
+        def sql_per_request():
+            prompt = ChatPromptTemplate.from_messages(SQL_PROMPT.messages)
+            chain = create_sql_query_chain(llm, db, prompt, k=settings.sql_top_k)
+            return chain.invoke({"question": "List five artists"})
+
+        handler = SQLHandler()
+        handler.llm = llm
+
+        def sql_prepared():
+            return handler.write_query.invoke({"question": "List five artists"})
+
+        def rag_per_request():
+            prompt = ChatPromptTemplate.from_template(RAG_PROMPT.messages[0].prompt.template)
+            chain = prompt | llm | StrOutputParser()
+            return chain.invoke({"context": context, "question": "What is attention?"})
+
+        rag_chain = RAG_PROMPT | llm | StrOutputParser()
+
+        def rag_prepared():
+            return rag_chain.invoke({"context": context, "question": "What is attention?"})
+
+        print(f"{'chain':<6} {'per-request (ms)':>18} {'prepared (ms)':>15} {'speedup':>8}")
+        for name, before, after in (
+            ("sql", sql_per_request, sql_prepared),
+            ("rag", rag_per_request, rag_prepared),
+        ):
+            before_ms, after_ms = _timeit(before), _timeit(after)
+            print(f"{name:<6} {before_ms:>18.3f} {after_ms:>15.3f} {before_ms / after_ms:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Compare raw and packed RAG context for the labelled questions.
+
+Reports prompt-context tokens before and after packing, and how often the
+answer phrase survives in each. With ``--llm`` (needs ``OPENAI_API_KEY``)
+it also times the RAG chain on both contexts.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_context [--llm]
+"""
+import argparse
+import os
+import statistics
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from .bench_retrieval import LABELLED_QUERIES, normalize
+from .fixtures import temporary_document_store
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--llm", action="store_true", help="also time the RAG chain on both contexts")
+    args = parser.parse_args()
+
+    with temporary_document_store() as handler:
+        rows = []
+        for question, phrase in LABELLED_QUERIES:
+            docs = handler.retriever.invoke(question)
+            raw = handler._docs_to_string(docs)
+            start = time.perf_counter()
+            packed = handler.context_packer.pack(question, docs)
+            pack_ms = (time.perf_counter() - start) * 1000
+            row = {
+                "before": packed.tokens_before,
+                "after": packed.tokens_after,
+                "pack_ms": pack_ms,
+                "raw_hit": normalize(phrase) in normalize(raw),
+                "packed_hit": normalize(phrase) in normalize(packed.text),
+            }
+            if args.llm:
+                for name, context in (("raw", raw), ("packed", packed.text)):
+                    start = time.perf_counter()
+                    handler.rag_chain.invoke({"context": context, "question": question})
+                    row[f"{name}_llm_ms"] = (time.perf_counter() - start) * 1000
+            rows.append(row)
+
+    def mean(key):
+        return statistics.mean(row[key] for row in rows)
+
+    print(f"{len(rows)} questions, context budget {handler.context_packer.max_tokens} tokens")
+    print(f"context tokens: {mean('before'):.0f} -> {mean('after'):.0f} "
+          f"({1 - mean('after') / mean('before'):.0%} fewer), packing {mean('pack_ms'):.1f} ms")
+    print(f"answer phrase kept: raw {mean('raw_hit'):.0%}, packed {mean('packed_hit'):.0%}")
+    if args.llm:
+        print(f"LLM latency: raw {mean('raw_llm_ms'):.0f} ms, packed {mean('packed_llm_ms'):.0f} ms")
+
+if __name__ == "__main__":
+    main()
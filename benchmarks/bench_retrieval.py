@@ -0,0 +1,91 @@
+"""Measure retrieval recall@k over the bundled documents.
+
+Each labelled question has an answer phrase; a question counts as recalled
+at k when one of the top k chunks contains that phrase. The documents in
+``documents_path`` are ingested into a temporary vector store and BM25
+index.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_retrieval [--rerank] [--k 1 2 4 8]
+"""
+import argparse
+import os
+import re
+import time
+from typing import Dict, List, Tuple
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from config.settings import settings
+from .fixtures import temporary_document_store
+
+# (question, phrase from the chunk that answers it)
+LABELLED_QUERIES: List[Tuple[str, str]] = [
+    ("Which optimizer and betas were used to train the Transformer?", "β2 = 0.98"),
+    ("How many warmup steps did the learning rate schedule use?", "warmup_steps = 4000"),
+    ("What label smoothing value was used during training?", "label smoothing of value"),
+    ("How long did the big model take to train and on what hardware?", "3.5 days on 8 P100 GPUs"),
+    ("What BLEU score did the Transformer get on English-to-French?", "BLEU score of 41.0"),
+    ("Which beam size and length penalty were used for translation?", "beam size of 4 and length penalty"),
+    ("How are positional encodings computed?", "wavelengths form a geometric progression"),
+    ("How large was the English-German training set?", "about 4.5 million"),
+    ("What is the dimension of each attention head?", "dk = dv = dmodel/h = 64"),
+    ("How did learned positional embeddings compare to sinusoids?", "learned positional embeddings [9], and observe nearly identical"),
+    ("How does Mantis hide the injected prompt from the human operator?", "ANSI escape sequences and HTML comment tags"),
+    ("How effective was Mantis against automated attacks?", "over 95% effectiveness"),
+    ("What is the agent-tarpit passive defense?", "Passive Defense (agent-tarpit)"),
+    ("Which decoy is vulnerable to SQL injection?", "plain SQL injection induced by"),
+    ("Which CTF machine from HackTheBox was used in the experiments?", "CTF Dancing"),
+    ("Why do decoys need to emulate frequently targeted services?", "Decoy Instantiations"),
+]
+
+def normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", text.replace("-\n", "")).strip().lower()
+
+def recall_at_k(retrieve, ks: List[int]) -> Tuple[Dict[int, float], float]:
+    hits = {k: 0 for k in ks}
+    start = time.perf_counter()
+    for question, phrase in LABELLED_QUERIES:
+        docs = retrieve(question, max(ks))
+        ranks = [i for i, doc in enumerate(docs) if normalize(phrase) in normalize(doc.page_content)]
+        for k in ks:
+            hits[k] += bool(ranks and ranks[0] < k)
+    latency = (time.perf_counter() - start) / len(LABELLED_QUERIES) * 1000
+    return {k: hits[k] / len(LABELLED_QUERIES) for k in ks}, latency
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--fetch-k", type=int, default=settings.retriever_fetch_k)
+    parser.add_argument("--rerank", action="store_true", help="also evaluate cross-encoder reranking")
+    args = parser.parse_args()
+
+    from core.document_store.retrieval import CrossEncoderReranker, HybridRetriever
+
+    with temporary_document_store() as handler:
+        def hybrid(reranker=None):
+            def retrieve(question, k):
+                retriever = HybridRetriever(
+                    vectorstore=handler.vectorstore, bm25=handler.bm25,
+                    k=k, fetch_k=args.fetch_k, reranker=reranker,
+                )
+                return retriever.invoke(question)
+            return retrieve
+
+        methods = {
+            "vector": lambda question, k: handler.vectorstore.similarity_search(question, k=k),
+            "bm25": lambda question, k: [doc for doc, _ in handler.bm25.search(question, k)],
+            "hybrid (rrf)": hybrid(),
+        }
+        if args.rerank:
+            methods["hybrid + rerank"] = hybrid(CrossEncoderReranker())
+
+        print(f"{len(LABELLED_QUERIES)} questions over {handler.bm25.count()} chunks")
+        print(f"{'method':<18}" + "".join(f"{f'R@{k}':>8}" for k in args.k) + f"{'ms/query':>10}")
+        for name, retrieve in methods.items():
+            recalls, latency = recall_at_k(retrieve, args.k)
+            print(f"{name:<18}" + "".join(f"{recalls[k]:>8.2f}" for k in args.k) + f"{latency:>10.1f}")
+
+if __name__ == "__main__":
+    main()
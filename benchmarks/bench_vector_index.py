@@ -0,0 +1,90 @@
+"""Compare the Chroma and quantized vector backends on synthetic embeddings.
+
+Clustered unit vectors stand in for sentence embeddings. For each backend
+the script reports insert throughput, query latency, recall@k against an
+exact float32 search, and the memory the index needs per million vectors.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_vector_index [--vectors 100000] [--dim 384]
+"""
+import argparse
+import json
+import tempfile
+import time
+from typing import Dict, List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from config.settings import settings
+from core.document_store.backends import create_vectorstore
+
+class LookupEmbeddings(Embeddings):
+    """Returns the precomputed vector whose index is the text."""
+
+    def __init__(self, vectors: np.ndarray):
+        self.vectors = vectors
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.vectors[[int(text) for text in texts]].tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.vectors[int(text)].tolist()
+
+def clustered_vectors(centers: np.ndarray, count: int, rng: np.random.Generator) -> np.ndarray:
+    vectors = centers[rng.integers(0, len(centers), count)] + 0.7 * rng.normal(size=(count, centers.shape[1]))
+    vectors = vectors.astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def bench_backend(backend: str, vectors: np.ndarray, queries: np.ndarray, k: int, batch_size: int = 1000) -> Dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.vector_store_path = tmp
+        store = create_vectorstore(LookupEmbeddings(vectors), backend)
+        start = time.perf_counter()
+        for offset in range(0, len(vectors), batch_size):
+            ids = [str(i) for i in range(offset, min(offset + batch_size, len(vectors)))]
+            store.add_texts(ids, ids=ids)
+        add_seconds = time.perf_counter() - start
+
+        exact = np.argsort(-(queries @ vectors.T), axis=1)[:, :k]
+        latencies, hits = [], 0
+        for query, truth in zip(queries, exact):
+            start = time.perf_counter()
+            docs = store.similarity_search_by_vector(query.tolist(), k=k)
+            latencies.append((time.perf_counter() - start) * 1000)
+            hits += len({int(doc.id) for doc in docs} & set(truth.tolist()))
+        return {
+            "add_vectors_per_second": len(vectors) / add_seconds,
+            "query_p50_ms": float(np.percentile(latencies, 50)),
+            "query_p95_ms": float(np.percentile(latencies, 95)),
+            f"recall_at_{k}": hits / (len(queries) * k),
+            "resident_mb_per_million": store.memory_stats()["resident_mb_per_million"],
+        }
+
+def run(count: int, dim: int, queries: int = 200, k: int = 10, backends: List[str] = ("chroma", "quantized")) -> Dict:
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(max(8, count // 500), dim))
+    vectors = clustered_vectors(centers, count, rng)
+    probes = clustered_vectors(centers, queries, rng)
+    original_path = settings.vector_store_path
+    try:
+        return {backend: bench_backend(backend, vectors, probes, k) for backend in backends}
+    finally:
+        settings.vector_store_path = original_path
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--vectors", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--backend", action="append", choices=["chroma", "quantized"])
+    args = parser.parse_args()
+
+    results = run(args.vectors, args.dim, args.queries, args.k, args.backend or ["chroma", "quantized"])
+    print(f"{args.vectors} vectors of dimension {args.dim}, {args.queries} queries")
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import os
+import random
+import sqlite3
+from contextlib import contextmanager
+
+from config.settings import settings
+
+GENRES = ["Rock", "Jazz", "Metal", "Pop", "Blues", "Latin", "Classical", "Alternative"]
+COUNTRIES = ["USA", "Canada", "Brazil", "France", "Germany", "United Kingdom", "India", "Portugal"]
+
+def create_sample_chinook(path: str, artists: int = 50, invoices: int = 400, seed: int = 7) -> str:
+    """Create a small database with the Chinook tables the agents query most."""
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE Artist (ArtistId INTEGER PRIMARY KEY, Name NVARCHAR(120));
+        CREATE TABLE Album (AlbumId INTEGER PRIMARY KEY, Title NVARCHAR(160) NOT NULL,
+            ArtistId INTEGER NOT NULL REFERENCES Artist (ArtistId));
+        CREATE TABLE Genre (GenreId INTEGER PRIMARY KEY, Name NVARCHAR(120));
+        CREATE TABLE Track (TrackId INTEGER PRIMARY KEY, Name NVARCHAR(200) NOT NULL,
+            AlbumId INTEGER REFERENCES Album (AlbumId), GenreId INTEGER REFERENCES Genre (GenreId),
+            Milliseconds INTEGER NOT NULL, UnitPrice NUMERIC(10,2) NOT NULL);
+        CREATE TABLE Customer (CustomerId INTEGER PRIMARY KEY, FirstName NVARCHAR(40) NOT NULL,
+            LastName NVARCHAR(20) NOT NULL, Country NVARCHAR(40));
+        CREATE TABLE Invoice (InvoiceId INTEGER PRIMARY KEY,
+            CustomerId INTEGER NOT NULL REFERENCES Customer (CustomerId),
+            InvoiceDate DATETIME NOT NULL, BillingCountry NVARCHAR(40), Total NUMERIC(10,2) NOT NULL);
+        CREATE TABLE InvoiceLine (InvoiceLineId INTEGER PRIMARY KEY,
+            InvoiceId INTEGER NOT NULL REFERENCES Invoice (InvoiceId),
+            TrackId INTEGER NOT NULL REFERENCES Track (TrackId),
+            UnitPrice NUMERIC(10,2) NOT NULL, Quantity INTEGER NOT NULL);
+    """)
+    conn.executemany("INSERT INTO Genre VALUES (?, ?)", list(enumerate(GENRES, 1)))
+    conn.executemany(
+        "INSERT INTO Artist VALUES (?, ?)",
+        [(i, "AC/DC" if i == 1 else "Queen" if i == 2 else f"Artist {i}") for i in range(1, artists + 1)],
+    )
+    albums, tracks = [], []
+    for artist_id in range(1, artists + 1):
+        for _ in range(rng.randint(1, 4)):
+            album_id = len(albums) + 1
+            albums.append((album_id, f"Album {album_id}", artist_id))
+            for _ in range(rng.randint(5, 12)):
+                tracks.append((
+                    len(tracks) + 1, f"Track {len(tracks) + 1}", album_id,
+                    rng.randint(1, len(GENRES)), rng.randint(120000, 420000), 0.99,
+                ))
+    conn.executemany("INSERT INTO Album VALUES (?, ?, ?)", albums)
+    conn.executemany("INSERT INTO Track VALUES (?, ?, ?, ?, ?, ?)", tracks)
+    customers = [(i, f"First{i}", f"Last{i}", rng.choice(COUNTRIES)) for i in range(1, 60)]
+    conn.executemany("INSERT INTO Customer VALUES (?, ?, ?, ?)", customers)
+    lines = []
+    for invoice_id in range(1, invoices + 1):
+        customer = rng.choice(customers)
+        items = rng.sample(tracks, rng.randint(1, 8))
+        for track in items:
+            lines.append((len(lines) + 1, invoice_id, track[0], 0.99, 1))
+        conn.execute(
+            "INSERT INTO Invoice VALUES (?, ?, ?, ?, ?)",
+            (invoice_id, customer[0], f"20{rng.randint(21, 25)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} 00:00:00",
+             customer[3], round(0.99 * len(items), 2)),
+        )
+    conn.executemany("INSERT INTO InvoiceLine VALUES (?, ?, ?, ?, ?)", lines)
+    conn.commit()
+    conn.close()
+    return path
+
+@contextmanager
+def temporary_document_store(retriever_mode: str = "hybrid", vector_backend: str = "chroma"):
+    """Ingest ``documents_path`` into a throwaway vector store and BM25 index.
+
+    Only the embedding cache is shared with the application.
+    """
+    import tempfile
+
+    from core.document_store.vectorstore import VectorStoreHandler
+
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.vector_store_path = os.path.join(tmp, "chroma")
+        settings.ingestion_manifest_path = os.path.join(tmp, "manifest.json")
+        settings.bm25_index_path = os.path.join(tmp, "bm25.sqlite")
+        settings.retriever_mode = retriever_mode
+        settings.vector_backend = vector_backend
+        handler = VectorStoreHandler()
+        handler.initialize_vectorstore()
+        yield handler
@@ -0,0 +1,360 @@
+"""Offline end-to-end benchmark suite with deterministic model stand-ins.
+
+The fake chat model, OpenAI client and hashing embeddings from
+``core.models.fake`` replace the real providers, so every run sees the same
+prompts, tool calls and SQL and results can be compared between commits.
+Covers CLI startup time, ingestion throughput, retrieval latency, the SQL
+path and its summary tables, routing overhead, the cost of a multi-turn
+session, fan-out for questions that need both sources and both vector
+backends on synthetic embeddings, plus the per-stage timings recorded by
+``utils.metrics`` along the way. ``--latency-ms`` adds a simulated model
+delay to each completion.
+
+Run from the repository root:
+
+    python -m benchmarks.run_benchmarks [--output results.json] [--compare previous.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from config.settings import settings
+from . import bench_vector_index
+from .bench_retrieval import LABELLED_QUERIES, normalize
+from .fixtures import create_sample_chinook, temporary_document_store
+
+SUITE_VERSION = 1
+
+SQL_QUESTIONS = [
+    "What are the total sales by billing country?",
+    "Which artists have the most albums?",
+    "How many tracks are there per genre?",
+    "How many customers are in each country?",
+    "What was the invoice revenue per year?",
+]
+
+MIXED_QUESTIONS = [
+    "Which artists in the database relate to topics from the attention paper?",
+    "How many tracks are there per genre, and what BLEU score did the Transformer get?",
+    "Compare total sales by country with the training hardware described in the paper.",
+]
+
+ROUTING_QUERIES = [question for question, _ in LABELLED_QUERIES[:6]] + SQL_QUESTIONS + [
+    "Hello, what can you do?",
+    "Thanks, that helps.",
+]
+
+SESSION_TURNS = [
+    "What are the total sales by billing country?",
+    "How are positional encodings computed?",
+    "Which artists have the most albums?",
+    "What BLEU score did the Transformer get on English-to-French?",
+    "How many customers are in each country?",
+    "How does Mantis hide the injected prompt from the human operator?",
+]
+
+def latency_stats(samples: List[float]) -> Dict[str, float]:
+    """Summarize durations in seconds as milliseconds."""
+    ordered = sorted(samples)
+    return {
+        "n": len(ordered),
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "p50_ms": ordered[len(ordered) // 2] * 1000,
+        "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+        "min_ms": ordered[0] * 1000,
+    }
+
+def _timed(fn: Callable, inputs: List, repeat: int) -> List[float]:
+    samples = []
+    for _ in range(repeat):
+        for item in inputs:
+            start = time.perf_counter()
+            fn(item)
+            samples.append(time.perf_counter() - start)
+    return samples
+
+def configure(tmp: str, latency_ms: float) -> None:
+    """Point every provider and file at fakes and a scratch directory."""
+    settings.model_provider = "fake"
+    settings.embedding_provider = "fake"
+    settings.fake_latency_ms = latency_ms
+    settings.embedding_cache_path = os.path.join(tmp, "embedding_cache")
+    settings.sql_cache_path = os.path.join(tmp, "sql_cache.db")
+    settings.sql_local_copy_path = os.path.join(tmp, "chinook.indexed.db")
+    settings.sql_materialize_path = os.path.join(tmp, "chinook.aggregates.db")
+    settings.session_store = "memory"
+    settings.memory_summarize = False
+    settings.database_path = create_sample_chinook(os.path.join(tmp, "chinook.db"))
+
+# Runs in a fresh interpreter so imports are timed too.
+STARTUP_SCRIPT = """
+import json, time
+start = time.perf_counter()
+from interfaces.cli import SwarmCLI
+cli = SwarmCLI()
+prompt = time.perf_counter() - start
+cli.warmup()
+print(json.dumps({"prompt_s": prompt, "ready_s": time.perf_counter() - start}))
+"""
+
+def bench_startup(tmp: str, repeat: int) -> Dict:
+    """Seconds until the CLI prompt appears and until every model and store is loaded."""
+    results = {}
+    for label, lazy in (("lazy", True), ("eager", False)):
+        runs = []
+        for run in range(repeat):
+            store = os.path.join(tmp, f"startup-{label}-{run}")
+            env = {
+                **os.environ,
+                "LAZY_INIT": str(lazy).lower(),
+                "MODEL_PROVIDER": settings.model_provider,
+                "EMBEDDING_PROVIDER": settings.embedding_provider,
+                "DATABASE_PATH": settings.database_path,
+                "VECTOR_STORE_PATH": os.path.join(store, "chroma"),
+                "INGESTION_MANIFEST_PATH": os.path.join(store, "manifest.json"),
+                "BM25_INDEX_PATH": os.path.join(store, "bm25.sqlite"),
+                "EMBEDDING_CACHE_PATH": settings.embedding_cache_path,
+                "SQL_CACHE_PATH": settings.sql_cache_path,
+                "SQL_LOCAL_COPY_PATH": settings.sql_local_copy_path,
+                "SQL_MATERIALIZE_PATH": settings.sql_materialize_path,
+            }
+            output = subprocess.run(
+                [sys.executable, "-c", STARTUP_SCRIPT], env=env, capture_output=True, text=True, check=True
+            ).stdout
+            runs.append(json.loads(output.strip().splitlines()[-1]))
+        results[label] = {
+            "prompt_ms": statistics.fmean(run["prompt_s"] for run in runs) * 1000,
+            "ready_ms": statistics.fmean(run["ready_s"] for run in runs) * 1000,
+        }
+    return results
+
+def bench_retrieval(handler, repeat: int) -> Dict:
+    questions = [question for question, _ in LABELLED_QUERIES]
+    samples = _timed(handler.retriever.invoke, questions, repeat)
+    hits = sum(
+        any(normalize(phrase) in normalize(doc.page_content) for doc in handler.retriever.invoke(question))
+        for question, phrase in LABELLED_QUERIES
+    )
+    return {**latency_stats(samples), "recall": hits / len(LABELLED_QUERIES)}
+
+def bench_sql(repeat: int) -> Dict:
+    from core.sql.handler import SQLHandler
+
+    results = {}
+    # Summary tables are measured separately by bench_materialized.
+    materialize_enabled, settings.sql_materialize_enabled = settings.sql_materialize_enabled, False
+    for label, cached in (("cold", False), ("cached", True)):
+        settings.sql_cache_enabled = cached
+        handler = SQLHandler()
+        if cached:
+            for question in SQL_QUESTIONS:
+                asyncio.run(handler.agenerate_response(question))
+        samples = _timed(lambda q: asyncio.run(handler.agenerate_response(q)), SQL_QUESTIONS, repeat)
+        results[label] = latency_stats(samples)
+    settings.sql_cache_enabled = True
+    settings.sql_materialize_enabled = materialize_enabled
+    return results
+
+def bench_materialized(tmp: str, repeat: int) -> Dict:
+    """Aggregate SQL against the source tables and against summary tables, plus refresh cost."""
+    import sqlite3
+
+    from core.models.fake import fake_sql
+    from core.sql.executor import SQLExecutor
+    from core.sql.materialize import AggregateMaterializer
+
+    path = create_sample_chinook(os.path.join(tmp, "chinook-large.db"), artists=300, invoices=20000)
+    materializer = AggregateMaterializer(path, os.path.join(tmp, "aggregates.db"), min_hits=1)
+    queries = [fake_sql(question) for question in SQL_QUESTIONS]
+    for query in queries:
+        materializer.record(query)
+    rewritten = {query: materializer.rewrite(query) for query in queries}
+    queries = [query for query in queries if rewritten[query]]
+
+    source = SQLExecutor(path)
+    results = {
+        "materialized": len(queries) / len(SQL_QUESTIONS),
+        "source": latency_stats(_timed(source.run, queries, repeat)),
+        "summary": latency_stats(_timed(lambda query: materializer.executor.run(rewritten[query]), queries, repeat)),
+    }
+
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        "INSERT INTO Invoice (CustomerId, InvoiceDate, BillingCountry, Total) VALUES (1, '2026-01-01 00:00:00', 'USA', ?)",
+        [(0.99 * i,) for i in range(1, 101)],
+    )
+    conn.commit()
+    conn.close()
+    for label, full in (("incremental", False), ("rebuild", True)):
+        start = time.perf_counter()
+        materializer.refresh(full=full)
+        results[f"refresh_{label}_ms"] = (time.perf_counter() - start) * 1000
+    return results
+
+def _run_session(service, turns: List[str]) -> Dict:
+    from utils.tokens import count_message_tokens
+
+    client = service.runner.swarm.client
+    samples, completions, prompt_tokens = [], [], []
+    for turn in turns:
+        before = len(client.requests)
+        start = time.perf_counter()
+        asyncio.run(service.runner.query("bench", turn))
+        samples.append(time.perf_counter() - start)
+        requests = client.requests[before:]
+        completions.append(len(requests))
+        prompt_tokens.append(sum(count_message_tokens(r["messages"]) for r in requests))
+    return {
+        **latency_stats(samples),
+        "completions_per_turn": statistics.fmean(completions),
+        "prompt_tokens_per_turn": prompt_tokens,
+        "prompt_tokens_total": sum(prompt_tokens),
+    }
+
+def bench_fanout() -> Dict:
+    """Mixed database and document questions, with and without the fan-out tool."""
+    from core.registry import registry
+    from interfaces.server import SwarmService
+
+    results = {}
+    for label, enabled in (("fanout", True), ("handoffs", False)):
+        settings.fanout_enabled = enabled
+        registry.reset()
+        service = SwarmService.from_agents()
+        client = service.runner.swarm.client
+        samples, completions, both = [], [], 0
+        for index, question in enumerate(MIXED_QUESTIONS):
+            before = len(client.requests)
+            start = time.perf_counter()
+            response = asyncio.run(service.runner.query(f"mixed-{label}-{index}", question))
+            samples.append(time.perf_counter() - start)
+            completions.append(len(client.requests) - before)
+            tools = {message.get("tool_name") for message in response.messages if message["role"] == "tool"}
+            both += "answer_from_sources" in tools or {"generate_response", "retrieve_and_generate"} <= tools
+        results[label] = {
+            **latency_stats(samples),
+            "completions_per_question": statistics.fmean(completions),
+            "both_sources": both / len(MIXED_QUESTIONS),
+        }
+    settings.fanout_enabled = True
+    return results
+
+def bench_routing_and_sessions(handler, turns: int) -> Dict:
+    from core.agents.coordinator import QueryRouter
+    from core.registry import registry
+    from interfaces.server import SwarmService
+
+    router = QueryRouter(handler.embedding_function)
+    samples = _timed(router.classify, ROUTING_QUERIES, 3)
+    decided = sum(router.classify(query).target is not None for query in ROUTING_QUERIES)
+    routing = {**latency_stats(samples), "decided": decided / len(ROUTING_QUERIES)}
+
+    conversation = (SESSION_TURNS * (turns // len(SESSION_TURNS) + 1))[:turns]
+    sessions = {}
+    for label, enabled in (("router", True), ("llm_routing", False)):
+        settings.router_enabled = enabled
+        # The coordinator picks up router_enabled when it is built.
+        registry.reset()
+        sessions[label] = _run_session(SwarmService.from_agents(), conversation)
+    settings.router_enabled = True
+    return {"routing": routing, "session": sessions}
+
+def run_suite(repeat: int, turns: int, latency_ms: float) -> Dict:
+    results: Dict[str, Dict] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        configure(tmp, latency_ms)
+        results["startup"] = bench_startup(tmp, repeat)
+
+        start = time.perf_counter()
+        with temporary_document_store() as handler:
+            elapsed = time.perf_counter() - start
+            chunks = handler.bm25.count() if handler.bm25 else handler.vectorstore.count()
+            results["ingestion"] = {
+                "seconds": elapsed,
+                "chunks": chunks,
+                "chunks_per_second": chunks / elapsed,
+            }
+            results["retrieval"] = bench_retrieval(handler, repeat)
+            results["sql"] = bench_sql(repeat)
+            results["sql_materialized"] = bench_materialized(tmp, repeat)
+            results.update(bench_routing_and_sessions(handler, turns))
+            results["mixed"] = bench_fanout()
+        results["vector_index"] = bench_vector_index.run(count=10000, dim=384, queries=100)
+
+    from utils.metrics import metrics
+    results["stages"] = {
+        stage: {"count": stats["count"], "mean_ms": stats["mean_ms"]}
+        for stage, stats in metrics.snapshot()["stages"].items()
+    }
+    return results
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def _flatten(results: Dict, prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)):
+            flat[name] = value
+    return flat
+
+def compare(previous: Dict, current: Dict) -> None:
+    """Print the relative change of every numeric metric present in both runs."""
+    before, after = _flatten(previous["results"]), _flatten(current["results"])
+    print(f"{'metric':<48} {previous['meta']['git_commit']:>12} {current['meta']['git_commit']:>12} {'change':>8}")
+    for name in sorted(before.keys() & after.keys()):
+        old, new = before[name], after[name]
+        change = f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+        print(f"{name:<48} {old:>12.3f} {new:>12.3f} {change:>8}")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument("--repeat", type=int, default=3, help="passes over each query set")
+    parser.add_argument("--turns", type=int, default=6, help="turns in the session benchmark")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="simulated model latency per call")
+    args = parser.parse_args()
+
+    report = {
+        "meta": {
+            "suite_version": SUITE_VERSION,
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "repeat": args.repeat,
+            "turns": args.turns,
+            "latency_ms": args.latency_ms,
+        },
+        "results": run_suite(args.repeat, args.turns, args.latency_ms),
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report["results"], indent=2))
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+
+if __name__ == "__main__":
+    main()
@@ -15,19 +15,96 @@ class Settings(BaseSettings):
     openai_api_key: str = os.getenv("OPENAI_API_KEY", "")
     model_name: str = "gpt-4o-mini"
     
+    # Model Provider Settings ("openai"/"huggingface", or "fake" for offline runs)
+    model_provider: str = "openai"
+    embedding_provider: str = "huggingface"
+    fake_latency_ms: float = 0.0
+    fake_token_latency_ms: float = 0.0
+    fake_embedding_size: int = 384
+    
     # Path Settings
     documents_path: str = "./data/documents"
     vector_store_path: str = "./data/vector_stores/chroma_db"
+    ingestion_manifest_path: str = "./data/vector_stores/ingestion_manifest.json"
+    embedding_cache_path: str = "./data/vector_stores/embedding_cache"
+    bm25_index_path: str = "./data/vector_stores/bm25.sqlite"
     database_path: str = "./data/databases/Chinook.db"
     
     # Vector Store Settings
+    collection_name: str = "my_collection"
+    vector_backend: str = "chroma"  # "chroma" or "quantized"
+    quantized_nprobe: int = 8
+    quantized_rescore_factor: int = 4
+    quantized_min_train: int = 4096
     chunk_size: int = 4000
     chunk_overlap: int = 500
     embedding_model: str = "all-MiniLM-L6-v2"
+    embedding_batch_size: int = 32
     retriever_k: int = 4
+    retriever_mode: str = "hybrid"
+    retriever_fetch_k: int = 20
+    rrf_k: int = 60
+    reranker_enabled: bool = False
+    reranker_model: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+    context_packing_enabled: bool = True
+    context_max_tokens: int = 1500
+    context_dedup_threshold: float = 0.8
+    loader_workers: int = 4
+    loader_batch_size: int = 64
+    answer_cache_enabled: bool = True
+    answer_cache_threshold: float = 0.95
+    answer_cache_max_entries: int = 512
+    answer_cache_ttl_seconds: int = 3600
     
     # SQL Settings
     sql_top_k: int = 5
+    sql_pool_size: int = 4
+    sql_timeout_seconds: float = 5.0
+    sql_max_rows: int = 200
+    sql_max_bytes: int = 64000
+    sql_mmap_size: int = 268435456
+    sql_enable_wal: bool = False
+    sql_plan_guard: str = "rewrite"
+    sql_max_plan_cost: float = 1000000.0
+    sql_index_advisor_enabled: bool = True
+    sql_index_advisor_min_scans: int = 3
+    sql_index_advisor_apply: bool = False
+    sql_local_copy_path: str = "./data/databases/Chinook.indexed.db"
+    sql_materialize_enabled: bool = True
+    sql_materialize_min_hits: int = 3
+    sql_materialize_path: str = "./data/databases/Chinook.aggregates.db"
+    schema_selection_enabled: bool = True
+    schema_max_tables: int = 5
+    schema_max_tokens: int = 600
+    schema_cache_size: int = 256
+    sql_cache_enabled: bool = True
+    sql_cache_path: str = "./data/databases/sql_cache.db"
+    
+    # Runtime Settings
+    lazy_init: bool = True
+    warmup_in_background: bool = True
+    max_concurrent_sessions: int = 32
+    metrics_enabled: bool = True
+    cli_streaming: bool = True
+    router_enabled: bool = True
+    router_confidence_threshold: float = 0.2
+    fanout_enabled: bool = True
+    memory_max_tokens: int = 4000
+    memory_full_turns: int = 1
+    memory_summarize: bool = True
+    memory_max_references: int = 200
+    
+    # Batch Settings
+    batch_concurrency: int = 8
+    batch_embed_questions: bool = True
+    
+    # Server Settings
+    server_host: str = "127.0.0.1"
+    server_port: int = 8080
+    server_workers: int = 1
+    session_store: str = "memory"
+    session_store_path: str = "./data/databases/sessions.db"
+    session_max_sessions: int = 1000
     
     # Logging Settings
     log_format: str = " %(name)s - %(message)s"
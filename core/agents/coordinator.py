@@ -1,12 +1,203 @@
-from typing import Callable, List, Optional, Any
+import asyncio
+import contextvars
+import re
+import threading
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional, Any
+import numpy as np
+from langchain_core.embeddings import Embeddings
 from swarm import Agent
+from config.settings import settings
+from utils.concurrency import run_in_thread, run_sync
 from utils.logging import get_logger
+from utils.metrics import metrics
 from .base import BaseSwarmAgent
 from .rag_agent import RAGAgent
 from .sql_agent import SQLAgent
 
 logger = get_logger(__name__)
 
+ROUTING_KEYWORDS: Dict[str, List[str]] = {
+    "sql": [
+        "database", "sql", "table", "sales", "revenue", "invoice", "invoices",
+        "album", "albums", "track", "tracks", "artist", "artists", "genre", "genres",
+        "customer", "customers", "employee", "employees", "playlist", "playlists",
+        "how many", "count", "total", "average",
+    ],
+    "rag": [
+        "transformer", "transformers", "attention", "llm", "llms", "language model",
+        "language models", "paper", "papers", "research", "bert", "gpt", "pretraining",
+        "fine-tuning", "embedding", "embeddings", "encoder", "decoder", "architecture",
+    ],
+}
+
+ROUTING_EXAMPLES: Dict[str, List[str]] = {
+    "sql": [
+        "How many albums does AC/DC have?",
+        "List the top 5 artists by number of tracks",
+        "What were the total sales in 2010?",
+        "Which customers spent the most money?",
+        "Show all tracks in the Rock genre",
+        "Which employee supports the most customers?",
+        "What is the average invoice total per country?",
+    ],
+    "rag": [
+        "What is self-attention in transformer models?",
+        "Explain how multi-head attention works",
+        "How are large language models pretrained?",
+        "What does the paper say about positional encodings?",
+        "Compare encoder-only and decoder-only architectures",
+        "What are the limitations of LLMs discussed in the research?",
+        "How does fine-tuning differ from prompting?",
+    ],
+}
+
+# Embedding similarity dominates; keywords break ties and cover the
+# keyword-only mode used when no embedding function is configured.
+KEYWORD_WEIGHT = 0.4
+
+# Start time of the current LLM routing turn, read by the transfer functions.
+_llm_route_started: contextvars.ContextVar = contextvars.ContextVar("llm_route_started", default=None)
+
+class RouteDecision(NamedTuple):
+    target: Optional[str]
+    confidence: float
+    scores: Dict[str, float]
+
+class QueryRouter:
+    """Local query classifier that decides between the SQL and RAG agents.
+
+    Keyword hits and cosine similarity to labelled example queries are
+    combined into a score per target. The confidence is the margin between
+    the best and runner-up scores; below the threshold, ``target`` is None
+    and the Coordinator LLM decides instead.
+    """
+
+    def __init__(
+        self,
+        embedding_function: Optional[Embeddings] = None,
+        threshold: Optional[float] = None,
+        examples: Optional[Dict[str, List[str]]] = None,
+        keywords: Optional[Dict[str, List[str]]] = None,
+    ):
+        self.embedding_function = embedding_function
+        self.threshold = settings.router_confidence_threshold if threshold is None else threshold
+        self.examples = examples or ROUTING_EXAMPLES
+        self.keywords = keywords or ROUTING_KEYWORDS
+        self._patterns = {
+            label: re.compile(r"\b(" + "|".join(re.escape(word) for word in words) + r")\b")
+            for label, words in self.keywords.items()
+        }
+        self._example_vectors: Optional[Dict[str, np.ndarray]] = None
+        self._lock = threading.Lock()
+        self.routed = 0
+        self.fallbacks = 0
+        self._router_seconds = 0.0
+        self._llm_routes = 0
+        self._llm_route_seconds = 0.0
+
+    @staticmethod
+    def _normalize(vectors) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def _examples_matrix(self) -> Dict[str, np.ndarray]:
+        if self._example_vectors is None:
+            labels = list(self.examples)
+            texts = [text for label in labels for text in self.examples[label]]
+            vectors = self._normalize(self.embedding_function.embed_documents(texts))
+            self._example_vectors, offset = {}, 0
+            for label in labels:
+                count = len(self.examples[label])
+                self._example_vectors[label] = vectors[offset:offset + count]
+                offset += count
+        return self._example_vectors
+
+    def keyword_scores(self, query: str) -> Dict[str, float]:
+        text = query.lower()
+        return {
+            label: min(1.0, len(pattern.findall(text)) / 2)
+            for label, pattern in self._patterns.items()
+        }
+
+    def embedding_scores(self, query: str) -> Dict[str, float]:
+        query_vector = self._normalize(self.embedding_function.embed_query(query))
+        return {
+            label: float(np.max(vectors @ query_vector))
+            for label, vectors in self._examples_matrix().items()
+        }
+
+    def classify(self, query: str) -> RouteDecision:
+        """Score a query without recording stats."""
+        keyword = self.keyword_scores(query)
+        if self.embedding_function is None:
+            scores = keyword
+        else:
+            similarity = self.embedding_scores(query)
+            scores = {
+                label: KEYWORD_WEIGHT * keyword.get(label, 0.0)
+                + (1 - KEYWORD_WEIGHT) * similarity.get(label, 0.0)
+                for label in self.examples
+            }
+        ranked = sorted(scores.values(), reverse=True) + [0.0]
+        best = max(scores, key=scores.get)
+        confidence = ranked[0] - ranked[1]
+        if settings.fanout_enabled and self.is_mixed(keyword):
+            # Leave questions that need both sources to the Coordinator, which can fan out.
+            return RouteDecision(None, confidence, scores)
+        return RouteDecision(best if confidence >= self.threshold else None, confidence, scores)
+
+    @staticmethod
+    def is_mixed(keyword_scores: Dict[str, float]) -> bool:
+        """Whether every target has a keyword in the query."""
+        return len(keyword_scores) > 1 and all(score > 0 for score in keyword_scores.values())
+
+    def route(self, query: str) -> RouteDecision:
+        """Classify a query and record whether it skipped the routing LLM."""
+        start = time.perf_counter()
+        try:
+            decision = self.classify(query)
+        except Exception as e:
+            logger.error(f"Error in query router: {str(e)}")
+            decision = RouteDecision(None, 0.0, {})
+        elapsed = time.perf_counter() - start
+        metrics.observe("route.classify", elapsed)
+        with self._lock:
+            self._router_seconds += elapsed
+            if decision.target:
+                self.routed += 1
+            else:
+                self.fallbacks += 1
+        return decision
+
+    def record_llm_route(self, seconds: float) -> None:
+        """Record how long the Coordinator LLM took to pick an agent."""
+        metrics.observe("route.llm", seconds)
+        with self._lock:
+            self._llm_routes += 1
+            self._llm_route_seconds += seconds
+
+    def warmup(self) -> None:
+        """Embed the labelled examples now rather than on the first query."""
+        if self.embedding_function is not None:
+            self._examples_matrix()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.routed + self.fallbacks
+            llm_ms = self._llm_route_seconds / self._llm_routes * 1000 if self._llm_routes else None
+            router_ms = self._router_seconds / total * 1000 if total else 0.0
+            return {
+                "queries": total,
+                "routed": self.routed,
+                "fallbacks": self.fallbacks,
+                "hit_rate": self.routed / total if total else 0.0,
+                "router_ms": router_ms,
+                "llm_routing_ms": llm_ms,
+                "latency_saved_ms": self.routed * max(llm_ms - router_ms, 0.0) if llm_ms else None,
+            }
+
 class CoordinatorAgent(BaseSwarmAgent):
     def __init__(self):
         super().__init__(
@@ -17,6 +208,9 @@ class CoordinatorAgent(BaseSwarmAgent):
                 "transfer to RAG Agent\n"
                 "- For questions about databases, sales data, albums, artists, or any SQL queries, "
                 "the RAG Agent will transfer them to SQL Agent\n"
+                "- For questions that need both the database and the research papers, call "
+                "answer_from_sources with one sub-question for each, then combine both results "
+                "into a single answer\n"
                 "- For general questions or clarifications, provide a direct response\n"
                 "Always explain your routing decision to the user."
             ),
@@ -24,21 +218,119 @@ class CoordinatorAgent(BaseSwarmAgent):
         )
         self._sql_agent: Optional[SQLAgent] = None
         self._rag_agent: Optional[RAGAgent] = None
+        self.router: Optional[QueryRouter] = None
         
     def set_transfer_functions(self, sql_agent: SQLAgent, rag_agent: RAGAgent) -> None:
         """Set up transfer functions with references to other agents."""
         self._sql_agent = sql_agent
         self._rag_agent = rag_agent
+        if settings.router_enabled:
+            self.router = QueryRouter(rag_agent.vectorstore_handler.embedding_function)
         
         def transfer_to_sql() -> Agent:
             logger.info("Transferring to SQL Agent")
+            metrics.increment("handoffs", source=self.name, target=self._sql_agent.name, via="llm")
+            self._record_llm_route()
             return self._sql_agent.agent
             
         def transfer_to_rag() -> Agent:
             logger.info("Transferring to RAG Agent")
+            metrics.increment("handoffs", source=self.name, target=self._rag_agent.name, via="llm")
+            self._record_llm_route()
             return self._rag_agent.agent
             
-        self.update_functions([transfer_to_sql, transfer_to_rag])
+        functions = [transfer_to_sql, transfer_to_rag]
+        if settings.fanout_enabled:
+            functions.append(self.answer_from_sources)
+        self.update_functions(functions)
+        
+    def answer_from_sources(self, sql_question: str, document_question: str) -> str:
+        """Answer a question that needs both the music store database and the research papers.
+        
+        Args:
+            sql_question: the part of the question the database can answer
+            document_question: the part of the question the research papers can answer
+        """
+        return run_sync(self.aanswer_from_sources(sql_question, document_question))
+        
+    async def aanswer_from_sources(self, sql_question: str, document_question: str) -> str:
+        """Async version of ``answer_from_sources``.
+        
+        The SQL and RAG branches run concurrently instead of as a chain of
+        hand-offs, and their results come back in one tool message for the
+        Coordinator's next completion to combine. A branch that fails is
+        reported as an error note next to the other branch's result.
+        """
+        logger.info("Fanning out to SQL Agent and RAG Agent")
+        metrics.increment("fanouts")
+        self._record_llm_route()
+        
+        async def branch(name: str, coroutine):
+            with metrics.span(f"fanout.{name}"):
+                return await coroutine
+        
+        # A failed branch must not discard the other one's answer.
+        sql_result, rag_result = await asyncio.gather(
+            branch("sql", self._sql_agent.sql_handler.agenerate_response(sql_question)),
+            branch("rag", self._rag_agent.vectorstore_handler.aretrieve_and_generate(document_question)),
+            return_exceptions=True,
+        )
+        if isinstance(sql_result, Exception):
+            logger.error(f"Error in SQL branch of fan-out: {str(sql_result)}")
+            sql_result = f"Error: could not query the database: {str(sql_result)}"
+        if isinstance(rag_result, Exception):
+            logger.error(f"Error in RAG branch of fan-out: {str(rag_result)}")
+            rag_answer = f"Error: could not search the research papers: {str(rag_result)}"
+        else:
+            rag_answer = rag_result[0]
+        return (
+            f"## From the database ({sql_question})\n{sql_result}\n\n"
+            f"## From the research papers ({document_question})\n{rag_answer}"
+        )
+        
+    def warmup(self) -> None:
+        """Load the models and open the stores behind every route ahead of the first query."""
+        if self._rag_agent:
+            self._rag_agent.vectorstore_handler.warmup()
+        if self._sql_agent:
+            self._sql_agent.sql_handler.warmup()
+        if self.router:
+            with metrics.span("startup.router"):
+                self.router.warmup()
+        
+    def _record_llm_route(self) -> None:
+        started = _llm_route_started.get()
+        if started is not None and self.router:
+            self.router.record_llm_route(time.perf_counter() - started)
+            _llm_route_started.set(None)
+        
+    def pre_route(self, query: str) -> Optional[Agent]:
+        """Pick the target agent locally, or return None to let the LLM route.
+        
+        Called before running the Coordinator; a returned agent should be run
+        directly, skipping the routing completion.
+        """
+        if not self.router or not self._sql_agent or not self._rag_agent:
+            return None
+        return self._dispatch(self.router.route(query))
+        
+    async def apre_route(self, query: str) -> Optional[Agent]:
+        """Async version of ``pre_route``; classification runs in a thread."""
+        if not self.router or not self._sql_agent or not self._rag_agent:
+            return None
+        return self._dispatch(await run_in_thread(self.router.route, query))
+        
+    def _dispatch(self, decision: RouteDecision) -> Optional[Agent]:
+        if decision.target is None:
+            logger.info(f"Router unsure (confidence {decision.confidence:.2f}), deferring to Coordinator")
+            _llm_route_started.set(time.perf_counter())
+            return None
+        
+        _llm_route_started.set(None)
+        target = self._sql_agent if decision.target == "sql" else self._rag_agent
+        logger.info(f"Routed to {target.name} locally (confidence {decision.confidence:.2f})")
+        metrics.increment("handoffs", source=self.name, target=target.name, via="router")
+        return target.agent
         
     def handle_query(self, query: str) -> Any:
         """Handle incoming queries by routing to appropriate agent."""
@@ -49,4 +341,3 @@ class CoordinatorAgent(BaseSwarmAgent):
             
         return self._agent(query)
 
-coordinator_agent = CoordinatorAgent()
@@ -1,23 +1,26 @@
 from typing import Optional, Any
 from swarm import Agent
+from config.settings import settings
 from utils.logging import get_logger
+from utils.metrics import metrics
 from ..document_store.vectorstore import VectorStoreHandler
+from ..registry import registry
 from .base import BaseSwarmAgent
 
 logger = get_logger(__name__)
 
 class RAGAgent(BaseSwarmAgent):
-    def __init__(self):
-        self.vectorstore_handler = VectorStoreHandler()
-        self._sql_agent: Optional[SQLAgent] = None
-        self.vectorstore_handler.initialize_vectorstore()
+    def __init__(self, vectorstore_handler: Optional[VectorStoreHandler] = None):
+        self.vectorstore_handler = vectorstore_handler or registry.vectorstore_handler()
+        if not settings.lazy_init:
+            self.vectorstore_handler.retriever
         
         def transfer_to_sql() -> Agent:
-            if not self._sql_agent:
-                from .sql_agent import SQLAgent
-                self._sql_agent = SQLAgent()
+            # The process-wide SQL Agent, not a second copy of it.
+            sql_agent = registry.sql_agent()
             logger.info("Transferring to SQL Agent")
-            return self._sql_agent.agent
+            metrics.increment("handoffs", source=self.name, target=sql_agent.name, via="llm")
+            return sql_agent.agent
         
         super().__init__(
             name="RAG Agent",
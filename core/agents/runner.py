@@ -0,0 +1,382 @@
+import asyncio
+import copy
+import inspect
+import json
+import weakref
+from collections import defaultdict
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+from swarm import Swarm
+from swarm.types import (
+    Agent,
+    AgentFunction,
+    ChatCompletionMessageToolCall,
+    Function,
+    Response,
+    Result,
+)
+from swarm.util import debug_print, function_to_json, merge_chunk
+
+from config.settings import settings
+from core.registry import registry
+from core.sessions.store import SessionStore, create_session_store
+from utils.concurrency import run_in_thread
+from utils.logging import get_logger
+from utils.metrics import metrics
+from utils.tokens import count_message_tokens
+
+logger = get_logger(__name__)
+
+__CTX_VARS_NAME__ = "context_variables"
+
+def async_variant(func: AgentFunction) -> Optional[Callable[..., Awaitable]]:
+    """Return a coroutine version of an agent function if one exists.
+
+    Coroutine functions are used as-is. For bound methods, an ``a``-prefixed
+    coroutine method on the same object (``generate_response`` ->
+    ``agenerate_response``) is used, following LangChain's invoke/ainvoke
+    convention.
+    """
+    if inspect.iscoroutinefunction(func):
+        return func
+    owner = getattr(func, "__self__", None)
+    twin = getattr(owner, f"a{func.__name__}", None) if owner is not None else None
+    return twin if inspect.iscoroutinefunction(twin) else None
+
+class AsyncSwarm(Swarm):
+    """Asyncio-native counterpart of ``swarm.Swarm.run``.
+
+    Chat completions go through an async OpenAI client, agent functions with an async
+    variant are awaited, and any remaining blocking functions run in a thread
+    pool, so many conversations can progress concurrently in one event loop.
+    """
+
+    def __init__(self, client=None):
+        self.client = client or registry.async_openai_client()
+
+    async def get_chat_completion(
+        self,
+        agent: Agent,
+        history: List,
+        context_variables: dict,
+        model_override: str,
+        stream: bool,
+        debug: bool,
+    ):
+        context_variables = defaultdict(str, context_variables)
+        instructions = (
+            agent.instructions(context_variables)
+            if callable(agent.instructions)
+            else agent.instructions
+        )
+        messages = [{"role": "system", "content": instructions}] + history
+        debug_print(debug, "Getting chat completion for...:", messages)
+
+        tools = [function_to_json(f) for f in agent.functions]
+        for tool in tools:
+            params = tool["function"]["parameters"]
+            params["properties"].pop(__CTX_VARS_NAME__, None)
+            if __CTX_VARS_NAME__ in params["required"]:
+                params["required"].remove(__CTX_VARS_NAME__)
+
+        create_params = {
+            "model": model_override or agent.model,
+            "messages": messages,
+            "tools": tools or None,
+            "tool_choice": agent.tool_choice,
+            "stream": stream,
+        }
+        if tools:
+            create_params["parallel_tool_calls"] = agent.parallel_tool_calls
+
+        with metrics.span("llm.completion"):
+            completion = await self.client.chat.completions.create(**create_params)
+        if metrics.enabled:
+            metrics.add_tokens("llm.completion", "prompt", count_message_tokens(messages))
+        return completion
+
+    async def _call_function(self, func: AgentFunction, args: dict):
+        coroutine = async_variant(func)
+        with metrics.span(f"tool.{func.__name__}"):
+            if coroutine is not None:
+                return await coroutine(**args)
+            return await run_in_thread(func, **args)
+
+    async def handle_tool_calls(
+        self,
+        tool_calls: List[ChatCompletionMessageToolCall],
+        functions: List[AgentFunction],
+        context_variables: dict,
+        debug: bool,
+    ) -> Response:
+        function_map = {f.__name__: f for f in functions}
+
+        async def call(tool_call: ChatCompletionMessageToolCall) -> Optional[Result]:
+            name = tool_call.function.name
+            if name not in function_map:
+                debug_print(debug, f"Tool {name} not found in function map.")
+                return None
+            args = json.loads(tool_call.function.arguments)
+            debug_print(debug, f"Processing tool call: {name} with arguments {args}")
+            func = function_map[name]
+            if __CTX_VARS_NAME__ in func.__code__.co_varnames:
+                args[__CTX_VARS_NAME__] = context_variables
+            return self.handle_function_result(await self._call_function(func, args), debug)
+
+        # Independent tool calls from one completion run concurrently.
+        results = await asyncio.gather(*(call(tool_call) for tool_call in tool_calls))
+
+        partial_response = Response(messages=[], agent=None, context_variables={})
+        for tool_call, result in zip(tool_calls, results):
+            name = tool_call.function.name
+            partial_response.messages.append(
+                {
+                    "role": "tool",
+                    "tool_call_id": tool_call.id,
+                    "tool_name": name,
+                    "content": result.value if result else f"Error: Tool {name} not found.",
+                }
+            )
+            if result:
+                partial_response.context_variables.update(result.context_variables)
+                if result.agent:
+                    partial_response.agent = result.agent
+        return partial_response
+
+    async def run_and_stream(
+        self,
+        agent: Agent,
+        messages: List,
+        context_variables: Optional[dict] = None,
+        model_override: str = None,
+        debug: bool = False,
+        max_turns: int = float("inf"),
+        execute_tools: bool = True,
+    ) -> AsyncIterator[dict]:
+        """Async counterpart of ``Swarm.run_and_stream``.
+
+        Yields the same delimiter and delta chunks, plus a ``tool_results``
+        chunk after each round of tool calls, and finally ``{"response": ...}``.
+        """
+        active_agent = agent
+        context_variables = copy.deepcopy(context_variables or {})
+        history = copy.deepcopy(messages)
+        init_len = len(messages)
+
+        while len(history) - init_len < max_turns:
+            message = {
+                "content": "",
+                "sender": active_agent.name,
+                "role": "assistant",
+                "function_call": None,
+                "tool_calls": defaultdict(
+                    lambda: {
+                        "function": {"arguments": "", "name": ""},
+                        "id": "",
+                        "type": "",
+                    }
+                ),
+            }
+
+            completion = await self.get_chat_completion(
+                agent=active_agent,
+                history=history,
+                context_variables=context_variables,
+                model_override=model_override,
+                stream=True,
+                debug=debug,
+            )
+
+            yield {"delim": "start"}
+            async for chunk in completion:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.model_dump(mode="json")
+                if delta["role"] == "assistant":
+                    delta["sender"] = active_agent.name
+                yield delta
+                delta.pop("role", None)
+                delta.pop("sender", None)
+                merge_chunk(message, delta)
+            yield {"delim": "end"}
+
+            message["tool_calls"] = list(message.get("tool_calls", {}).values())
+            if not message["tool_calls"]:
+                message["tool_calls"] = None
+            debug_print(debug, "Received completion:", message)
+            history.append(message)
+
+            if not message["tool_calls"] or not execute_tools:
+                debug_print(debug, "Ending turn.")
+                break
+
+            tool_calls = [
+                ChatCompletionMessageToolCall(
+                    id=tool_call["id"],
+                    function=Function(
+                        arguments=tool_call["function"]["arguments"],
+                        name=tool_call["function"]["name"],
+                    ),
+                    type=tool_call["type"],
+                )
+                for tool_call in message["tool_calls"]
+            ]
+            partial_response = await self.handle_tool_calls(
+                tool_calls, active_agent.functions, context_variables, debug
+            )
+            yield {"tool_results": partial_response.messages}
+            history.extend(partial_response.messages)
+            context_variables.update(partial_response.context_variables)
+            if partial_response.agent:
+                active_agent = partial_response.agent
+
+        yield {
+            "response": Response(
+                messages=history[init_len:],
+                agent=active_agent,
+                context_variables=context_variables,
+            )
+        }
+
+    async def run(
+        self,
+        agent: Agent,
+        messages: List,
+        context_variables: Optional[dict] = None,
+        model_override: str = None,
+        debug: bool = False,
+        max_turns: int = float("inf"),
+        execute_tools: bool = True,
+    ) -> Response:
+        active_agent = agent
+        context_variables = copy.deepcopy(context_variables or {})
+        history = copy.deepcopy(messages)
+        init_len = len(messages)
+
+        while len(history) - init_len < max_turns and active_agent:
+            completion = await self.get_chat_completion(
+                agent=active_agent,
+                history=history,
+                context_variables=context_variables,
+                model_override=model_override,
+                stream=False,
+                debug=debug,
+            )
+            message = completion.choices[0].message
+            debug_print(debug, "Received completion:", message)
+            message.sender = active_agent.name
+            history.append(json.loads(message.model_dump_json()))
+
+            if not message.tool_calls or not execute_tools:
+                debug_print(debug, "Ending turn.")
+                break
+
+            partial_response = await self.handle_tool_calls(
+                message.tool_calls, active_agent.functions, context_variables, debug
+            )
+            history.extend(partial_response.messages)
+            context_variables.update(partial_response.context_variables)
+            if partial_response.agent:
+                active_agent = partial_response.agent
+
+        return Response(
+            messages=history[init_len:],
+            agent=active_agent,
+            context_variables=context_variables,
+        )
+
+def final_answer(messages: List[dict]) -> Optional[str]:
+    """Content of the last assistant message with text, if any."""
+    for message in reversed(messages):
+        if message.get("role") == "assistant" and message.get("content"):
+            return message["content"]
+    return None
+
+class AsyncSessionRunner:
+    """Runs many independent conversations concurrently on one event loop.
+
+    Session state lives in a ``SessionStore``, keyed by session ID, with the
+    active agent stored by name. Turns within a session are serialized; turns
+    of different sessions run concurrently, up to ``max_concurrent_sessions``
+    at a time. An optional ``pre_route`` coroutine may pick the agent for a
+    turn up front; when it returns None the session's current agent is used.
+    """
+
+    def __init__(
+        self,
+        default_agent: Agent,
+        swarm: Optional[AsyncSwarm] = None,
+        max_concurrency: Optional[int] = None,
+        store: Optional[SessionStore] = None,
+        agents: Optional[List[Agent]] = None,
+        pre_route: Optional[Callable[[str], Awaitable[Optional[Agent]]]] = None,
+    ):
+        self.default_agent = default_agent
+        self.swarm = swarm or AsyncSwarm()
+        self.store = store or create_session_store()
+        self.agents = {agent.name: agent for agent in (agents or [])}
+        self.agents.setdefault(default_agent.name, default_agent)
+        self.pre_route = pre_route
+        self._semaphore = asyncio.Semaphore(max_concurrency or settings.max_concurrent_sessions)
+        # A session's lock lives only as long as a turn holds or waits for it.
+        self._locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+    def _lock(self, session_id: str) -> asyncio.Lock:
+        lock = self._locks.get(session_id)
+        if lock is None:
+            lock = self._locks[session_id] = asyncio.Lock()
+        return lock
+
+    def messages(self, session_id: str) -> List[dict]:
+        state = self.store.get(session_id)
+        return state["messages"] if state else []
+
+    def _load(self, session_id: str) -> Tuple[Agent, List[dict]]:
+        state = self.store.get(session_id) or {}
+        agent = self.agents.get(state.get("agent"), self.default_agent)
+        return agent, state.get("messages", [])
+
+    async def _agent_for_turn(self, agent: Agent, user_input: str) -> Agent:
+        if self.pre_route is None:
+            return agent
+        return await self.pre_route(user_input) or agent
+
+    def _save(self, session_id: str, agent: Optional[Agent], messages: List[dict]) -> None:
+        agent_name = agent.name if agent and agent.name in self.agents else self.default_agent.name
+        self.store.save(session_id, {"agent": agent_name, "messages": messages})
+
+    async def query(self, session_id: str, user_input: str) -> Response:
+        """Run one user turn for a session and return the new messages."""
+        async with self._lock(session_id):
+            agent, history = await run_in_thread(self._load, session_id)
+            messages = history + [{"role": "user", "content": user_input}]
+            async with self._semaphore:
+                with metrics.span("turn"):
+                    agent = await self._agent_for_turn(agent, user_input)
+                    response = await self.swarm.run(agent=agent, messages=messages)
+            await run_in_thread(self._save, session_id, response.agent, messages + response.messages)
+            return response
+
+    async def stream(self, session_id: str, user_input: str) -> AsyncIterator[dict]:
+        """Run one user turn for a session, yielding chunks as they arrive."""
+        async with self._lock(session_id):
+            agent, history = await run_in_thread(self._load, session_id)
+            messages = history + [{"role": "user", "content": user_input}]
+            async with self._semaphore:
+                agent = await self._agent_for_turn(agent, user_input)
+                async for chunk in self.swarm.run_and_stream(agent=agent, messages=messages):
+                    if "response" in chunk:
+                        response = chunk["response"]
+                        await run_in_thread(
+                            self._save, session_id, response.agent, messages + response.messages
+                        )
+                    yield chunk
+
+    async def query_many(self, queries: List[tuple]) -> List[Response]:
+        """Run ``(session_id, user_input)`` pairs concurrently."""
+        return await asyncio.gather(
+            *(self.query(session_id, user_input) for session_id, user_input in queries)
+        )
+
+    def reset(self, session_id: str) -> None:
+        self.store.delete(session_id)
+        self._locks.pop(session_id, None)
@@ -1,14 +1,15 @@
 from typing import Optional, Any
 from config.settings import settings
 from utils.logging import get_logger
+from ..registry import registry
 from ..sql.handler import SQLHandler
 from .base import BaseSwarmAgent
 
 logger = get_logger(__name__)
 
 class SQLAgent(BaseSwarmAgent):
-    def __init__(self):
-        self.sql_handler = SQLHandler()
+    def __init__(self, sql_handler: Optional[SQLHandler] = None):
+        self.sql_handler = sql_handler or registry.sql_handler()
         
         super().__init__(
             name="SQL Agent",
@@ -0,0 +1,115 @@
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+import itertools
+import threading
+import time
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from config.settings import settings
+from utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+class SemanticAnswerCache:
+    """LRU/TTL cache of RAG answers looked up by question similarity.
+
+    A question hits the cache when its embedding has a cosine similarity of at
+    least ``threshold`` with a previously answered question. Entries are tied
+    to the corpus version they were generated from and dropped when it changes.
+    """
+
+    def __init__(
+        self,
+        embedding_function: Embeddings,
+        threshold: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+    ):
+        self.embedding_function = embedding_function
+        self.threshold = threshold if threshold is not None else settings.answer_cache_threshold
+        self.max_entries = max_entries or settings.answer_cache_max_entries
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.answer_cache_ttl_seconds
+        self.corpus_version: Optional[str] = None
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._ids = itertools.count()
+        self._matrix: Optional[np.ndarray] = None
+        self._matrix_ids: list = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _embed(self, question: str) -> np.ndarray:
+        vector = np.asarray(self.embedding_function.embed_query(question), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _expire(self) -> None:
+        if not self.ttl_seconds:
+            return
+        cutoff = time.monotonic() - self.ttl_seconds
+        expired = [key for key, entry in self._entries.items() if entry["created"] < cutoff]
+        for key in expired:
+            del self._entries[key]
+        if expired:
+            self._matrix = None
+
+    def _search(self, vector: np.ndarray) -> Optional[int]:
+        if not self._entries:
+            return None
+        if self._matrix is None:
+            self._matrix_ids = list(self._entries)
+            self._matrix = np.stack([self._entries[key]["vector"] for key in self._matrix_ids])
+        scores = self._matrix @ vector
+        best = int(np.argmax(scores))
+        return self._matrix_ids[best] if scores[best] >= self.threshold else None
+
+    def lookup(self, question: str) -> Optional[Any]:
+        """Return the cached answer for a similar question, if any."""
+        vector = self._embed(question)
+        with self._lock:
+            self._expire()
+            key = self._search(vector)
+            if key is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            logger.info(f"Answer cache hit for question: {question}")
+            return self._entries[key]["value"]
+
+    def store(self, question: str, value: Any) -> None:
+        vector = self._embed(question)
+        with self._lock:
+            self._entries[next(self._ids)] = {
+                "question": question,
+                "vector": vector,
+                "value": value,
+                "created": time.monotonic(),
+            }
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._matrix = None
+
+    def invalidate(self, corpus_version: Optional[str] = None) -> None:
+        """Drop all entries, or only if ``corpus_version`` differs from the current one."""
+        with self._lock:
+            if corpus_version is not None and corpus_version == self.corpus_version:
+                return
+            if self._entries:
+                logger.info(f"Invalidating {len(self._entries)} cached answers")
+            self._entries.clear()
+            self._matrix = None
+            self.corpus_version = corpus_version
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self._entries),
+        }
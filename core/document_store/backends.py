@@ -0,0 +1,78 @@
+from abc import abstractmethod
+from typing import Any, Dict, List, Optional
+from langchain_chroma import Chroma
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+from config.settings import settings
+from utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+class VectorBackend(VectorStore):
+    """LangChain vector store with the collection management ingestion relies on."""
+
+    @abstractmethod
+    def get(
+        self,
+        ids: Optional[List[str]] = None,
+        limit: Optional[int] = None,
+        include: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> Dict[str, list]:
+        """Stored chunks as ``{"ids": [...], "documents": [...], "metadatas": [...]}``."""
+
+    @abstractmethod
+    def count(self) -> int:
+        """Number of stored vectors."""
+
+    @abstractmethod
+    def reset_collection(self) -> None:
+        """Delete every stored vector."""
+
+    @abstractmethod
+    def memory_stats(self) -> Dict[str, float]:
+        """Approximate memory cost of the index per vector."""
+
+class ChromaBackend(Chroma, VectorBackend):
+    """Chroma collection with an HNSW index over float32 vectors."""
+
+    # Chroma's default ``hnsw:M``; each vector keeps up to 2*M neighbour links on the base layer.
+    HNSW_M = 16
+
+    def count(self) -> int:
+        return self._collection.count()
+
+    def memory_stats(self) -> Dict[str, float]:
+        sample = self._collection.get(limit=1, include=["embeddings"])["embeddings"]
+        dim = len(sample[0]) if sample is not None and len(sample) else 0
+        resident = 4 * dim + 2 * self.HNSW_M * 4 + 8
+        return {
+            "vectors": self.count(),
+            "dim": dim,
+            "resident_bytes_per_vector": resident,
+            "resident_mb_per_million": resident * 1e6 / 2**20,
+        }
+
+def create_vectorstore(embedding_function: Embeddings, backend: Optional[str] = None) -> VectorBackend:
+    """Vector store for ``backend`` (default: ``settings.vector_backend``).
+
+    ``"chroma"`` keeps float32 vectors in Chroma's HNSW index; ``"quantized"``
+    keeps int8 codes in memory-mapped files with an IVF index (see
+    ``QuantizedVectorStore``). Both persist under ``vector_store_path``.
+    """
+    backend = backend or settings.vector_backend
+    if backend == "chroma":
+        return ChromaBackend(
+            collection_name=settings.collection_name,
+            embedding_function=embedding_function,
+            persist_directory=settings.vector_store_path,
+        )
+    if backend == "quantized":
+        from .quantized import QuantizedVectorStore
+        return QuantizedVectorStore(
+            collection_name=settings.collection_name,
+            embedding_function=embedding_function,
+            persist_directory=settings.vector_store_path,
+        )
+    raise ValueError(f"Unknown vector backend: {backend}")
@@ -0,0 +1,157 @@
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+
+from langchain_core.documents import Document
+
+from config.settings import settings
+from utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or that the this to was were
+which with we our can not but also these those their they than then there such into
+""".split())
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens without stopwords or single characters."""
+    return [
+        token for token in TOKEN_PATTERN.findall(text.lower())
+        if len(token) > 1 and token not in STOPWORDS
+    ]
+
+class BM25Index:
+    """Persistent inverted index scored with Okapi BM25.
+
+    Chunks are stored in SQLite under the same IDs as in the vector store,
+    so ingestion can keep both in sync and hybrid search can fuse results
+    by ID.
+    """
+
+    def __init__(self, path: Optional[str] = None, k1: float = 1.5, b: float = 0.75):
+        self.path = path or settings.bm25_index_path
+        self.k1 = k1
+        self.b = b
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._stats: Optional[Tuple[int, float]] = None
+        with self._lock:
+            self._conn.executescript("""
+                PRAGMA journal_mode=WAL;
+                CREATE TABLE IF NOT EXISTS chunks (
+                    id TEXT PRIMARY KEY, length INTEGER NOT NULL,
+                    content TEXT NOT NULL, metadata TEXT
+                );
+                CREATE TABLE IF NOT EXISTS postings (
+                    term TEXT NOT NULL, chunk_id TEXT NOT NULL, tf INTEGER NOT NULL,
+                    PRIMARY KEY (term, chunk_id)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS postings_chunk ON postings (chunk_id);
+            """)
+            self._conn.commit()
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def add_documents(self, documents: List[Document], ids: List[str]) -> None:
+        chunk_rows, posting_rows = [], []
+        for document, chunk_id in zip(documents, ids):
+            terms = Counter(tokenize(document.page_content))
+            chunk_rows.append((
+                chunk_id, sum(terms.values()), document.page_content,
+                json.dumps(document.metadata or {}),
+            ))
+            posting_rows.extend((term, chunk_id, tf) for term, tf in terms.items())
+
+        with self._lock:
+            self._delete(ids)
+            self._conn.executemany(
+                "INSERT INTO chunks (id, length, content, metadata) VALUES (?, ?, ?, ?)", chunk_rows
+            )
+            self._conn.executemany(
+                "INSERT INTO postings (term, chunk_id, tf) VALUES (?, ?, ?)", posting_rows
+            )
+            self._conn.commit()
+            self._stats = None
+
+    def delete(self, ids: Iterable[str]) -> None:
+        with self._lock:
+            self._delete(list(ids))
+            self._conn.commit()
+            self._stats = None
+
+    def _delete(self, ids: List[str]) -> None:
+        for start in range(0, len(ids), 500):
+            batch = ids[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            self._conn.execute(f"DELETE FROM postings WHERE chunk_id IN ({placeholders})", batch)
+            self._conn.execute(f"DELETE FROM chunks WHERE id IN ({placeholders})", batch)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM postings")
+            self._conn.execute("DELETE FROM chunks")
+            self._conn.commit()
+            self._stats = None
+
+    def _collection_stats(self) -> Tuple[int, float]:
+        if self._stats is None:
+            count, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(length), 0) FROM chunks"
+            ).fetchone()
+            self._stats = (count, total / count if count else 0.0)
+        return self._stats
+
+    def search(self, query: str, k: int) -> List[Tuple[Document, float]]:
+        """Return up to ``k`` chunks with their BM25 scores, best first."""
+        terms = sorted(set(tokenize(query)))
+        if not terms:
+            return []
+
+        placeholders = ",".join("?" * len(terms))
+        with self._lock:
+            num_chunks, avg_length = self._collection_stats()
+            if not num_chunks:
+                return []
+            postings = self._conn.execute(
+                f"SELECT p.term, p.chunk_id, p.tf, c.length FROM postings p "
+                f"JOIN chunks c ON c.id = p.chunk_id WHERE p.term IN ({placeholders})",
+                terms,
+            ).fetchall()
+
+            frequencies = Counter(term for term, _, _, _ in postings)
+            scores: Dict[str, float] = {}
+            for term, chunk_id, tf, length in postings:
+                df = frequencies[term]
+                idf = math.log(1 + (num_chunks - df + 0.5) / (df + 0.5))
+                norm = tf + self.k1 * (1 - self.b + self.b * length / avg_length)
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (self.k1 + 1) / norm
+
+            top = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+            if not top:
+                return []
+            rows = {
+                row[0]: row for row in self._conn.execute(
+                    f"SELECT id, content, metadata FROM chunks WHERE id IN ({','.join('?' * len(top))})",
+                    [chunk_id for chunk_id, _ in top],
+                )
+            }
+
+        return [
+            (
+                Document(id=chunk_id, page_content=rows[chunk_id][1],
+                         metadata=json.loads(rows[chunk_id][2] or "{}")),
+                score,
+            )
+            for chunk_id, score in top
+        ]
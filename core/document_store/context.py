@@ -0,0 +1,161 @@
+from collections import Counter
+from typing import List, NamedTuple, Optional, Set
+import math
+import re
+import threading
+
+from langchain_core.documents import Document
+
+from config.settings import settings
+from utils.logging import get_logger
+from utils.tokens import count_tokens
+from .bm25 import tokenize
+
+logger = get_logger(__name__)
+
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9(\[\"“])|\n{2,}")
+
+# Shortest shared run of text treated as a splitter overlap between chunks.
+MIN_OVERLAP_CHARS = 40
+
+class PackedContext(NamedTuple):
+    text: str
+    tokens_before: int
+    tokens_after: int
+    chunks: int
+    duplicates: int
+
+def split_sentences(text: str) -> List[str]:
+    return [sentence.strip() for sentence in SENTENCE_BOUNDARY.split(text) if sentence.strip()]
+
+def merge_overlap(first: str, second: str) -> Optional[str]:
+    """Join two chunks if the end of ``first`` repeats at the start of ``second``."""
+    start = first.find(second[:MIN_OVERLAP_CHARS])
+    while start != -1:
+        overlap = len(first) - start
+        if second[:overlap] == first[start:]:
+            return first + second[overlap:]
+        start = first.find(second[:MIN_OVERLAP_CHARS], start + 1)
+    return None
+
+def _shingles(text: str, size: int = 3) -> Set[tuple]:
+    words = tokenize(text)
+    return {tuple(words[i:i + size]) for i in range(max(len(words) - size + 1, 1))}
+
+class ContextPacker:
+    """Assembles retrieved chunks into a compact prompt context.
+
+    Chunks from the same source that overlap (neighbours produced by the
+    splitter's ``chunk_overlap``) are merged, near-duplicates are dropped,
+    and only the sentences most relevant to the question are kept, up to
+    ``max_tokens``. Retrieval order is preserved across chunks and original
+    order within them.
+    """
+
+    def __init__(self, max_tokens: Optional[int] = None, duplicate_threshold: Optional[float] = None):
+        self.max_tokens = max_tokens or settings.context_max_tokens
+        self.duplicate_threshold = duplicate_threshold or settings.context_dedup_threshold
+        self._lock = threading.Lock()
+        self.queries = 0
+        self.tokens_before = 0
+        self.tokens_after = 0
+
+    def merge_chunks(self, docs: List[Document]) -> List[str]:
+        merged: List[tuple] = []
+        for doc in docs:
+            source = doc.metadata.get("source")
+            text = doc.page_content.strip()
+            for i, (other_source, other_text) in enumerate(merged):
+                if other_source != source:
+                    continue
+                joined = merge_overlap(other_text, text) or merge_overlap(text, other_text)
+                if joined is not None:
+                    merged[i] = (source, joined)
+                    break
+            else:
+                merged.append((source, text))
+        return [text for _, text in merged]
+
+    def drop_duplicates(self, chunks: List[str]) -> List[str]:
+        kept, kept_shingles = [], []
+        for chunk in chunks:
+            shingles = _shingles(chunk)
+            if any(
+                len(shingles & other) / max(min(len(shingles), len(other)), 1) >= self.duplicate_threshold
+                for other in kept_shingles
+            ):
+                continue
+            kept.append(chunk)
+            kept_shingles.append(shingles)
+        return kept
+
+    def select_sentences(self, question: str, chunks: List[str]) -> str:
+        """Keep the highest-scoring sentences that fit the token budget."""
+        sentences = [split_sentences(chunk) for chunk in chunks]
+        terms = set(tokenize(question))
+        document_frequency = Counter(
+            term for chunk in sentences for sentence in chunk for term in set(tokenize(sentence)) & terms
+        )
+        total = sum(len(chunk) for chunk in sentences) or 1
+
+        candidates = []
+        for rank, chunk in enumerate(sentences):
+            raw = [
+                sum(math.log(1 + total / document_frequency[term]) for term in set(tokenize(s)) & terms)
+                for s in chunk
+            ]
+            for i, sentence in enumerate(chunk):
+                # Neighbouring matches lend some weight, so definitions next to a hit survive.
+                neighbours = (raw[i - 1] if i > 0 else 0) + (raw[i + 1] if i + 1 < len(raw) else 0)
+                score = (raw[i] + 0.5 * neighbours) / math.sqrt(rank + 1)
+                candidates.append((score, rank, i, sentence))
+
+        # Unrelated sentences are only used when nothing matches the question.
+        if any(candidate[0] > 0 for candidate in candidates):
+            candidates = [candidate for candidate in candidates if candidate[0] > 0]
+
+        selected, used = set(), 0
+        for score, rank, i, sentence in sorted(candidates, key=lambda c: (-c[0], c[1], c[2])):
+            tokens = count_tokens(sentence)
+            if used + tokens > self.max_tokens:
+                continue
+            selected.add((rank, i))
+            used += tokens
+
+        parts = []
+        for rank, chunk in enumerate(sentences):
+            kept, previous = [], None
+            for i, sentence in enumerate(chunk):
+                if (rank, i) in selected:
+                    if previous is not None and i != previous + 1:
+                        kept.append("...")
+                    kept.append(sentence)
+                    previous = i
+            if kept:
+                parts.append(" ".join(kept))
+        return "\n\n".join(parts)
+
+    def pack(self, question: str, docs: List[Document]) -> PackedContext:
+        tokens_before = count_tokens("\n\n".join(doc.page_content for doc in docs))
+        merged = self.merge_chunks(docs)
+        chunks = self.drop_duplicates(merged)
+        text = self.select_sentences(question, chunks)
+        tokens_after = count_tokens(text)
+
+        with self._lock:
+            self.queries += 1
+            self.tokens_before += tokens_before
+            self.tokens_after += tokens_after
+        logger.info(
+            f"Context packed from {len(docs)} chunks ({tokens_before} tokens) "
+            f"to {len(chunks)} ({tokens_after} tokens)"
+        )
+        return PackedContext(text, tokens_before, tokens_after, len(chunks), len(merged) - len(chunks))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "queries": self.queries,
+                "avg_tokens_before": self.tokens_before / self.queries if self.queries else 0.0,
+                "avg_tokens_after": self.tokens_after / self.queries if self.queries else 0.0,
+            }
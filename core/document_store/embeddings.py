@@ -0,0 +1,193 @@
+from typing import Dict, List, Optional
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from config.settings import settings
+from utils.logging import get_logger
+from utils.metrics import metrics
+
+logger = get_logger(__name__)
+
+class EmbeddingCache:
+    """Persistent embedding cache for a single model.
+
+    Vectors are appended to a memory-mapped float32 matrix on disk and a small
+    SQLite table maps each key to its row, so lookups never load the whole
+    cache into memory.
+    """
+
+    def __init__(self, directory: str, model_name: str):
+        self.directory = os.path.join(directory, re.sub(r"[^A-Za-z0-9_.-]", "_", model_name))
+        os.makedirs(self.directory, exist_ok=True)
+        self._vectors_path = os.path.join(self.directory, "vectors.f32")
+        self._lock = threading.Lock()
+        self._index = sqlite3.connect(
+            os.path.join(self.directory, "index.sqlite"), check_same_thread=False
+        )
+        self._index.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, row INTEGER)")
+        self._index.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+        self._index.commit()
+
+        row = self._index.execute("SELECT value FROM meta WHERE name = 'dim'").fetchone()
+        self.dim: Optional[int] = int(row[0]) if row else None
+        # Rows are only ever appended, so the next free row follows the highest one in use.
+        self._count = self._index.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM entries").fetchone()[0]
+        self._matrix: Optional[np.memmap] = None
+        if self.dim:
+            self._open(max(self._count, 1))
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _open(self, min_rows: int) -> None:
+        row_bytes = self.dim * 4
+        size = os.path.getsize(self._vectors_path) if os.path.exists(self._vectors_path) else 0
+        capacity = size // row_bytes
+        if capacity < min_rows:
+            capacity = max(min_rows, capacity * 2, 1024)
+            if self._matrix is not None:
+                self._matrix.flush()
+                self._matrix = None
+            with open(self._vectors_path, "ab") as f:
+                f.truncate(capacity * row_bytes)
+        if self._matrix is None or self._matrix.shape[0] != capacity:
+            self._matrix = np.memmap(
+                self._vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim)
+            )
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        found: Dict[str, np.ndarray] = {}
+        if not self.dim or not keys:
+            return found
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._index.execute(
+                    f"SELECT key, row FROM entries WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, row in rows:
+                    found[key] = np.array(self._matrix[row])
+        return found
+
+    def put_many(self, items: Dict[str, List[float]]) -> None:
+        if not items:
+            return
+        with self._lock:
+            if self.dim is None:
+                self.dim = len(next(iter(items.values())))
+                self._index.execute("INSERT OR REPLACE INTO meta VALUES ('dim', ?)", (str(self.dim),))
+            # Another caller may have stored some of these keys since they missed;
+            # skip them so every stored key keeps the row it already points to.
+            keys = list(items)
+            stored = set()
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                stored.update(key for (key,) in self._index.execute(
+                    f"SELECT key FROM entries WHERE key IN ({placeholders})", batch
+                ))
+            fresh = [key for key in keys if key not in stored]
+            if not fresh:
+                return
+            self._open(self._count + len(fresh))
+
+            entries = []
+            for key in fresh:
+                self._matrix[self._count] = np.asarray(items[key], dtype=np.float32)
+                entries.append((key, self._count))
+                self._count += 1
+            self._matrix.flush()
+            self._index.executemany("INSERT INTO entries VALUES (?, ?)", entries)
+            self._index.commit()
+
+class CachedEmbeddings(Embeddings):
+    """Wraps an embedding model with length-sorted batching and a disk cache."""
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        model_name: str,
+        cache_dir: Optional[str] = None,
+        batch_size: Optional[int] = None,
+    ):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.batch_size = batch_size or settings.embedding_batch_size
+        self.cache = EmbeddingCache(cache_dir or settings.embedding_cache_path, model_name)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(kind: str, text: str) -> str:
+        return hashlib.sha256(f"{kind}\0{text}".encode("utf-8")).hexdigest()
+
+    def _embed_cached(self, kind: str, texts: List[str]) -> List[List[float]]:
+        keys = [self._key(kind, text) for text in texts]
+        cached = self.cache.get_many(list(set(keys)))
+
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in cached:
+                missing[key] = text
+        self.hits += len(texts) - sum(1 for key in keys if key in missing)
+        self.misses += len(missing)
+
+        if missing:
+            # Sorting by length keeps similarly sized texts in the same batch,
+            # which minimizes padding inside the model.
+            ordered = sorted(missing.items(), key=lambda item: len(item[1]))
+            computed: Dict[str, List[float]] = {}
+            for start in range(0, len(ordered), self.batch_size):
+                batch = ordered[start:start + self.batch_size]
+                with metrics.span("embed.documents" if kind == "doc" else "embed.queries"):
+                    vectors = self.embeddings.embed_documents([text for _, text in batch])
+                computed.update(zip((key for key, _ in batch), vectors))
+            self.cache.put_many(computed)
+            cached.update({key: np.asarray(vector, dtype=np.float32) for key, vector in computed.items()})
+
+        return [cached[key].tolist() for key in keys]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed_cached("doc", texts)
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Embed many queries in batches, caching them for later ``embed_query`` calls.
+
+        Assumes the model embeds a query the same way as a document, which
+        holds for the sentence-transformers and hashing models used here.
+        """
+        return self._embed_cached("query", texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        key = self._key("query", text)
+        cached = self.cache.get_many([key])
+        if key in cached:
+            self.hits += 1
+            return cached[key].tolist()
+
+        self.misses += 1
+        with metrics.span("embed.query"):
+            vector = self.embeddings.embed_query(text)
+        self.cache.put_many({key: vector})
+        return list(vector)
+
+    def warmup(self) -> None:
+        """Load the wrapped model now if it loads lazily."""
+        load = getattr(self.embeddings, "load", None)
+        if load is not None:
+            load()
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "cached_vectors": len(self.cache),
+        }
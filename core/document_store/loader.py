@@ -1,4 +1,5 @@
-from typing import List
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Iterator, List, NamedTuple, Optional, Tuple
 import os
 from langchain_core.documents import Document
 from langchain_community.document_loaders import Docx2txtLoader, PyPDFLoader
@@ -9,6 +10,30 @@ from utils.logging import get_logger
 
 logger = get_logger(__name__)
 
+LOADERS = {
+    ".pdf": PyPDFLoader,
+    ".docx": Docx2txtLoader
+}
+
+class LoadResult(NamedTuple):
+    file_path: str
+    documents: List[Document]
+    error: Optional[str] = None
+
+def _parse_and_split(file_path: str, chunk_size: int, chunk_overlap: int) -> LoadResult:
+    """Parse and split one file. Runs inside a worker process."""
+    ext = os.path.splitext(file_path)[1]
+    if ext not in LOADERS:
+        return LoadResult(file_path, [], f"Unsupported file type: {file_path}")
+    try:
+        text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap
+        )
+        return LoadResult(file_path, text_splitter.split_documents(LOADERS[ext](file_path).load()))
+    except Exception as e:
+        return LoadResult(file_path, [], f"Error loading document {file_path}: {str(e)}")
+
 class DocumentLoader:
     def __init__(self, folder_path: str = None):
         self.folder_path = folder_path or settings.documents_path
@@ -16,35 +41,77 @@ class DocumentLoader:
             chunk_size=settings.chunk_size,
             chunk_overlap=settings.chunk_overlap
         )
+        self.failures: List[Tuple[str, str]] = []
     
     def _load_single_document(self, file_path: str) -> List[Document]:
-        loaders = {
-            ".pdf": PyPDFLoader,
-            ".docx": Docx2txtLoader
-        }
-        
         ext = os.path.splitext(file_path)[1]
-        if ext not in loaders:
+        if ext not in LOADERS:
             logger.warning(f"Unsupported file type: {file_path}")
             return []
             
         try:
-            return loaders[ext](file_path).load()
+            return LOADERS[ext](file_path).load()
         except Exception as e:
             logger.error(f"Error loading document {file_path}: {str(e)}")
             return []
 
-    def load_documents(self) -> List[Document]:
+    def list_document_paths(self) -> List[str]:
+        """Return the paths of all visible files in the documents folder."""
         if not os.path.exists(self.folder_path):
             logger.error(f"Documents path does not exist: {self.folder_path}")
             return []
         
+        return [
+            os.path.join(self.folder_path, filename)
+            for filename in sorted(os.listdir(self.folder_path))
+            if not filename.startswith(".")
+        ]
+
+    def load_and_split_file(self, file_path: str) -> List[Document]:
+        """Load a single file and split it into chunks."""
+        return self.split_documents(self._load_single_document(file_path))
+
+    def iter_split_files(self, file_paths: Optional[List[str]] = None) -> Iterator[LoadResult]:
+        """Parse and split files in a process pool, yielding each file as it finishes.
+
+        At most ``2 * loader_workers`` files are in flight at once, so memory is
+        bounded by a few files rather than the whole corpus. Failed files are
+        yielded with ``error`` set and recorded in ``self.failures``.
+        """
+        paths = self.list_document_paths() if file_paths is None else list(file_paths)
+        self.failures = []
+        args = (settings.chunk_size, settings.chunk_overlap)
+
+        if settings.loader_workers <= 1 or len(paths) <= 1:
+            for path in paths:
+                yield self._report(_parse_and_split(path, *args))
+            return
+
+        max_in_flight = settings.loader_workers * 2
+        with ProcessPoolExecutor(max_workers=settings.loader_workers) as executor:
+            pending = set()
+            remaining = iter(paths)
+            while True:
+                for path in remaining:
+                    pending.add(executor.submit(_parse_and_split, path, *args))
+                    if len(pending) >= max_in_flight:
+                        break
+                if not pending:
+                    break
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield self._report(future.result())
+
+    def _report(self, result: LoadResult) -> LoadResult:
+        if result.error:
+            logger.error(result.error)
+            self.failures.append((result.file_path, result.error))
+        return result
+
+    def load_documents(self) -> List[Document]:
         documents = []
-        for filename in os.listdir(self.folder_path):
-            if not filename.startswith("."):
-                documents.extend(self._load_single_document(
-                    os.path.join(self.folder_path, filename)
-                ))
+        for file_path in self.list_document_paths():
+            documents.extend(self._load_single_document(file_path))
         
         if not documents:
             logger.warning("No documents were loaded from the specified path")
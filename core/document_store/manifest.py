@@ -0,0 +1,114 @@
+from typing import Dict, List, Tuple
+import hashlib
+import json
+import os
+
+from utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+class IngestionManifest:
+    """Tracks which files and chunks have been embedded into the vector store.
+
+    Each file is recorded with the hash of its bytes and the stable IDs of the
+    chunks produced from it, so later runs only embed what actually changed.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path: str):
+        self.path = path
+        self.files: Dict[str, dict] = {}
+        self._load()
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == self.VERSION:
+                self.files = data.get("files", {})
+            else:
+                logger.warning(f"Ignoring manifest with unknown version: {self.path}")
+        except (OSError, ValueError) as e:
+            logger.error(f"Error reading ingestion manifest {self.path}: {str(e)}")
+
+    @property
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    @property
+    def fingerprint(self) -> str:
+        """Hash of the whole ingested corpus; changes whenever any file does."""
+        digest = hashlib.sha256()
+        for source in sorted(self.files):
+            digest.update(source.encode("utf-8"))
+            digest.update(self.files[source]["hash"].encode("utf-8"))
+        return digest.hexdigest()
+
+    @property
+    def chunk_ids(self) -> List[str]:
+        return [chunk_id for record in self.files.values() for chunk_id in record["chunks"]]
+
+    @staticmethod
+    def hash_file(file_path: str) -> str:
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    @staticmethod
+    def hash_text(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    @classmethod
+    def chunk_ids_for(cls, source: str, texts: List[str]) -> List[Tuple[str, str]]:
+        """Return ``(chunk_id, chunk_hash)`` pairs for the chunks of one file.
+
+        IDs depend only on the source name, the chunk text and how many times
+        that text already occurred in the file, so unchanged chunks keep their
+        IDs when other parts of the file are edited.
+        """
+        seen: Dict[str, int] = {}
+        pairs = []
+        for text in texts:
+            chunk_hash = cls.hash_text(text)
+            occurrence = seen.get(chunk_hash, 0)
+            seen[chunk_hash] = occurrence + 1
+            chunk_id = hashlib.sha1(
+                f"{source}:{chunk_hash}:{occurrence}".encode("utf-8")
+            ).hexdigest()
+            pairs.append((chunk_id, chunk_hash))
+        return pairs
+
+    def is_unchanged(self, source: str, file_hash: str) -> bool:
+        record = self.files.get(source)
+        return record is not None and record["hash"] == file_hash
+
+    def update_file(
+        self, source: str, file_hash: str, chunks: List[Tuple[str, str]]
+    ) -> Tuple[List[str], List[str]]:
+        """Record the new chunks of a file and return ``(added_ids, removed_ids)``."""
+        previous = self.files.get(source, {}).get("chunks", {})
+        current = dict(chunks)
+        added = [chunk_id for chunk_id in current if chunk_id not in previous]
+        removed = [chunk_id for chunk_id in previous if chunk_id not in current]
+        self.files[source] = {"hash": file_hash, "chunks": current}
+        return added, removed
+
+    def remove_file(self, source: str) -> List[str]:
+        """Forget a file and return the IDs of the chunks it contributed."""
+        record = self.files.pop(source, None)
+        return list(record["chunks"]) if record else []
+
+    def reset(self) -> None:
+        self.files = {}
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": self.VERSION, "files": self.files}, f)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,436 @@
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+import json
+import os
+import sqlite3
+import threading
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from config.settings import settings
+from utils.logging import get_logger
+from .backends import VectorBackend
+
+logger = get_logger(__name__)
+
+# Row arrays stored next to the metadata database: (file, dtype, per-row shape).
+_ARRAYS = {
+    "codes": ("codes.i8", np.int8, "dim"),
+    "vectors": ("vectors.f32", np.float32, "dim"),
+    "scales": ("scales.f32", np.float32, None),
+    "lists": ("lists.i32", np.int32, None),
+}
+
+# Inverted lists are retrained once the index has grown this much since training.
+RETRAIN_GROWTH = 4
+
+def _normalize(vectors) -> np.ndarray:
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+def quantize(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Symmetric int8 quantization with one scale per row."""
+    scales = np.maximum(np.abs(vectors).max(axis=1), 1e-12) / 127.0
+    codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+def spherical_kmeans(vectors: np.ndarray, clusters: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """Unit-length centroids maximizing the cosine similarity of their members."""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, vectors)
+        empty = np.bincount(assignment, minlength=clusters) == 0
+        # Empty clusters restart from random members.
+        sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()))]
+        centroids = _normalize(sums)
+    return centroids
+
+class QuantizedIndex:
+    """Int8-quantized vectors in memory-mapped files with an IVF index.
+
+    Vectors are L2-normalized and stored twice: as int8 codes with a scale
+    per row, which are scanned at query time, and as float32, which is only
+    read for the few candidates being re-scored exactly. Once the index holds
+    ``min_train`` vectors, spherical k-means splits it into about sqrt(n)
+    inverted lists and a query scans only the ``nprobe`` closest lists.
+    Deleted rows are tombstoned and reclaimed by ``compact``. Ids, texts and
+    metadata live in a SQLite table keyed by row.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        nprobe: Optional[int] = None,
+        rescore_factor: Optional[int] = None,
+        min_train: Optional[int] = None,
+    ):
+        self.directory = directory
+        self.nprobe = nprobe or settings.quantized_nprobe
+        self.rescore_factor = rescore_factor or settings.quantized_rescore_factor
+        self.min_train = min_train or settings.quantized_min_train
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(os.path.join(directory, "meta.sqlite"), check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS chunks (
+                row INTEGER PRIMARY KEY, id TEXT UNIQUE NOT NULL, content TEXT, metadata TEXT
+            );
+            CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT);
+        """)
+        self._db.commit()
+        self._load()
+
+    def _meta(self, name: str, default: Optional[int] = None) -> Optional[int]:
+        row = self._db.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return int(row[0]) if row else default
+
+    def _set_meta(self, **values: int) -> None:
+        self._db.executemany(
+            "INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)",
+            [(name, str(value)) for name, value in values.items()],
+        )
+
+    def _load(self) -> None:
+        self.dim = self._meta("dim")
+        self._rows = self._meta("rows", 0)
+        self._trained_at = self._meta("trained_at", 0)
+        self._live = self._db.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+        centroids_path = os.path.join(self.directory, "centroids.npy")
+        self._centroids = np.load(centroids_path) if os.path.exists(centroids_path) else None
+        self._arrays: Dict[str, np.memmap] = {}
+        self._list_order: Optional[np.ndarray] = None
+        if self.dim:
+            self._reserve(max(self._rows, 1))
+
+    def _reserve(self, min_rows: int) -> None:
+        """Grow the memory-mapped row arrays to hold at least ``min_rows`` rows."""
+        for name, (filename, dtype, width) in _ARRAYS.items():
+            path = os.path.join(self.directory, filename)
+            shape_tail = (self.dim,) if width == "dim" else ()
+            row_bytes = np.dtype(dtype).itemsize * (self.dim if width == "dim" else 1)
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+            capacity = size // row_bytes
+            if capacity < min_rows:
+                capacity = max(min_rows, capacity * 2, 1024)
+                if name in self._arrays:
+                    self._arrays.pop(name).flush()
+                with open(path, "ab") as f:
+                    f.truncate(capacity * row_bytes)
+            array = self._arrays.get(name)
+            if array is None or array.shape[0] != capacity:
+                self._arrays[name] = np.memmap(path, dtype=dtype, mode="r+", shape=(capacity,) + shape_tail)
+
+    def __len__(self) -> int:
+        return self._live
+
+    @property
+    def trained(self) -> bool:
+        return self._centroids is not None
+
+    def add(
+        self,
+        ids: Sequence[str],
+        vectors: Sequence[Sequence[float]],
+        contents: Sequence[str],
+        metadatas: Sequence[Optional[dict]],
+    ) -> None:
+        """Add or replace vectors with their ids, texts and metadata."""
+        if not ids:
+            return
+        vectors = _normalize(vectors)
+        with self._lock:
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+                self._set_meta(dim=self.dim)
+            self.delete(ids)
+            start = self._rows
+            self._reserve(start + len(ids))
+            codes, scales = quantize(vectors)
+            rows = slice(start, start + len(ids))
+            self._arrays["codes"][rows] = codes
+            self._arrays["vectors"][rows] = vectors
+            self._arrays["scales"][rows] = scales
+            self._arrays["lists"][rows] = self._assign(vectors)
+            self._db.executemany(
+                "INSERT INTO chunks (row, id, content, metadata) VALUES (?, ?, ?, ?)",
+                [
+                    (start + i, chunk_id, content, json.dumps(metadata or {}))
+                    for i, (chunk_id, content, metadata) in enumerate(zip(ids, contents, metadatas))
+                ],
+            )
+            self._rows += len(ids)
+            self._live += len(ids)
+            self._set_meta(rows=self._rows)
+            self._db.commit()
+            self._list_order = None
+            if self._live >= self.min_train and (
+                not self.trained or self._live >= RETRAIN_GROWTH * self._trained_at
+            ):
+                self.train()
+
+    def delete(self, ids: Iterable[str]) -> int:
+        """Tombstone the rows of ``ids``; returns how many existed."""
+        ids = list(ids)
+        with self._lock:
+            rows = []
+            for start in range(0, len(ids), 500):
+                batch = ids[start:start + 500]
+                rows += [row for (row,) in self._db.execute(
+                    f"SELECT row FROM chunks WHERE id IN ({','.join('?' * len(batch))})", batch
+                )]
+            if not rows:
+                return 0
+            self._arrays["lists"][rows] = -1
+            self._db.executemany("DELETE FROM chunks WHERE row = ?", [(row,) for row in rows])
+            self._db.commit()
+            self._live -= len(rows)
+            self._list_order = None
+            if self._rows > 1024 and self._live < self._rows / 2:
+                self.compact()
+            return len(rows)
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        if self._centroids is None:
+            return np.zeros(len(vectors), dtype=np.int32)
+        lists = np.empty(len(vectors), dtype=np.int32)
+        for start in range(0, len(vectors), 8192):
+            block = vectors[start:start + 8192]
+            lists[start:start + 8192] = np.argmax(block @ self._centroids.T, axis=1)
+        return lists
+
+    def train(self) -> None:
+        """Cluster the live vectors into inverted lists and reassign every row."""
+        with self._lock:
+            live = np.flatnonzero(self._arrays["lists"][:self._rows] >= 0)
+            clusters = max(1, int(np.sqrt(len(live))))
+            sample_size = min(len(live), 32 * clusters)
+            sample = np.sort(np.random.default_rng(0).choice(live, sample_size, replace=False))
+            self._centroids = spherical_kmeans(np.asarray(self._arrays["vectors"][sample]), clusters)
+            np.save(os.path.join(self.directory, "centroids.npy"), self._centroids)
+            for start in range(0, len(live), 65536):
+                rows = live[start:start + 65536]
+                self._arrays["lists"][rows] = self._assign(np.asarray(self._arrays["vectors"][rows]))
+            self._trained_at = len(live)
+            self._set_meta(trained_at=self._trained_at)
+            self._db.commit()
+            self._list_order = None
+            logger.info(f"Trained {clusters} inverted lists over {len(live)} vectors")
+
+    def compact(self) -> None:
+        """Rewrite the row arrays without deleted rows."""
+        with self._lock:
+            live = np.flatnonzero(self._arrays["lists"][:self._rows] >= 0)
+            for name in _ARRAYS:
+                array = self._arrays[name]
+                array[:len(live)] = array[live]
+                array.flush()
+            # Rows only move down, so renumbering in ascending order never collides.
+            self._db.executemany(
+                "UPDATE chunks SET row = ? WHERE row = ?",
+                [(new, int(old)) for new, old in enumerate(live) if new != old],
+            )
+            self._rows = len(live)
+            self._set_meta(rows=self._rows)
+            self._db.commit()
+            self._list_order = None
+            logger.info(f"Compacted quantized index to {self._rows} rows")
+
+    def _lists(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Rows grouped by inverted list, and each list's start offset."""
+        if self._list_order is None:
+            lists = np.asarray(self._arrays["lists"][:self._rows])
+            order = np.argsort(lists, kind="stable")
+            clusters = len(self._centroids) if self.trained else 1
+            # Tombstones (-1) sort first and fall before offset 0's boundary.
+            self._list_offsets = np.searchsorted(lists[order], np.arange(clusters + 1))
+            self._list_order = order
+        return self._list_order, self._list_offsets
+
+    def _candidates(self, query: np.ndarray) -> np.ndarray:
+        order, offsets = self._lists()
+        if not self.trained:
+            return order[offsets[0]:offsets[1]]
+        probes = np.argsort(-(self._centroids @ query))[:self.nprobe]
+        return np.concatenate([order[offsets[probe]:offsets[probe + 1]] for probe in probes])
+
+    def search(self, query: Sequence[float], k: int) -> List[Tuple[int, float]]:
+        """Return ``(row, cosine similarity)`` of the ``k`` nearest vectors."""
+        with self._lock:
+            if not self._live or self.dim is None:
+                return []
+            query = _normalize(query)[0]
+            rows = np.sort(self._candidates(query))
+            if not len(rows):
+                return []
+            codes = np.asarray(self._arrays["codes"][rows], dtype=np.float32)
+            approximate = (codes @ query) * self._arrays["scales"][rows]
+            keep = min(len(rows), k * self.rescore_factor)
+            shortlist = np.sort(rows[np.argpartition(-approximate, keep - 1)[:keep]])
+            exact = np.asarray(self._arrays["vectors"][shortlist]) @ query
+            best = np.argsort(-exact)[:k]
+            return [(int(shortlist[i]), float(exact[i])) for i in best]
+
+    def records(self, rows: Sequence[int]) -> Dict[int, Tuple[str, str, dict]]:
+        """``row -> (id, content, metadata)`` for the given rows."""
+        rows = [int(row) for row in rows]
+        if not rows:
+            return {}
+        with self._lock:
+            found = self._db.execute(
+                f"SELECT row, id, content, metadata FROM chunks WHERE row IN ({','.join('?' * len(rows))})", rows
+            ).fetchall()
+        return {row: (chunk_id, content, json.loads(metadata)) for row, chunk_id, content, metadata in found}
+
+    def get(self, ids: Optional[Sequence[str]] = None, limit: Optional[int] = None) -> List[Tuple[str, str, dict]]:
+        """``(id, content, metadata)`` of the given ids, or of every chunk, in row order."""
+        query, params = "SELECT id, content, metadata FROM chunks", []
+        if ids is not None:
+            ids = list(ids)
+            query += f" WHERE id IN ({','.join('?' * len(ids))})"
+            params = ids
+        query += " ORDER BY row"
+        if limit is not None:
+            query += f" LIMIT {int(limit)}"
+        with self._lock:
+            found = self._db.execute(query, params).fetchall()
+        return [(chunk_id, content, json.loads(metadata)) for chunk_id, content, metadata in found]
+
+    def reset(self) -> None:
+        """Delete every vector and the trained lists."""
+        with self._lock:
+            for array in self._arrays.values():
+                array.flush()
+            self._arrays = {}
+            self._db.executescript("DELETE FROM chunks; DELETE FROM meta;")
+            for filename in [entry[0] for entry in _ARRAYS.values()] + ["centroids.npy"]:
+                path = os.path.join(self.directory, filename)
+                if os.path.exists(path):
+                    os.remove(path)
+            self._load()
+
+    def memory_stats(self) -> Dict[str, float]:
+        """Bytes per vector kept in memory for search and stored on disk."""
+        dim = self.dim or 0
+        # int8 codes, scale, list id and list ordering are scanned; float32 rows are paged in for re-scoring only.
+        resident = dim + 4 + 4 + 8
+        disk = dim + 4 * dim + 4 + 4
+        return {
+            "vectors": self._live,
+            "dim": dim,
+            "lists": len(self._centroids) if self.trained else 0,
+            "resident_bytes_per_vector": resident,
+            "disk_bytes_per_vector": disk,
+            "resident_mb_per_million": resident * 1e6 / 2**20,
+            "float32_mb_per_million": 4 * dim * 1e6 / 2**20,
+        }
+
+class QuantizedVectorStore(VectorBackend):
+    """Vector store backed by a ``QuantizedIndex`` in ``persist_directory``."""
+
+    def __init__(
+        self,
+        collection_name: str,
+        embedding_function: Embeddings,
+        persist_directory: str,
+        **index_kwargs: Any,
+    ):
+        self.collection_name = collection_name
+        self._embedding_function = embedding_function
+        self.index = QuantizedIndex(os.path.join(persist_directory, f"{collection_name}.qidx"), **index_kwargs)
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding_function
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        texts = list(texts)
+        ids = list(ids) if ids else [os.urandom(16).hex() for _ in texts]
+        metadatas = metadatas or [{} for _ in texts]
+        vectors = self._embedding_function.embed_documents(texts)
+        self.index.add(ids, vectors, texts, metadatas)
+        return ids
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        if ids is None:
+            return False
+        self.index.delete(ids)
+        return True
+
+    def similarity_search_by_vector_with_score(
+        self, embedding: List[float], k: int = 4
+    ) -> List[Tuple[Document, float]]:
+        hits = self.index.search(embedding, k)
+        records = self.index.records([row for row, _ in hits])
+        results = []
+        for row, score in hits:
+            if row in records:
+                chunk_id, content, metadata = records[row]
+                results.append((Document(id=chunk_id, page_content=content, metadata=metadata), score))
+        return results
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_by_vector_with_score(self._embedding_function.embed_query(query), k)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k)]
+
+    def _select_relevance_score_fn(self):
+        return lambda score: score
+
+    def get(
+        self,
+        ids: Optional[List[str]] = None,
+        limit: Optional[int] = None,
+        include: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> Dict[str, list]:
+        records = self.index.get(ids, limit)
+        include = ["documents", "metadatas"] if include is None else include
+        result = {"ids": [chunk_id for chunk_id, _, _ in records]}
+        if "documents" in include:
+            result["documents"] = [content for _, content, _ in records]
+        if "metadatas" in include:
+            result["metadatas"] = [metadata for _, _, metadata in records]
+        return result
+
+    def count(self) -> int:
+        return len(self.index)
+
+    def reset_collection(self) -> None:
+        self.index.reset()
+
+    def memory_stats(self) -> Dict[str, float]:
+        return self.index.memory_stats()
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        collection_name: Optional[str] = None,
+        persist_directory: Optional[str] = None,
+        **kwargs: Any,
+    ) -> "QuantizedVectorStore":
+        store = cls(
+            collection_name or settings.collection_name,
+            embedding,
+            persist_directory or settings.vector_store_path,
+            **kwargs,
+        )
+        store.add_texts(texts, metadatas, ids)
+        return store
@@ -0,0 +1,102 @@
+import asyncio
+import hashlib
+from typing import Any, Dict, List, Optional
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForRetrieverRun,
+    CallbackManagerForRetrieverRun,
+)
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from config.settings import settings
+from utils.concurrency import run_in_thread
+from utils.logging import get_logger
+from utils.metrics import metrics
+from .bm25 import BM25Index
+
+logger = get_logger(__name__)
+
+def _doc_key(doc: Document) -> str:
+    return doc.id or hashlib.sha1(doc.page_content.encode("utf-8")).hexdigest()
+
+def reciprocal_rank_fusion(result_lists: List[List[Document]], k: int = 60) -> List[Document]:
+    """Merge ranked lists, scoring each document by the sum of ``1 / (k + rank)``."""
+    scores: Dict[str, float] = {}
+    docs: Dict[str, Document] = {}
+    for results in result_lists:
+        for rank, doc in enumerate(results, 1):
+            key = _doc_key(doc)
+            docs.setdefault(key, doc)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+    return [docs[key] for key in sorted(scores, key=scores.get, reverse=True)]
+
+class CrossEncoderReranker:
+    """Reorders candidates with a local sentence-transformers cross-encoder."""
+
+    def __init__(self, model_name: Optional[str] = None):
+        self.model_name = model_name or settings.reranker_model
+        self._model = None
+
+    def load(self):
+        if self._model is None:
+            from sentence_transformers import CrossEncoder
+            self._model = CrossEncoder(self.model_name)
+        return self._model
+
+    def rerank(self, query: str, docs: List[Document], top_n: int) -> List[Document]:
+        if not docs:
+            return docs
+        scores = self.load().predict([(query, doc.page_content) for doc in docs])
+        ranked = sorted(zip(docs, scores), key=lambda item: item[1], reverse=True)
+        return [doc for doc, _ in ranked[:top_n]]
+
+class HybridRetriever(BaseRetriever):
+    """Fuses vector and BM25 results with reciprocal rank fusion.
+
+    Each backend returns ``fetch_k`` candidates. The fused list is cut to
+    ``k``, optionally after a cross-encoder has reordered the top
+    ``fetch_k`` fused candidates.
+    """
+
+    vectorstore: Any
+    bm25: BM25Index
+    k: int = 4
+    fetch_k: int = 20
+    rrf_k: int = 60
+    reranker: Optional[CrossEncoderReranker] = None
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    def _fuse(self, query: str, vector_docs: List[Document], lexical_docs: List[Document]) -> List[Document]:
+        fused = reciprocal_rank_fusion([vector_docs, lexical_docs], k=self.rrf_k)
+        if self.reranker is None:
+            return fused[:self.k]
+        try:
+            with metrics.span("retrieve.rerank"):
+                return self.reranker.rerank(query, fused[:self.fetch_k], self.k)
+        except Exception as e:
+            logger.error(f"Error reranking, using fused order: {str(e)}")
+            return fused[:self.k]
+
+    def _vector(self, query: str) -> List[Document]:
+        with metrics.span("retrieve.vector"):
+            return self.vectorstore.similarity_search(query, k=self.fetch_k)
+
+    def _lexical(self, query: str) -> List[Document]:
+        with metrics.span("retrieve.bm25"):
+            return [doc for doc, _ in self.bm25.search(query, self.fetch_k)]
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        return self._fuse(query, self._vector(query), self._lexical(query))
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        vector_docs, lexical_docs = await asyncio.gather(
+            run_in_thread(self._vector, query),
+            run_in_thread(self._lexical, query),
+        )
+        return await run_in_thread(self._fuse, query, vector_docs, lexical_docs)
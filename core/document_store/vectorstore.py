@@ -1,47 +1,69 @@
-from typing import List
-from langchain_chroma import Chroma
-from langchain_huggingface import HuggingFaceEmbeddings
+from typing import List, Optional, Tuple
+import os
+import threading
 from langchain_core.documents import Document
+from langchain_core.language_models.chat_models import BaseChatModel
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.runnables import RunnablePassthrough
-from langchain_openai import ChatOpenAI
 
 from config.settings import settings
+from core.registry import registry
+from utils.concurrency import run_in_thread, run_sync
+from utils.events import ainvoke_streaming, events
 from utils.logging import get_logger
+from utils.metrics import metrics
+from .answer_cache import SemanticAnswerCache
+from .backends import create_vectorstore
+from .bm25 import BM25Index
+from .context import ContextPacker
+from .embeddings import CachedEmbeddings
 from .loader import DocumentLoader
+from .manifest import IngestionManifest
+from .retrieval import CrossEncoderReranker, HybridRetriever
 
 logger = get_logger(__name__)
 
+RAG_PROMPT = ChatPromptTemplate.from_template(
+    """Based on the provided context, please provide a clear and well-formatted answer to the question.
+Use markdown formatting for better readability.
+
+Context:
+{context}
+
+Question: {question}
+
+Answer (use markdown formatting): """
+)
+
 class VectorStoreHandler:
-    def __init__(self):
-        self.embedding_function = HuggingFaceEmbeddings(
-            model_name=settings.embedding_model
-        )
+    def __init__(
+        self,
+        embedding_function: Optional[CachedEmbeddings] = None,
+        llm: Optional[BaseChatModel] = None,
+    ):
+        self.embedding_function = embedding_function or registry.embeddings()
+        self.answer_cache = SemanticAnswerCache(self.embedding_function)
+        self.context_packer = ContextPacker() if settings.context_packing_enabled else None
         self.loader = DocumentLoader()
         self.vectorstore = None
-        self.llm = ChatOpenAI(model=settings.model_name)
+        self.bm25 = BM25Index() if settings.retriever_mode == "hybrid" else None
+        self.corpus_version = None
+        self.llm = llm or registry.chat_model()
+        self.rag_chain = RAG_PROMPT | self.llm | StrOutputParser()
         self._retriever = None
+        self._init_lock = threading.Lock()
         
     def initialize_vectorstore(self) -> None:
         try:
-            documents = self.loader.load_documents()
-            if not documents:
-                raise ValueError("No documents were loaded")
+            self.vectorstore = create_vectorstore(self.embedding_function)
             
-            splits = self.loader.split_documents(documents)
+            manifest = IngestionManifest(settings.ingestion_manifest_path)
+            self.sync_documents(manifest)
             
-            self.vectorstore = Chroma.from_documents(
-                collection_name="my_collection",
-                documents=splits,
-                embedding=self.embedding_function,
-                persist_directory=settings.vector_store_path,
-            )
+            if not manifest.files:
+                raise ValueError("No documents were loaded")
             
-            self._retriever = self.vectorstore.as_retriever(
-                search_type="similarity",
-                search_kwargs={"k": settings.retriever_k}
-            )
+            self._retriever = self._build_retriever()
             
             logger.info("Vector store initialized successfully")
             
@@ -49,66 +71,210 @@ class VectorStoreHandler:
             logger.error(f"Error initializing vector store: {str(e)}")
             raise
 
+    def _build_retriever(self):
+        if self.bm25 is None:
+            return self.vectorstore.as_retriever(
+                search_type="similarity",
+                search_kwargs={"k": settings.retriever_k}
+            )
+        return HybridRetriever(
+            vectorstore=self.vectorstore,
+            bm25=self.bm25,
+            k=settings.retriever_k,
+            fetch_k=settings.retriever_fetch_k,
+            rrf_k=settings.rrf_k,
+            reranker=CrossEncoderReranker() if settings.reranker_enabled else None,
+        )
+
+    def sync_documents(self, manifest: IngestionManifest) -> None:
+        """Bring the persisted collection in line with the documents folder.
+        
+        Only chunks from new or modified files are embedded; chunks belonging
+        to modified or deleted files, or to modified files that now fail to
+        load or yield no chunks, are removed from the collection.
+        """
+        stored = self.vectorstore.count()
+        if stored != len(manifest.chunk_ids) and (stored or manifest.exists):
+            # No manifest, or a manifest written for another collection or backend.
+            logger.warning("Vector store out of sync with the ingestion manifest, rebuilding collection")
+            self.vectorstore.reset_collection()
+            manifest.reset()
+            if self.bm25 is not None:
+                self.bm25.reset()
+        
+        sources = {}
+        for file_path in self.loader.list_document_paths():
+            sources[os.path.basename(file_path)] = file_path
+        
+        added_total, removed_total = 0, 0
+        for source in [s for s in manifest.files if s not in sources]:
+            removed_ids = manifest.remove_file(source)
+            if removed_ids:
+                self._delete_chunks(removed_ids)
+            removed_total += len(removed_ids)
+            logger.info(f"Removed {len(removed_ids)} chunks from deleted file {source}")
+        
+        changed = {}
+        for source, file_path in sources.items():
+            file_hash = IngestionManifest.hash_file(file_path)
+            if not manifest.is_unchanged(source, file_hash):
+                changed[file_path] = (source, file_hash)
+        
+        pending: List[Tuple[Document, str]] = []
+        for result in metrics.timed_iter("ingest.parse", self.loader.iter_split_files(list(changed))):
+            source, file_hash = changed[result.file_path]
+            if result.error or not result.documents:
+                # The file changed, so whatever it contributed before is stale.
+                removed_ids = manifest.remove_file(source)
+                if removed_ids:
+                    self._delete_chunks(removed_ids)
+                    removed_total += len(removed_ids)
+                    logger.info(f"Removed {len(removed_ids)} chunks from {source}, which no longer yields any")
+                continue
+            
+            chunks = IngestionManifest.chunk_ids_for(
+                source, [split.page_content for split in result.documents]
+            )
+            added_ids, removed_ids = manifest.update_file(source, file_hash, chunks)
+            
+            if removed_ids:
+                self._delete_chunks(removed_ids)
+            new_ids = set(added_ids)
+            pending.extend(
+                (split, chunk_id)
+                for split, (chunk_id, _) in zip(result.documents, chunks)
+                if chunk_id in new_ids
+            )
+            while len(pending) >= settings.loader_batch_size:
+                self._add_chunks(pending[:settings.loader_batch_size])
+                pending = pending[settings.loader_batch_size:]
+            added_total += len(new_ids)
+            removed_total += len(removed_ids)
+            logger.info(f"Ingested {source}: {len(new_ids)} new, {len(removed_ids)} removed chunks")
+        
+        if pending:
+            self._add_chunks(pending)
+        if self.loader.failures:
+            logger.warning(f"{len(self.loader.failures)} file(s) could not be ingested")
+        
+        manifest.save()
+        self._backfill_lexical_index(manifest)
+        self.corpus_version = manifest.fingerprint
+        self.answer_cache.invalidate(self.corpus_version)
+        logger.info(f"Document sync complete: {added_total} chunks embedded, {removed_total} removed")
+
+    def _add_chunks(self, chunks: List[Tuple[Document, str]]) -> None:
+        documents = [split for split, _ in chunks]
+        ids = [chunk_id for _, chunk_id in chunks]
+        with metrics.span("ingest.vector_add"):
+            self.vectorstore.add_documents(documents, ids=ids)
+        if self.bm25 is not None:
+            with metrics.span("ingest.bm25_add"):
+                self.bm25.add_documents(documents, ids)
+        metrics.increment("ingested_chunks", len(chunks))
+
+    def _delete_chunks(self, ids: List[str]) -> None:
+        self.vectorstore.delete(ids=ids)
+        if self.bm25 is not None:
+            self.bm25.delete(ids)
+
+    def _backfill_lexical_index(self, manifest: IngestionManifest) -> None:
+        """Rebuild the BM25 index from the collection if it is out of sync."""
+        if self.bm25 is None or self.bm25.count() == len(manifest.chunk_ids):
+            return
+        logger.info("Lexical index out of sync with the vector store, rebuilding it")
+        stored = self.vectorstore.get(include=["documents", "metadatas"])
+        self.bm25.reset()
+        self.bm25.add_documents(
+            [
+                Document(page_content=content, metadata=metadata or {})
+                for content, metadata in zip(stored["documents"], stored["metadatas"])
+            ],
+            stored["ids"]
+        )
+
     @property
     def retriever(self):
         if self._retriever is None:
-            self.initialize_vectorstore()
+            with self._init_lock:
+                if self._retriever is None:
+                    with metrics.span("startup.vectorstore"):
+                        self.initialize_vectorstore()
         return self._retriever
 
+    def warmup(self) -> None:
+        """Open the collection, sync documents and load the embedding model ahead of the first query."""
+        retriever = self.retriever
+        self.embedding_function.warmup()
+        reranker = getattr(retriever, "reranker", None)
+        if reranker is not None:
+            reranker.load()
+
     def _docs_to_string(self, docs: List[Document]) -> str:
         return "\n\n".join(doc.page_content for doc in docs)
 
-    def retrieve_and_generate(self, question: str) -> tuple[str, int, List[str]]:
+    def _snippets(self, docs: List[Document]) -> List[str]:
+        snippets = []
+        for doc in docs:
+            content = doc.page_content.replace('\n', ' ').strip()
+            preview = content[:200] + ('...' if len(content) > 200 else '')
+            snippets.append(preview)
+        return snippets
+
+    def _format_answer(self, answer: str, num_docs: int, snippets: List[str]) -> str:
+        formatted_answer = f"""
+{answer}
+
+---
+### Source Documents ({num_docs}):
+
+"""
+        for i, snippet in enumerate(snippets, 1):
+            formatted_answer += f"{i}. {snippet}\n\n"
+        return formatted_answer.strip()
+
+    async def aretrieve_and_generate(self, question: str) -> tuple[str, int, List[str]]:
         try:
-            if self.retriever is None:
+            retriever = await run_in_thread(lambda: self.retriever)
+            if retriever is None:
                 return "Error: Document retrieval system is not properly initialized.", 0, []
             
-            docs = self.retriever.invoke(question)
-            num_docs = len(docs)
-            
-            snippets = []
-            for doc in docs:
-                content = doc.page_content.replace('\n', ' ').strip()
-                preview = content[:200] + ('...' if len(content) > 200 else '')
-                snippets.append(preview)
+            if settings.answer_cache_enabled:
+                with metrics.span("rag.answer_cache"):
+                    cached = await run_in_thread(self.answer_cache.lookup, question)
+                if cached is not None:
+                    return cached
             
-            template = """Based on the provided context, please provide a clear and well-formatted answer to the question.
-            Use markdown formatting for better readability.
-            
-            Context:
-            {context}
-            
-            Question: {question}
-            
-            Answer (use markdown formatting): """
-            
-            prompt = ChatPromptTemplate.from_template(template)
+            with metrics.span("rag.retrieve"):
+                docs = await retriever.ainvoke(question)
+            num_docs = len(docs)
+            snippets = self._snippets(docs)
+            events.emit("retrieval", source="RAG Agent", num_docs=num_docs, snippets=snippets)
             
-            rag_chain = (
-                {
-                    "context": lambda x: self._docs_to_string(docs), 
-                    "question": RunnablePassthrough()
-                }
-                | prompt
-                | self.llm
-                | StrOutputParser()
-            )
+            if self.context_packer is not None:
+                with metrics.span("rag.pack"):
+                    context = (await run_in_thread(self.context_packer.pack, question, docs)).text
+            else:
+                context = self._docs_to_string(docs)
             
-            answer = rag_chain.invoke(question)
+            with metrics.span("rag.generate") as span:
+                answer = await ainvoke_streaming(
+                    self.rag_chain,
+                    {"context": context, "question": question},
+                    source="RAG Agent"
+                )
+                span.tokens("prompt", context + question)
+                span.tokens("completion", answer)
             
-            formatted_answer = f"""
-{answer}
-
----
-### Source Documents ({num_docs}):
-
-"""
-            for i, snippet in enumerate(snippets, 1):
-                formatted_answer += f"{i}. {snippet}\n\n"
-                
-            return formatted_answer.strip(), num_docs, snippets
+            result = (self._format_answer(answer, num_docs, snippets), num_docs, snippets)
+            if settings.answer_cache_enabled:
+                await run_in_thread(self.answer_cache.store, question, result)
+            return result
             
         except Exception as e:
             error_msg = f"Error in retrieve_and_generate: {str(e)}"
             logger.error(error_msg)
             return error_msg, 0, []
+
+    def retrieve_and_generate(self, question: str) -> tuple[str, int, List[str]]:
+        return run_sync(self.aretrieve_and_generate(question))
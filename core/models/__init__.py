@@ -0,0 +1,17 @@
+from .providers import (
+    LazyEmbeddings,
+    embedding_model_name,
+    get_async_openai_client,
+    get_chat_model,
+    get_embeddings,
+    get_openai_client,
+)
+
+__all__ = [
+    'LazyEmbeddings',
+    'embedding_model_name',
+    'get_async_openai_client',
+    'get_chat_model',
+    'get_embeddings',
+    'get_openai_client'
+]
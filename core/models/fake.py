@@ -0,0 +1,293 @@
+"""Deterministic, offline stand-ins for the chat model, embeddings and OpenAI client.
+
+Replies follow simple scripts instead of a model, so benchmarks and tests
+exercise the real chains, tools and agent hand-offs without network access
+and with repeatable timings.
+"""
+from typing import Any, AsyncIterator, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+import asyncio
+import hashlib
+import itertools
+import json
+import re
+import time
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+class ToolRule(NamedTuple):
+    """Call ``tool`` when it is available and the user's message matches ``pattern``."""
+    pattern: str
+    tool: str
+
+_DATABASE_TERMS = r"\b(sales|revenue|invoices?|albums?|artists?|tracks?|customers?|genres?|database|sql)\b"
+_DOCUMENT_TERMS = r"\b(attention|transformers?|papers?|research|llms?|encodings?)\b"
+
+# Checked in order; the first rule whose tool the agent has wins.
+DEFAULT_TOOL_RULES: List[ToolRule] = [
+    ToolRule(rf"^(?=.*{_DATABASE_TERMS})(?=.*{_DOCUMENT_TERMS})", "answer_from_sources"),
+    ToolRule(_DATABASE_TERMS, "transfer_to_sql"),
+    ToolRule(r".", "transfer_to_rag"),
+    ToolRule(r".", "generate_response"),
+    ToolRule(r".", "retrieve_and_generate"),
+]
+
+# (pattern in the question, SQL to return)
+DEFAULT_SQL_RULES: List[Tuple[str, str]] = [
+    (r"\b(sales|revenue)\b.*\bcountr", "SELECT BillingCountry, SUM(Total) AS Sales FROM Invoice GROUP BY BillingCountry ORDER BY Sales DESC LIMIT 5;"),
+    (r"\bgenres?\b", "SELECT g.Name, COUNT(*) AS Tracks FROM Track t JOIN Genre g ON g.GenreId = t.GenreId GROUP BY g.Name ORDER BY Tracks DESC LIMIT 5;"),
+    (r"\balbums?\b", "SELECT ar.Name, COUNT(*) AS Albums FROM Album al JOIN Artist ar ON ar.ArtistId = al.ArtistId GROUP BY ar.Name ORDER BY Albums DESC LIMIT 5;"),
+    (r"\bcustomers?\b", "SELECT Country, COUNT(*) AS Customers FROM Customer GROUP BY Country ORDER BY Customers DESC LIMIT 5;"),
+    (r"\b(sales|revenue|invoices?)\b", "SELECT strftime('%Y', InvoiceDate) AS Year, SUM(Total) FROM Invoice GROUP BY Year LIMIT 5;"),
+    (r".", "SELECT Name FROM Artist LIMIT 5;"),
+]
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+def _words(text: str) -> List[str]:
+    return _WORD.findall(text.lower())
+
+def fake_sql(question: str, rules: Optional[Sequence[Tuple[str, str]]] = None) -> str:
+    for pattern, sql in rules or DEFAULT_SQL_RULES:
+        if re.search(pattern, question, re.I):
+            return sql
+    return DEFAULT_SQL_RULES[-1][1]
+
+def fake_answer(prompt: str, max_words: int = 60, sql_rules: Optional[Sequence[Tuple[str, str]]] = None) -> str:
+    """Deterministic reply to a prompt built by one of the project's chains."""
+    if "SQLQuery:" in prompt:
+        # The chain appends "SQLQuery: " to the question line.
+        return fake_sql(prompt.split("SQLQuery:")[0].strip().splitlines()[-1], sql_rules)
+    match = re.search(r"Question: (.*?)\nQuery: (.*)", prompt, re.S)
+    if match:  # SQL rewrite request
+        return match.group(2).strip()
+    for marker in ("Context:", "Notes:", "Results:"):
+        if marker in prompt:
+            prompt = prompt.split(marker, 1)[1]
+            break
+    return "Based on the provided information: " + " ".join(prompt.split()[:max_words])
+
+def _sleep_for(latency: float, tokens: int, token_latency: float) -> float:
+    return latency + tokens * token_latency
+
+class HashingEmbeddings(Embeddings):
+    """Feature-hashed bag of words and word bigrams, L2-normalized.
+
+    Texts sharing words get similar vectors, so retrieval and routing behave
+    plausibly, and vectors are identical across processes and runs.
+    """
+
+    def __init__(self, size: int = 384):
+        self.size = size
+        self.model_name = f"hashing-{size}"
+
+    def _bucket(self, feature: str) -> Tuple[int, float]:
+        digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+        value = int.from_bytes(digest, "little")
+        return value % self.size, 1.0 if value >> 63 else -1.0
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.size, dtype=np.float32)
+        words = _words(text)
+        for feature in itertools.chain(words, (f"{a} {b}" for a, b in zip(words, words[1:]))):
+            index, sign = self._bucket(feature)
+            vector[index] += sign
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+class FakeChatModel(BaseChatModel):
+    """LangChain chat model that answers from scripts with simulated latency.
+
+    ``latency`` is the delay before the first token and ``token_latency``
+    the delay per streamed word, both in seconds.
+    """
+
+    latency: float = 0.0
+    token_latency: float = 0.0
+    sql_rules: Optional[List[Tuple[str, str]]] = None
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _reply(self, messages: List[BaseMessage]) -> str:
+        self.calls += 1
+        prompt = "\n".join(str(message.content) for message in messages)
+        return fake_answer(prompt, sql_rules=self.sql_rules)
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        text = self._reply(messages)
+        time.sleep(_sleep_for(self.latency, len(text.split()), self.token_latency))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        text = self._reply(messages)
+        time.sleep(self.latency)
+        for i, word in enumerate(text.split(" ")):
+            time.sleep(self.token_latency)
+            token = word if i == 0 else f" {word}"
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        text = self._reply(messages)
+        await asyncio.sleep(_sleep_for(self.latency, len(text.split()), self.token_latency))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        text = self._reply(messages)
+        await asyncio.sleep(self.latency)
+        for i, word in enumerate(text.split(" ")):
+            await asyncio.sleep(self.token_latency)
+            token = word if i == 0 else f" {word}"
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+class FakeCompletions:
+    """Scripted stand-in for ``client.chat.completions`` as used by Swarm.
+
+    A user message, or a hand-off to a new agent, produces a call to the
+    first tool allowed by ``tool_rules`` (arguments named ``question``,
+    ``query`` or ``*_question`` receive the user's message); any other tool result produces a
+    short final answer quoting it.
+    Every request is kept in ``requests`` so callers can inspect prompts.
+    """
+
+    def __init__(
+        self,
+        tool_rules: Optional[List[ToolRule]] = None,
+        latency: float = 0.0,
+        token_latency: float = 0.0,
+    ):
+        self.tool_rules = DEFAULT_TOOL_RULES if tool_rules is None else tool_rules
+        self.latency = latency
+        self.token_latency = token_latency
+        self.requests: List[Dict[str, Any]] = []
+        self._ids = itertools.count(1)
+
+    def plan(self, messages: List[dict], tools: Optional[List[dict]]) -> Tuple[str, List[Tuple[str, dict]]]:
+        """Return the reply text and tool calls for a request."""
+        last = messages[-1] if messages else {}
+        # After a hand-off the new agent picks up the user's question.
+        handed_off = last.get("role") == "tool" and str(last.get("tool_name", "")).startswith("transfer_")
+        if last.get("role") == "user" or handed_off:
+            user = next((m for m in reversed(messages) if m.get("role") == "user"), {})
+            text = user.get("content") or ""
+            available = {tool["function"]["name"]: tool["function"] for tool in tools or []}
+            for rule in self.tool_rules:
+                if rule.tool in available and re.search(rule.pattern, text, re.I):
+                    properties = available[rule.tool]["parameters"].get("properties", {})
+                    arguments = {
+                        name: text for name in properties
+                        if name in ("question", "query") or name.endswith("_question")
+                    }
+                    return "", [(rule.tool, arguments)]
+            return "I can help with questions about the documents and the music store database.", []
+        if last.get("role") == "tool":
+            result = " ".join(str(last.get("content") or "").split()[:40])
+            return f"Here is what I found: {result}", []
+        return "Done.", []
+
+    def _tool_call(self, name: str, arguments: dict) -> dict:
+        return {
+            "id": f"call_{next(self._ids)}",
+            "type": "function",
+            "function": {"name": name, "arguments": json.dumps(arguments)},
+        }
+
+    def _completion(self, model: str, content: str, tool_calls: List[Tuple[str, dict]]) -> ChatCompletion:
+        message = {"role": "assistant", "content": content or None}
+        if tool_calls:
+            message["tool_calls"] = [self._tool_call(name, args) for name, args in tool_calls]
+        return ChatCompletion.model_validate({
+            "id": f"fake-{next(self._ids)}",
+            "object": "chat.completion",
+            "created": 0,
+            "model": model,
+            "choices": [{"index": 0, "message": message, "finish_reason": "tool_calls" if tool_calls else "stop"}],
+        })
+
+    def _chunks(self, model: str, content: str, tool_calls: List[Tuple[str, dict]]) -> List[ChatCompletionChunk]:
+        deltas: List[dict] = [{"role": "assistant", "content": ""}]
+        words = content.split(" ") if content else []
+        deltas.extend({"content": word if i == 0 else f" {word}"} for i, word in enumerate(words))
+        for index, (name, arguments) in enumerate(tool_calls):
+            call = self._tool_call(name, arguments)
+            # Swarm merges one tool call per chunk, keyed by index.
+            deltas.append({"tool_calls": [{"index": index, **call}]})
+        return [
+            ChatCompletionChunk.model_validate({
+                "id": "fake-stream",
+                "object": "chat.completion.chunk",
+                "created": 0,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": None}],
+            })
+            for delta in deltas
+        ]
+
+    def _prepare(self, kwargs: dict) -> Tuple[str, str, List[Tuple[str, dict]]]:
+        self.requests.append(kwargs)
+        content, tool_calls = self.plan(kwargs.get("messages", []), kwargs.get("tools"))
+        return kwargs.get("model", "fake"), content, tool_calls
+
+    def create(self, **kwargs: Any):
+        model, content, tool_calls = self._prepare(kwargs)
+        if not kwargs.get("stream"):
+            time.sleep(_sleep_for(self.latency, len(content.split()), self.token_latency))
+            return self._completion(model, content, tool_calls)
+
+        def stream() -> Iterator[ChatCompletionChunk]:
+            time.sleep(self.latency)
+            for chunk in self._chunks(model, content, tool_calls):
+                time.sleep(self.token_latency)
+                yield chunk
+        return stream()
+
+class AsyncFakeCompletions(FakeCompletions):
+    async def create(self, **kwargs: Any):
+        model, content, tool_calls = self._prepare(kwargs)
+        if not kwargs.get("stream"):
+            await asyncio.sleep(_sleep_for(self.latency, len(content.split()), self.token_latency))
+            return self._completion(model, content, tool_calls)
+
+        async def stream() -> AsyncIterator[ChatCompletionChunk]:
+            await asyncio.sleep(self.latency)
+            for chunk in self._chunks(model, content, tool_calls):
+                await asyncio.sleep(self.token_latency)
+                yield chunk
+        return stream()
+
+class _Chat:
+    def __init__(self, completions: FakeCompletions):
+        self.completions = completions
+
+class FakeOpenAIClient:
+    """Drop-in for ``OpenAI()`` in ``Swarm(client=...)``."""
+
+    def __init__(self, **kwargs: Any):
+        self.chat = _Chat(FakeCompletions(**kwargs))
+
+    @property
+    def requests(self) -> List[Dict[str, Any]]:
+        return self.chat.completions.requests
+
+class AsyncFakeOpenAIClient(FakeOpenAIClient):
+    """Drop-in for ``AsyncOpenAI()`` in ``AsyncSwarm(client=...)``."""
+
+    def __init__(self, **kwargs: Any):
+        self.chat = _Chat(AsyncFakeCompletions(**kwargs))
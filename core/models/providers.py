@@ -0,0 +1,110 @@
+from typing import Any, Callable, List, Optional
+import threading
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+
+from config.settings import settings
+from utils.logging import get_logger
+from utils.metrics import metrics
+
+logger = get_logger(__name__)
+
+# Providers are imported lazily so the fake ones work without the real SDKs or models.
+
+def get_chat_model(**kwargs: Any) -> BaseChatModel:
+    """LangChain chat model for the configured ``model_provider``."""
+    if settings.model_provider == "fake":
+        from .fake import FakeChatModel
+        return FakeChatModel(
+            latency=settings.fake_latency_ms / 1000,
+            token_latency=settings.fake_token_latency_ms / 1000,
+        )
+    if settings.model_provider == "openai":
+        from langchain_openai import ChatOpenAI
+        return ChatOpenAI(model=settings.model_name, **kwargs)
+    raise ValueError(f"Unknown model provider: {settings.model_provider}")
+
+def get_openai_client():
+    """OpenAI-compatible client for ``Swarm``."""
+    if settings.model_provider == "fake":
+        from .fake import FakeOpenAIClient
+        return FakeOpenAIClient(
+            latency=settings.fake_latency_ms / 1000,
+            token_latency=settings.fake_token_latency_ms / 1000,
+        )
+    if settings.model_provider == "openai":
+        from openai import OpenAI
+        return OpenAI()
+    raise ValueError(f"Unknown model provider: {settings.model_provider}")
+
+def get_async_openai_client():
+    """OpenAI-compatible async client for ``AsyncSwarm``."""
+    if settings.model_provider == "fake":
+        from .fake import AsyncFakeOpenAIClient
+        return AsyncFakeOpenAIClient(
+            latency=settings.fake_latency_ms / 1000,
+            token_latency=settings.fake_token_latency_ms / 1000,
+        )
+    if settings.model_provider == "openai":
+        from openai import AsyncOpenAI
+        return AsyncOpenAI()
+    raise ValueError(f"Unknown model provider: {settings.model_provider}")
+
+class LazyEmbeddings(Embeddings):
+    """Embedding model that is only built, and its weights loaded, on first use."""
+
+    def __init__(self, factory: Callable[[], Embeddings], model_name: str):
+        self.factory = factory
+        self.model_name = model_name
+        self._model: Optional[Embeddings] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+
+    def load(self) -> Embeddings:
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    with metrics.span("startup.embedding_model"):
+                        self._model = self.factory()
+                    logger.info(f"Loaded embedding model {self.model_name}")
+        return self._model
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.load().embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.load().embed_query(text)
+
+def _build_embeddings() -> Embeddings:
+    if settings.embedding_provider == "fake":
+        from .fake import HashingEmbeddings
+        return HashingEmbeddings(settings.fake_embedding_size)
+    if settings.embedding_provider == "huggingface":
+        from langchain_huggingface import HuggingFaceEmbeddings
+        return HuggingFaceEmbeddings(
+            model_name=settings.embedding_model,
+            encode_kwargs={"batch_size": settings.embedding_batch_size}
+        )
+    raise ValueError(f"Unknown embedding provider: {settings.embedding_provider}")
+
+def embedding_model_name() -> str:
+    """Name of the configured embedding model, known without loading it."""
+    if settings.embedding_provider == "fake":
+        return f"hashing-{settings.fake_embedding_size}"
+    if settings.embedding_provider == "huggingface":
+        return settings.embedding_model
+    raise ValueError(f"Unknown embedding provider: {settings.embedding_provider}")
+
+def get_embeddings(lazy: Optional[bool] = None) -> Embeddings:
+    """Embedding model for the configured ``embedding_provider``.
+
+    The returned object has a ``model_name`` used to key the embedding cache.
+    With ``lazy`` (default: ``settings.lazy_init``) the model is loaded on
+    the first embedding call or ``load()``.
+    """
+    if settings.lazy_init if lazy is None else lazy:
+        return LazyEmbeddings(_build_embeddings, embedding_model_name())
+    return _build_embeddings()
@@ -0,0 +1,117 @@
+from collections import Counter
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple, TypeVar
+import threading
+
+from config.settings import settings
+from utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+class ResourceRegistry:
+    """Process-wide owner of the heavy objects agents and handlers share.
+
+    Each resource is built on first request and keyed by the settings it
+    depends on, so a process holds one chat model per model configuration,
+    one OpenAI client, one embedding model, one database handle per URI,
+    one vector store and one instance of each agent, however many agents
+    or sessions use them. Modules are imported inside the builders to keep
+    importing the registry cheap.
+    """
+
+    def __init__(self):
+        # Reentrant: building an agent asks the registry for its handler.
+        self._lock = threading.RLock()
+        self._resources: Dict[Tuple[str, Hashable], Any] = {}
+
+    def get(self, kind: str, key: Hashable, factory: Callable[[], T]) -> T:
+        """Return the ``kind`` resource for ``key``, building it with ``factory`` once."""
+        with self._lock:
+            resource = self._resources.get((kind, key))
+            if resource is None:
+                logger.info(f"Creating shared {kind} {key}")
+                resource = self._resources[(kind, key)] = factory()
+            return resource
+
+    def reset(self) -> None:
+        """Forget every resource, e.g. after changing the settings they were built from."""
+        with self._lock:
+            self._resources.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Number of live resources of each kind."""
+        with self._lock:
+            return dict(Counter(kind for kind, _ in self._resources))
+
+    def chat_model(self, **kwargs: Any):
+        from core.models import get_chat_model
+
+        key = (settings.model_provider, settings.model_name, tuple(sorted(kwargs.items())))
+        return self.get("chat_model", key, lambda: get_chat_model(**kwargs))
+
+    def openai_client(self):
+        """Client for ``Swarm``; one HTTP connection pool per process."""
+        from core.models import get_openai_client
+
+        return self.get("openai_client", settings.model_provider, get_openai_client)
+
+    def async_openai_client(self):
+        """Client for ``AsyncSwarm``; one HTTP connection pool per process."""
+        from core.models import get_async_openai_client
+
+        return self.get("async_openai_client", settings.model_provider, get_async_openai_client)
+
+    def embeddings(self):
+        """The embedding model, wrapped in the persistent embedding cache."""
+        from core.document_store.embeddings import CachedEmbeddings
+        from core.models import embedding_model_name, get_embeddings
+
+        def build():
+            embeddings = get_embeddings()
+            return CachedEmbeddings(embeddings, model_name=embeddings.model_name)
+
+        key = (settings.embedding_provider, embedding_model_name(), settings.embedding_cache_path)
+        return self.get("embeddings", key, build)
+
+    def sql_database(self, uri: Optional[str] = None):
+        """SQLAlchemy-backed database handle, one engine per URI."""
+        from core.sql.schema import CachedSQLDatabase
+
+        uri = uri or settings.get_database_uri()
+        return self.get("sql_database", uri, lambda: CachedSQLDatabase.from_uri(uri))
+
+    def sql_handler(self):
+        from core.sql.handler import SQLHandler
+
+        return self.get("sql_handler", settings.database_path, SQLHandler)
+
+    def vectorstore_handler(self):
+        from core.document_store.vectorstore import VectorStoreHandler
+
+        key = (settings.vector_store_path, settings.collection_name)
+        return self.get("vectorstore_handler", key, VectorStoreHandler)
+
+    def sql_agent(self):
+        from core.agents.sql_agent import SQLAgent
+
+        return self.get("agent", "sql", SQLAgent)
+
+    def rag_agent(self):
+        from core.agents.rag_agent import RAGAgent
+
+        return self.get("agent", "rag", RAGAgent)
+
+    def coordinator(self):
+        """Coordinator wired to the shared SQL and RAG agents."""
+        from core.agents.coordinator import CoordinatorAgent
+
+        def build():
+            coordinator = CoordinatorAgent()
+            coordinator.set_transfer_functions(self.sql_agent(), self.rag_agent())
+            return coordinator
+
+        return self.get("agent", "coordinator", build)
+
+# Shared by every agent, handler and interface in the process.
+registry = ResourceRegistry()
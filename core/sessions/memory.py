@@ -0,0 +1,207 @@
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+import threading
+
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+
+from config.settings import settings
+from utils.logging import get_logger
+from utils.tokens import count_message_tokens, count_tokens
+
+logger = get_logger(__name__)
+
+SUMMARY_PROMPT = ChatPromptTemplate.from_template(
+    "Condense these notes about an earlier part of a conversation into a short summary. "
+    "Keep the user's questions, the answers given, and any names, numbers or "
+    "reference IDs (like [ref:sql-3]) that later questions may refer to.\n\n"
+    "Notes:\n{notes}\n\nSummary:"
+)
+
+# Tool names whose results are kept as references, and the prefix of their IDs.
+REFERENCE_KINDS = {
+    "generate_response": "sql",
+    "retrieve_and_generate": "rag",
+}
+
+# Tool results shorter than this are kept inline.
+COMPACT_MIN_CHARS = 200
+
+def llm_summarizer() -> Callable[[str], str]:
+    """Build a summarizer backed by the configured chat model."""
+    from core.registry import registry
+
+    chain = SUMMARY_PROMPT | registry.chat_model(temperature=0) | StrOutputParser()
+    return lambda notes: chain.invoke({"notes": notes})
+
+class ConversationMemory:
+    """Token-bounded message history for one conversation.
+
+    Each turn starts with a user message and holds everything the agents
+    added while answering it. Once a turn is older than ``full_turns``, its
+    tool results (SQL rows, retrieved snippets) are replaced by short
+    ``[ref:...]`` stubs and the full text moves to ``references``. When the
+    prompt still exceeds ``max_tokens``, the oldest turns are folded into a
+    running summary, which is condensed by an LLM in a background thread.
+    """
+
+    def __init__(
+        self,
+        max_tokens: Optional[int] = None,
+        full_turns: Optional[int] = None,
+        summarizer: Optional[Callable[[str], str]] = None,
+        max_references: Optional[int] = None,
+        summarize: Optional[bool] = None,
+    ):
+        self.max_tokens = max_tokens or settings.memory_max_tokens
+        self.full_turns = settings.memory_full_turns if full_turns is None else full_turns
+        self.max_references = max_references or settings.memory_max_references
+        self.summarize = settings.memory_summarize if summarize is None else summarize
+        self.summarizer = summarizer
+        self._condensed = ""
+        self._outlines: List[Tuple[int, str]] = []
+        self._outline_count = 0
+        self.references: "OrderedDict[str, str]" = OrderedDict()
+        self.prompt_token_counts: List[int] = []
+        self._turns: List[List[dict]] = []
+        self._reference_count = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending: Optional[Future] = None
+        self._lock = threading.RLock()
+
+    @property
+    def summary(self) -> str:
+        """Condensed summary followed by outlines of turns evicted since."""
+        with self._lock:
+            return "\n".join([self._condensed] + [text for _, text in self._outlines]).strip()
+
+    @property
+    def messages(self) -> List[dict]:
+        """Messages to send with the next request."""
+        with self._lock:
+            messages = []
+            if self.summary:
+                messages.append({
+                    "role": "system",
+                    "content": f"Summary of the earlier conversation:\n{self.summary}",
+                })
+            for turn in self._turns:
+                messages.extend(turn)
+            return messages
+
+    def begin_turn(self, user_input: str) -> List[dict]:
+        """Add a user message and return the bounded prompt history."""
+        with self._lock:
+            self._turns.append([{"role": "user", "content": user_input}])
+            self._compact()
+            self._enforce_budget()
+            messages = self.messages
+            tokens = count_message_tokens(messages)
+            self.prompt_token_counts.append(tokens)
+        logger.info(
+            f"Prompt tokens for turn {len(self.prompt_token_counts)}: {tokens} "
+            f"(budget {self.max_tokens})"
+        )
+        return messages
+
+    def end_turn(self, new_messages: List[dict]) -> None:
+        """Record the messages produced while answering the current turn."""
+        with self._lock:
+            if self._turns:
+                self._turns[-1].extend(new_messages)
+
+    def reference(self, ref_id: str) -> Optional[str]:
+        """Return the full text of a compacted tool result."""
+        return self.references.get(ref_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._turns = []
+            self._condensed = ""
+            self._outlines = []
+            self.references.clear()
+            self.prompt_token_counts = []
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "turns": len(self._turns),
+                "summary_tokens": count_tokens(self.summary),
+                "references": len(self.references),
+                "prompt_tokens": list(self.prompt_token_counts),
+            }
+
+    def _compact(self) -> None:
+        # The current turn and the last ``full_turns`` completed turns stay intact.
+        for turn in self._turns[:max(len(self._turns) - 1 - self.full_turns, 0)]:
+            for i, message in enumerate(turn):
+                turn[i] = self._compact_message(message)
+
+    def _compact_message(self, message: dict) -> dict:
+        content = message.get("content") or ""
+        if message.get("role") != "tool" or content.startswith("[ref:") or len(content) < COMPACT_MIN_CHARS:
+            return message
+
+        tool_name = message.get("tool_name", "tool")
+        self._reference_count += 1
+        ref_id = f"{REFERENCE_KINDS.get(tool_name, tool_name)}-{self._reference_count}"
+        self.references[ref_id] = content
+        while len(self.references) > self.max_references:
+            self.references.popitem(last=False)
+
+        preview = content.strip().splitlines()[0][:120]
+        return {**message, "content": f"[ref:{ref_id}] {preview} ... ({len(content)} characters omitted)"}
+
+    def _enforce_budget(self) -> None:
+        evicted = False
+        while len(self._turns) > 1 and count_message_tokens(self.messages) > self.max_tokens:
+            self._outline_count += 1
+            self._outlines.append((self._outline_count, self._outline(self._turns.pop(0))))
+            evicted = True
+        if not evicted:
+            return
+
+        # Hard cap while a condensed summary is not available yet.
+        while len(self._outlines) > 1 and count_tokens(self.summary) > self.max_tokens // 4:
+            self._outlines.pop(0)
+        self._schedule_summary()
+
+    @staticmethod
+    def _outline(turn: List[dict]) -> str:
+        question = turn[0].get("content") or ""
+        answers = [m for m in turn[1:] if m.get("role") == "assistant" and m.get("content")]
+        refs = [m["content"].split("]")[0] + "]" for m in turn if (m.get("content") or "").startswith("[ref:")]
+        outline = f"- User asked: {question[:200]}"
+        if answers:
+            outline += f"\n  {answers[-1].get('sender', 'Assistant')} answered: {answers[-1]['content'][:300]}"
+        if refs:
+            outline += f" {' '.join(refs)}"
+        return outline
+
+    def _schedule_summary(self) -> None:
+        if not self.summarize or (self._pending is not None and not self._pending.done()):
+            return
+        if self.summarizer is None:
+            self.summarizer = llm_summarizer()
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="memory-summary")
+        covered = self._outline_count
+        self._pending = self._executor.submit(self.summarizer, self.summary)
+        self._pending.add_done_callback(lambda future: self._apply_summary(covered, future))
+
+    def _apply_summary(self, covered: int, future: Future) -> None:
+        try:
+            condensed = future.result().strip()
+        except Exception as e:
+            logger.error(f"Error summarizing conversation: {str(e)}")
+            return
+        if not condensed:
+            return
+        with self._lock:
+            # Outlines of turns evicted while the summary was being written are kept.
+            self._condensed = condensed
+            self._outlines = [(n, text) for n, text in self._outlines if n > covered]
+            logger.info(f"Condensed conversation summary to {count_tokens(self.summary)} tokens")
+            if self._outlines:
+                self._schedule_summary()
@@ -0,0 +1,105 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from config.settings import settings
+from utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+class SessionStore(ABC):
+    """Persists per-session conversation state (active agent name and messages)."""
+
+    @abstractmethod
+    def get(self, session_id: str) -> Optional[dict]:
+        """Return the state of a session, or None if it does not exist."""
+        pass
+
+    @abstractmethod
+    def save(self, session_id: str, state: dict) -> None:
+        """Store the state of a session."""
+        pass
+
+    @abstractmethod
+    def delete(self, session_id: str) -> None:
+        """Remove a session."""
+        pass
+
+class InMemorySessionStore(SessionStore):
+    """Process-local store that evicts the least recently used sessions."""
+
+    def __init__(self, max_sessions: Optional[int] = None):
+        self.max_sessions = max_sessions or settings.session_max_sessions
+        self._sessions: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get(self, session_id: str) -> Optional[dict]:
+        with self._lock:
+            state = self._sessions.get(session_id)
+            if state is not None:
+                self._sessions.move_to_end(session_id)
+            return state
+
+    def save(self, session_id: str, state: dict) -> None:
+        with self._lock:
+            self._sessions[session_id] = state
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                evicted, _ = self._sessions.popitem(last=False)
+                logger.info(f"Evicted session {evicted}")
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+class SQLiteSessionStore(SessionStore):
+    """Store shared by worker processes through a SQLite file."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or settings.session_store_path
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions "
+                "(session_id TEXT PRIMARY KEY, state TEXT NOT NULL, updated REAL)"
+            )
+            self._conn.commit()
+
+    def get(self, session_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT state FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save(self, session_id: str, state: dict) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sessions VALUES (?, ?, ?)",
+                (session_id, json.dumps(state), time.time()),
+            )
+            self._conn.commit()
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            self._conn.commit()
+
+def create_session_store() -> SessionStore:
+    """Build the session store selected by ``settings.session_store``."""
+    if settings.session_store == "sqlite":
+        return SQLiteSessionStore()
+    if settings.session_store != "memory":
+        raise ValueError(f"Unknown session store: {settings.session_store}")
+    return InMemorySessionStore()
@@ -0,0 +1,226 @@
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+import queue
+import re
+import sqlite3
+import threading
+import time
+
+from config.settings import settings
+from utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# String literals, quoted identifiers and comments, which may contain keywords.
+_NON_CODE = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|`[^`]*`|\[[^\]]*\]|--[^\n]*|/\*.*?\*/", re.S)
+
+class QueryResult(NamedTuple):
+    columns: List[str]
+    rows: List[tuple]
+    truncated: Optional[str]
+    elapsed: float
+
+def _top_level(sql: str) -> str:
+    """Blank out literals, comments and parenthesized parts, keeping positions."""
+    code = _NON_CODE.sub(lambda m: " " * len(m.group()), sql)
+    chars, depth = [], 0
+    for char in code:
+        if char == "(":
+            depth += 1
+        chars.append(char if depth == 0 else " ")
+        if char == ")":
+            depth = max(depth - 1, 0)
+    return "".join(chars)
+
+def apply_row_limit(sql: str, max_rows: int) -> str:
+    """Append a LIMIT to a SELECT that has none, so SQLite can stop early.
+
+    One extra row is requested to tell whether the result was cut off.
+    """
+    sql = sql.strip().rstrip(";").strip()
+    top = _top_level(sql).lower()
+    if not re.match(r"\s*(select|with|values)\b", top) or re.search(r"\blimit\b", top):
+        return sql
+    return f"{sql} LIMIT {max_rows + 1}"
+
+class ReadOnlyConnectionPool:
+    """Fixed-size pool of read-only SQLite connections.
+
+    Connections are opened with ``mode=ro`` and ``query_only``, so generated
+    SQL cannot modify the database even if it tries.
+    """
+
+    def __init__(self, database_path: str, size: int):
+        self.database_path = database_path
+        self.size = size
+        self._idle: "queue.Queue[Optional[sqlite3.Connection]]" = queue.Queue()
+        self._created = 0
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            f"file:{self.database_path}?mode=ro", uri=True, check_same_thread=False
+        )
+        conn.execute("PRAGMA query_only = ON")
+        conn.execute(f"PRAGMA mmap_size = {int(settings.sql_mmap_size)}")
+        conn.execute("PRAGMA cache_size = -16000")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        return conn
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            self._release(conn)
+
+    def _acquire(self) -> sqlite3.Connection:
+        if self._closed:
+            raise sqlite3.ProgrammingError("Connection pool is closed")
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                create = self._created < self.size
+                if create:
+                    self._created += 1
+            if create:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    # Free the slot, or waiters would block on a connection that never exists.
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                conn = self._idle.get()
+        if conn is None:
+            # close() leaves a sentinel that wakes each waiter in turn.
+            self._idle.put(None)
+            raise sqlite3.ProgrammingError("Connection pool is closed")
+        return conn
+
+    def _release(self, conn: sqlite3.Connection) -> None:
+        with self._lock:
+            if not self._closed:
+                self._idle.put(conn)
+                return
+        conn.close()
+
+    def close(self) -> None:
+        """Close idle connections now and checked-out ones as they are returned."""
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if conn is not None:
+                conn.close()
+        self._idle.put(None)
+
+class SQLExecutor:
+    """Runs generated SQL against a read-only pool with time, row and size limits.
+
+    Each statement gets a wall-clock budget enforced through SQLite's
+    progress handler, which interrupts the query mid-scan. Rows are streamed
+    from the cursor and cut off at ``max_rows`` or ``max_bytes``.
+    """
+
+    def __init__(
+        self,
+        database_path: Optional[str] = None,
+        pool_size: Optional[int] = None,
+        timeout: Optional[float] = None,
+        max_rows: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+    ):
+        self.database_path = database_path or settings.database_path
+        self.pool = ReadOnlyConnectionPool(self.database_path, pool_size or settings.sql_pool_size)
+        self.timeout = timeout or settings.sql_timeout_seconds
+        self.max_rows = max_rows or settings.sql_max_rows
+        self.max_bytes = max_bytes or settings.sql_max_bytes
+
+    def _rows(self, sql: str, parameters: Optional[Dict[str, Any]]) -> Iterator[Tuple[List[str], tuple]]:
+        limited = apply_row_limit(sql, self.max_rows)
+        with self.pool.connection() as conn:
+            deadline = time.monotonic() + self.timeout
+            conn.set_progress_handler(lambda: int(time.monotonic() > deadline), 1000)
+            cursor = conn.cursor()
+            try:
+                cursor.execute(limited, parameters or {})
+                columns = [column[0] for column in cursor.description or []]
+                for row in cursor:
+                    yield columns, row
+            except sqlite3.OperationalError as e:
+                if str(e) == "interrupted":
+                    raise sqlite3.OperationalError(
+                        f"query exceeded the {self.timeout:g}s time budget"
+                    ) from e
+                raise
+            finally:
+                cursor.close()
+                conn.set_progress_handler(None, 0)
+
+    def execute(self, sql: str, parameters: Optional[Dict[str, Any]] = None) -> QueryResult:
+        """Run a query and collect rows up to the row and size caps.
+
+        Raises ``sqlite3.Error`` for invalid SQL, write attempts and timeouts.
+        """
+        start = time.perf_counter()
+        columns: List[str] = []
+        rows: List[tuple] = []
+        size, truncated = 0, None
+        stream = self._rows(sql, parameters)
+        try:
+            for columns, row in stream:
+                if len(rows) >= self.max_rows:
+                    truncated = f"row limit of {self.max_rows} reached"
+                    break
+                size += len(repr(row))
+                if size > self.max_bytes:
+                    truncated = f"size limit of {self.max_bytes} bytes reached"
+                    break
+                rows.append(row)
+        finally:
+            stream.close()
+        return QueryResult(columns, rows, truncated, time.perf_counter() - start)
+
+    def stream(
+        self, sql: str, parameters: Optional[Dict[str, Any]] = None
+    ) -> Iterator[Tuple[List[str], tuple]]:
+        """Yield ``(columns, row)`` pairs as SQLite produces them, up to the caps.
+
+        The pooled connection is held until the iterator is exhausted or closed.
+        """
+        size = 0
+        stream = self._rows(sql, parameters)
+        try:
+            for count, (columns, row) in enumerate(stream):
+                size += len(repr(row))
+                if count >= self.max_rows or size > self.max_bytes:
+                    break
+                yield columns, row
+        finally:
+            stream.close()
+
+    def run(self, sql: str, parameters: Optional[Dict[str, Any]] = None) -> str:
+        """Execute a query and format the result for the LLM, or return ``Error: ...``."""
+        try:
+            result = self.execute(sql, parameters)
+        except sqlite3.Error as e:
+            logger.warning(f"Query failed: {str(e)}")
+            return f"Error: {str(e)}"
+        return self.format(result)
+
+    @staticmethod
+    def format(result: QueryResult) -> str:
+        if not result.rows:
+            return "No rows returned."
+        lines = [f"Columns: {', '.join(result.columns)}", str(result.rows)]
+        if result.truncated:
+            lines.append(f"(Showing the first {len(result.rows)} rows; {result.truncated}.)")
+        return "\n".join(lines)
@@ -1,36 +1,238 @@
-from typing import Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import sqlite3
+import threading
 from langchain.chains import create_sql_query_chain
-from langchain_community.tools.sql_database.tool import QuerySQLDataBaseTool
-from langchain_community.utilities import SQLDatabase
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_openai import ChatOpenAI
+from langchain_core.runnables import Runnable, RunnableLambda
 
 from config.settings import settings
+from core.registry import registry
+from utils.concurrency import run_in_thread, run_sync
+from utils.events import ainvoke_streaming, events
 from utils.logging import get_logger
+from utils.metrics import metrics
+from .executor import SQLExecutor
+from .materialize import AggregateMaterializer
+from .planner import IndexAdvisor, QueryPlan, QueryPlanner
+from .query_cache import SQLQueryCache
+from .schema import CachedSQLDatabase
+from .schema_context import SchemaSelector
 
 logger = get_logger(__name__)
 
+SQL_PROMPT = ChatPromptTemplate.from_messages([
+    (
+        "system",
+        "You are a SQLite expert. Create only the SQL query without explanation. "
+        "The query must be simple and direct, avoiding complex joins unless necessary. "
+        "Table info: {table_info}\n"
+        "Return only the top {top_k} results if the query returns multiple rows."
+    ),
+    ("human", "{input}"),
+])
+
+REWRITE_PROMPT = ChatPromptTemplate.from_messages([
+    (
+        "system",
+        "You are a SQLite expert. The query below is too expensive to run: {plan}\n"
+        "Rewrite it to answer the same question with fewer full table scans, "
+        "filtering early and joining on primary keys. Return only the SQL query.\n"
+        "Table info: {table_info}"
+    ),
+    ("human", "Question: {question}\nQuery: {query}"),
+])
+
 class SQLHandler:
-    def __init__(self):
-        self.llm = ChatOpenAI(model=settings.model_name)
-        self._db: Optional[SQLDatabase] = None
-        self._query_tool: Optional[QuerySQLDataBaseTool] = None
+    def __init__(self, llm: Optional[BaseChatModel] = None):
+        self.llm = llm or registry.chat_model()
+        self.sql_prompt = SQL_PROMPT
+        self._db: Optional[CachedSQLDatabase] = None
+        self._sql_executor: Optional[SQLExecutor] = None
+        self._write_query: Optional[Runnable] = None
+        self._rewrite_query: Optional[Runnable] = None
+        self._planner: Optional[QueryPlanner] = None
+        self._init_lock = threading.RLock()
+        self.index_advisor = IndexAdvisor()
+        self._index_lock = threading.Lock()
+        self._index_job: Optional[Future] = None
+        self._index_advice_requested = False
+        self.schema_selector = (
+            SchemaSelector(embedding_function=registry.embeddings())
+            if settings.schema_selection_enabled else None
+        )
+        self.query_cache = SQLQueryCache()
+        self.materializer = AggregateMaterializer() if settings.sql_materialize_enabled else None
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.sql_pool_size, thread_name_prefix="sql"
+        )
     
     @property
-    def db(self) -> SQLDatabase:
+    def db(self) -> CachedSQLDatabase:
         if not self._db:
             try:
-                self._db = SQLDatabase.from_uri(settings.get_database_uri())
+                self._db = registry.sql_database(settings.get_database_uri())
             except Exception as e:
                 logger.error(f"Failed to connect to database: {e}")
                 raise
         return self._db
     
     @property
-    def query_tool(self) -> QuerySQLDataBaseTool:
-        if not self._query_tool:
-            self._query_tool = QuerySQLDataBaseTool(db=self.db)
-        return self._query_tool
+    def sql_executor(self) -> SQLExecutor:
+        """Read-only, time- and size-limited pool for running generated SQL."""
+        with self._init_lock:
+            if not self._sql_executor:
+                self._sql_executor = SQLExecutor(self._query_database_path())
+            return self._sql_executor
+
+    @property
+    def planner(self) -> QueryPlanner:
+        with self._init_lock:
+            if not self._planner:
+                self._planner = QueryPlanner(self._query_database_path())
+            return self._planner
+
+    def warmup(self) -> None:
+        """Open the database, index the schema and build the query chain ahead of the first question."""
+        with metrics.span("startup.sql"):
+            self.sql_executor
+            self.planner
+            self.write_query
+            if self.schema_selector:
+                self.schema_selector.warmup()
+
+    def _query_database_path(self) -> str:
+        if settings.sql_index_advisor_apply:
+            return self.index_advisor.active_path
+        return settings.database_path
+
+    @property
+    def write_query(self) -> Runnable:
+        """Question-to-SQL chain, built once and reused for every request."""
+        if not self._write_query:
+            if self.schema_selector:
+                # Same shape as create_sql_query_chain, with a question-specific schema.
+                self._write_query = (
+                    {
+                        "input": lambda x: x["question"] + "\nSQLQuery: ",
+                        "table_info": lambda x: x.get("table_info") or self.table_info(x["question"]),
+                        "top_k": lambda x: str(settings.sql_top_k),
+                    }
+                    | self.sql_prompt
+                    | self.llm.bind(stop=["\nSQLResult:"])
+                    | StrOutputParser()
+                    | RunnableLambda(str.strip)
+                )
+            else:
+                self._write_query = create_sql_query_chain(
+                    self.llm,
+                    self.db,
+                    self.sql_prompt,
+                    k=settings.sql_top_k
+                )
+        return self._write_query
+
+    def table_info(self, question: str) -> str:
+        """Schema description for the prompt: compact and question-specific if enabled."""
+        if self.schema_selector:
+            return self.schema_selector.context(question)
+        return self.db.get_table_info()
+
+    @property
+    def rewrite_query(self) -> Runnable:
+        """Chain asking the LLM for a cheaper version of an expensive query."""
+        if not self._rewrite_query:
+            self._rewrite_query = REWRITE_PROMPT | self.llm | StrOutputParser()
+        return self._rewrite_query
+
+    def explain_query(self, query: str, parameters: Optional[Dict[str, Any]] = None) -> Optional[QueryPlan]:
+        """Estimate a query's cost and let the index advisor see its full scans."""
+        try:
+            plan = self.planner.explain(query, parameters)
+        except sqlite3.Error as e:
+            # Invalid SQL fails the same way at execution, with the error shown to the LLM.
+            logger.warning(f"Could not explain query: {str(e)}")
+            return None
+        if settings.sql_index_advisor_enabled:
+            recommended = self.index_advisor.record(plan, query, self.planner.columns)
+            if recommended and settings.sql_index_advisor_apply:
+                self._schedule_index_advice()
+        return plan
+
+    def _schedule_index_advice(self) -> None:
+        """Apply index advice in the background, one job at a time.
+
+        A recommendation made while a job runs is picked up by that job once
+        its current pass finishes.
+        """
+        with self._index_lock:
+            self._index_advice_requested = True
+            if self._index_job is None:
+                self._index_job = self._executor.submit(self._run_index_advice)
+
+    def _run_index_advice(self) -> None:
+        while True:
+            with self._index_lock:
+                if not self._index_advice_requested:
+                    self._index_job = None
+                    return
+                self._index_advice_requested = False
+            try:
+                self.apply_index_advice()
+            except Exception as e:
+                logger.warning(f"Could not apply index advice: {str(e)}")
+
+    def apply_index_advice(self) -> List[str]:
+        """Build recommended indexes in the local copy and switch queries to it."""
+        created = self.index_advisor.apply()
+        path = self.index_advisor.active_path
+        with self._init_lock:
+            if self._sql_executor and self._sql_executor.database_path != path:
+                self._sql_executor.pool.close()
+                self._sql_executor = None
+            if self._planner and self._planner.database_path != path:
+                self._planner = None
+        return created
+
+    async def _guard_plan(self, question: str, query: str, parameters: Dict[str, Any]) -> Tuple[str, Optional[str]]:
+        """Return the query to run, rewritten if needed, or an error if it is too costly."""
+        plan = await run_in_thread(self.explain_query, query, parameters, executor=self._executor)
+        if plan is None or plan.cost <= settings.sql_max_plan_cost or settings.sql_plan_guard == "off":
+            return query, None
+        logger.warning(f"Expensive query plan: {plan.describe()}")
+
+        if settings.sql_plan_guard == "rewrite":
+            table_info = await run_in_thread(self.table_info, question, executor=self._executor)
+            with metrics.span("sql.rewrite") as span:
+                rewritten = await self.rewrite_query.ainvoke({
+                    "plan": plan.describe(),
+                    "table_info": table_info,
+                    "question": question,
+                    "query": query,
+                })
+                span.tokens("prompt", table_info + query)
+                span.tokens("completion", rewritten)
+            rewritten = self.clean_sql_query(rewritten)
+            plan = await run_in_thread(self.explain_query, rewritten, parameters, executor=self._executor)
+            if plan is not None and plan.cost <= settings.sql_max_plan_cost:
+                logger.info(f"Rewrote expensive query as: {rewritten}")
+                return rewritten, None
+            query = rewritten
+
+        cost = f"{plan.cost:,.0f}" if plan else "unknown"
+        return query, f"Error: query plan too expensive (estimated cost {cost})"
+
+    def execute_query(self, query: str, parameters: Optional[Dict[str, Any]] = None) -> str:
+        """Execute a query, binding named parameters if any are given."""
+        return self.sql_executor.run(query, parameters)
+
+    def stream_query(
+        self, query: str, parameters: Optional[Dict[str, Any]] = None
+    ) -> Iterator[Tuple[List[str], tuple]]:
+        """Yield ``(columns, row)`` pairs for a query under the same limits."""
+        return self.sql_executor.stream(query, parameters)
 
     def clean_sql_query(self, markdown_query: str) -> str:
         """Clean SQL query from markdown formatting."""
@@ -46,43 +248,103 @@ class SQLHandler:
             cleaned_query += ";"
         return cleaned_query
 
-    def generate_response(self, question: str) -> str:
+    async def agenerate_response(self, question: str) -> str:
         """Generate SQL response for a given question."""
         try:
-            # Create prompt template
-            sql_prompt = ChatPromptTemplate.from_messages([
-                (
-                    "system",
-                    "You are a SQLite expert. Create only the SQL query without explanation. "
-                    "The query must be simple and direct, avoiding complex joins unless necessary. "
-                    "Table info: {table_info}\n"
-                    "Return only the top {top_k} results if the query returns multiple rows."
-                ),
-                ("human", "{input}"),
-            ])
-
-            # Create query chain
-            write_query = create_sql_query_chain(
-                self.llm,
-                self.db,
-                sql_prompt,
-                k=settings.sql_top_k
-            )
-
-            # Generate and clean query
-            query = write_query.invoke({"question": question})
-            clean_query = self.clean_sql_query(query)
+            with metrics.span("sql.schema_check"):
+                schema_version = await run_in_thread(self.db.check_schema, executor=self._executor)
+            with metrics.span("sql.cache_lookup"):
+                cached = (
+                    await run_in_thread(
+                        self.query_cache.lookup, question, schema_version, executor=self._executor
+                    )
+                    if settings.sql_cache_enabled else None
+                )
+            
+            if cached:
+                logger.info(f"Using cached SQL ({cached.source}) for question: {question}")
+                clean_query, parameters = cached.sql, cached.parameters
+            else:
+                # Generate and clean query
+                with metrics.span("sql.generate") as span:
+                    inputs = {"question": question}
+                    if self.schema_selector:
+                        # Selected once, for both the prompt and its token count.
+                        inputs["table_info"] = await run_in_thread(
+                            self.table_info, question, executor=self._executor
+                        )
+                    query = await ainvoke_streaming(self.write_query, inputs, source="SQL Agent")
+                    if metrics.enabled:
+                        table_info = inputs.get("table_info") or await run_in_thread(
+                            self.table_info, question, executor=self._executor
+                        )
+                        span.tokens("prompt", table_info + question)
+                    span.tokens("completion", query)
+                clean_query, parameters = self.clean_sql_query(query), {}
+            
+            with metrics.span("sql.materialized"):
+                materialized = (
+                    await run_in_thread(self.materializer.rewrite, clean_query, executor=self._executor)
+                    if self.materializer else None
+                )
+                result = (
+                    await run_in_thread(
+                        self.materializer.executor.run, materialized, parameters, executor=self._executor
+                    )
+                    if materialized else None
+                )
+                if result is not None and result.startswith("Error:"):
+                    logger.warning(f"Summary table query failed, querying the source instead: {result}")
+                    materialized = result = None
+            
+            # Cached queries already passed the plan guard, but still count towards index advice
+            with metrics.span("sql.plan"):
+                if materialized:
+                    logger.info(f"Answering from summary table: {materialized}")
+                    rejected = None
+                elif cached:
+                    if settings.sql_index_advisor_enabled:
+                        await run_in_thread(
+                            self.explain_query, clean_query, parameters, executor=self._executor
+                        )
+                    rejected = None
+                else:
+                    clean_query, rejected = await self._guard_plan(question, clean_query, parameters)
+            events.emit("sql_query", source="SQL Agent", query=clean_query, parameters=parameters)
             
             # Execute query
-            result = self.query_tool.invoke(clean_query)
+            with metrics.span("sql.execute"):
+                if result is None:
+                    result = rejected or await run_in_thread(
+                        self.execute_query, clean_query, parameters, executor=self._executor
+                    )
             
-            # Format response
-            response = f"""Query executed: 
-{clean_query}
-
-Results:
-{result}"""
-            return response
+            events.emit("sql_result", source="SQL Agent", result=result)
+            
+            if self.materializer and not materialized and not result.startswith("Error:"):
+                # Counted off the request path; the first summary build runs the aggregate again.
+                self._executor.submit(self.materializer.record, clean_query)
+            
+            if not cached and settings.sql_cache_enabled and not result.startswith("Error:"):
+                with metrics.span("sql.cache_store"):
+                    await run_in_thread(
+                        self.query_cache.store, question, clean_query, schema_version,
+                        executor=self._executor
+                    )
+            
+            return self._format_response(clean_query, parameters, result)
         except Exception as e:
             logger.error(f"Failed to generate SQL response: {e}")
             raise
+
+    def generate_response(self, question: str) -> str:
+        """Generate SQL response for a given question."""
+        return run_sync(self.agenerate_response(question))
+
+    def _format_response(self, query: str, parameters: Dict[str, Any], result: str) -> str:
+        bound = f"Parameters: {parameters}" if parameters else ""
+        return f"""Query executed: 
+{query}
+{bound}
+Results:
+{result}"""
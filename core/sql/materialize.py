@@ -0,0 +1,578 @@
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import zlib
+
+from config.settings import settings
+from utils.logging import get_logger
+from .executor import _NON_CODE, SQLExecutor, _top_level
+from .planner import _SQL_KEYWORDS, _TABLE_REF
+from .schema import _file_stamp
+
+logger = get_logger(__name__)
+
+SUMMARY_TABLE_PREFIX = "mv_"
+
+_CLAUSE = re.compile(r"\b(select|from|where|group\s+by|having|order\s+by|limit)\b", re.I)
+_CLAUSE_ORDER = ["select", "from", "where", "group by", "having", "order by", "limit"]
+_AGGREGATE_CALL = re.compile(r"\b(sum|total|count|avg|min|max)\s*\(", re.I)
+_UNSUPPORTED = re.compile(r"\b(union|intersect|except|with|over|distinct|window|filter)\b", re.I)
+_OUTER_JOIN = re.compile(r"\b(left|right|full|outer|natural|cross)\b", re.I)
+_PARAMETER = re.compile(r"[:@$][A-Za-z_]\w*|\?\d*")
+_COLUMN_REF = re.compile(r"^(?:[A-Za-z_]\w*\s*\.\s*)?([A-Za-z_]\w*)$")
+_ALIAS = re.compile(r"(.*?)\s+as\s+([A-Za-z_]\w*|\"[^\"]+\")$|(.*[\w)\]\"'])\s+([A-Za-z_]\w*)$", re.I | re.S)
+
+# How partial aggregates of two row sets combine.
+_MERGE = {
+    "sum": lambda a, b: b if a is None else a if b is None else a + b,
+    "min": lambda a, b: b if a is None else a if b is None else min(a, b),
+    "max": lambda a, b: b if a is None else a if b is None else max(a, b),
+}
+
+def _row_checksum(*values: Any) -> int:
+    # 32 bits, so SQLite can SUM it over any realistic table without overflowing.
+    return zlib.crc32(repr(values).encode("utf-8"))
+
+def _normalize(expr: str) -> str:
+    """Whitespace-collapsed expression, lowercased unless it contains literals."""
+    expr = " ".join(expr.split())
+    return expr if _NON_CODE.search(expr) else expr.lower()
+
+def _split_top_level(text: str) -> List[str]:
+    """Split on commas outside parentheses and literals."""
+    top = _top_level(text)
+    parts, start = [], 0
+    for match in re.finditer(",", top):
+        parts.append(text[start:match.start()].strip())
+        start = match.end()
+    parts.append(text[start:].strip())
+    return [part for part in parts if part]
+
+def _split_alias(item: str) -> Tuple[str, Optional[str]]:
+    """``(expression, alias)`` of a select item; the alias is None if there is none."""
+    match = _ALIAS.match(item.strip())
+    if not match:
+        return item.strip(), None
+    if match.group(2):
+        return match.group(1), match.group(2)
+    if match.group(4).lower() in ("end", "null", "and", "or", "not", "is", "else", "then"):
+        return item.strip(), None
+    return match.group(3), match.group(4)
+
+def _aggregate_calls(text: str) -> List[Tuple[int, int, str, str]]:
+    """``(start, end, function, argument)`` of each aggregate call in ``text``."""
+    code = _NON_CODE.sub(lambda m: " " * len(m.group()), text)
+    calls, position = [], 0
+    for match in _AGGREGATE_CALL.finditer(code):
+        if match.start() < position:
+            raise ValueError("nested aggregate")
+        depth = 0
+        for end in range(match.end() - 1, len(code)):
+            depth += {"(": 1, ")": -1}.get(code[end], 0)
+            if depth == 0:
+                break
+        else:
+            raise ValueError("unbalanced parentheses")
+        argument = text[match.end():end].strip()
+        if _split_top_level(argument) != [argument] and argument != "*":
+            # Two-argument min()/max() are scalar functions.
+            raise ValueError("multi-argument aggregate")
+        calls.append((match.start(), end + 1, match.group(1).lower(), argument))
+        position = end + 1
+    return calls
+
+class SummaryColumn(NamedTuple):
+    name: str
+    expression: str
+    merge: str
+
+class AggregateQuery:
+    """A single-level ``SELECT ... GROUP BY`` query split into the parts materialization needs.
+
+    The *shape* is the FROM, WHERE and GROUP BY clauses plus the aggregates
+    used; queries that differ only in their projection, HAVING, ORDER BY or
+    LIMIT share a shape, and so a summary table.
+    """
+
+    def __init__(self, sql: str, clauses: Dict[str, str]):
+        self.sql = sql
+        self.clauses = clauses
+        self.limit_start: Optional[int] = None
+        items = [_split_alias(item) for item in _split_top_level(clauses["select"])]
+        aliases = {alias.strip('"').lower(): expression for expression, alias in items if alias}
+        self.group_by: List[str] = []
+        for key in _split_top_level(clauses["group by"]):
+            if key.isdigit() and 0 < int(key) <= len(items):
+                key = items[int(key) - 1][0]
+            key = aliases.get(key.strip('"').lower(), key)
+            self.group_by.append(" ".join(key.split()))
+
+        aggregates: Dict[Tuple[str, str], None] = {}
+        for part in ("select", "having", "order by"):
+            for _, _, function, argument in _aggregate_calls(clauses.get(part, "")):
+                aggregates[(function, _normalize(argument))] = None
+        self.aggregates = list(aggregates)
+
+        self.key = hashlib.sha1(json.dumps(self.definition, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+        self.table = f"{SUMMARY_TABLE_PREFIX}{self.key}"
+
+    @property
+    def definition(self) -> Dict[str, Any]:
+        return {
+            "from": _normalize(self.clauses["from"]),
+            "where": _normalize(self.clauses.get("where", "")),
+            "group_by": [_normalize(key) for key in self.group_by],
+            "aggregates": self.aggregates,
+        }
+
+    def summary_columns(self) -> List[SummaryColumn]:
+        columns = [SummaryColumn(f"k{i}", key, "key") for i, key in enumerate(self.group_by)]
+        for i, (function, argument) in enumerate(self.aggregates):
+            if function == "avg":
+                columns.append(SummaryColumn(f"a{i}_sum", f"SUM({argument})", "sum"))
+                columns.append(SummaryColumn(f"a{i}_count", f"COUNT({argument})", "sum"))
+            elif function in ("min", "max"):
+                columns.append(SummaryColumn(f"a{i}", f"{function.upper()}({argument})", function))
+            else:
+                columns.append(SummaryColumn(f"a{i}", f"{function.upper()}({argument})", "sum"))
+        return columns
+
+    def _aggregate_reference(self, function: str, argument: str) -> str:
+        i = self.aggregates.index((function, _normalize(argument)))
+        if function == "avg":
+            return f"(CAST(a{i}_sum AS REAL) / NULLIF(a{i}_count, 0))"
+        return f"a{i}"
+
+    def _substitute(self, text: str) -> str:
+        """Point aggregate calls and group keys in ``text`` at summary columns."""
+        keys = sorted(enumerate(self.group_by), key=lambda item: -len(item[1]))
+
+        def replace_keys(chunk: str) -> str:
+            for i, key in keys:
+                pattern = r"\s*".join(re.escape(token) for token in key.split())
+                chunk = re.sub(rf"(?<![\w.]){pattern}(?!\w)", f"k{i}", chunk, flags=re.I)
+            return chunk
+
+        out, position = [], 0
+        for start, end, function, argument in _aggregate_calls(text):
+            out.append(replace_keys(text[position:start]))
+            out.append(self._aggregate_reference(function, argument))
+            position = end
+        out.append(replace_keys(text[position:]))
+        return "".join(out)
+
+    def rewrite(self, table: Optional[str] = None, limit: bool = True) -> str:
+        """The query, reading from the summary table instead of the source tables."""
+        items = []
+        for item in _split_top_level(self.clauses["select"]):
+            expression, alias = _split_alias(item)
+            if alias:
+                items.append(f"{self._substitute(expression)} AS {alias}")
+            else:
+                # Keep the column name SQLite gives the original expression.
+                column = _COLUMN_REF.match(item)
+                name = column.group(1) if column else item.replace('"', '""')
+                items.append(f'{self._substitute(item)} AS "{name}"')
+        sql = f"SELECT {', '.join(items)} FROM \"{table or self.table}\""
+        if self.clauses.get("having"):
+            sql += f" WHERE {self._substitute(self.clauses['having'])}"
+        if self.clauses.get("order by"):
+            sql += f" ORDER BY {self._substitute(self.clauses['order by'])}"
+        if limit and self.clauses.get("limit"):
+            sql += f" LIMIT {self.clauses['limit']}"
+        return sql
+
+    def without_limit(self) -> str:
+        return self.sql if self.limit_start is None else self.sql[:self.limit_start]
+
+    def table_references(self) -> List[Tuple[str, str]]:
+        """``(table, name used in the query)`` for each table in the FROM clause."""
+        references = []
+        for name, alias in _TABLE_REF.findall("FROM " + _NON_CODE.sub(" ", self.clauses["from"])):
+            if alias and alias.lower() not in _SQL_KEYWORDS:
+                references.append((name, alias))
+            else:
+                references.append((name, name))
+        return references
+
+    def summary_query(self, extra_where: str = "") -> str:
+        """Aggregate over the source tables at the summary table's grain."""
+        select = ", ".join(f"{column.expression} AS {column.name}" for column in self.summary_columns())
+        conditions = [f"({condition})" for condition in (self.clauses.get("where"), extra_where) if condition]
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        return f"SELECT {select} FROM {self.clauses['from']}{where} GROUP BY {', '.join(self.group_by)}"
+
+def parse_aggregate_query(sql: str) -> Optional[AggregateQuery]:
+    """Return the query's aggregate shape, or None if it cannot be materialized.
+
+    Supported: one SELECT over tables and inner joins with GROUP BY, using
+    SUM, TOTAL, COUNT, AVG, MIN and MAX, with optional WHERE (without bound
+    parameters), HAVING, ORDER BY and LIMIT.
+    """
+    sql = sql.strip().rstrip(";").strip()
+    code = _NON_CODE.sub(lambda m: " " * len(m.group()), sql)
+    if _UNSUPPORTED.search(code) or len(re.findall(r"\bselect\b", code, re.I)) != 1:
+        return None
+    matches = list(_CLAUSE.finditer(_top_level(sql)))
+    names = [" ".join(match.group(1).lower().split()) for match in matches]
+    if (
+        not names or names[0] != "select" or "from" not in names or "group by" not in names
+        or len(set(names)) != len(names) or names != sorted(names, key=_CLAUSE_ORDER.index)
+    ):
+        return None
+    clauses = {}
+    for match, name, following in zip(matches, names, matches[1:] + [None]):
+        clauses[name] = sql[match.end():following.start() if following else len(sql)].strip()
+    if any(_PARAMETER.search(_NON_CODE.sub(" ", clauses.get(part, ""))) for part in ("from", "where", "group by")):
+        return None
+    try:
+        query = AggregateQuery(sql, clauses)
+    except ValueError:
+        return None
+    if not query.aggregates:
+        return None
+    if "limit" in clauses:
+        query.limit_start = matches[names.index("limit")].start()
+    return query
+
+class AggregateMaterializer:
+    """Keeps summary tables for frequent aggregate queries in a sidecar SQLite file.
+
+    Successfully executed queries are reduced to their shape (see
+    ``AggregateQuery``) and counted. Once a shape has run ``min_hits`` times,
+    its grouped partial aggregates (sums, counts, minima and maxima; averages
+    as a sum and a count) are stored in a summary table, and the rewrite of
+    the query that triggered it is checked against the original before it is
+    used. Later queries of that shape are rewritten to read the summary
+    table, unless they select or order by a column that is neither a group
+    key nor an aggregate.
+
+    The source database is attached read-only and never modified. When its
+    file changes, summary tables are brought up to date before the next
+    rewrite. Each source table's row count and a checksum of its rows are
+    kept with its rowid watermark; if every table has only grown, with the
+    rows up to the watermark unchanged, the groups touched by the new rows
+    are merged in. Any other change (edits, deletions, schema changes, outer
+    joins) triggers a rebuild, as does ``refresh(full=True)``.
+    """
+
+    def __init__(
+        self,
+        source_path: Optional[str] = None,
+        path: Optional[str] = None,
+        min_hits: Optional[int] = None,
+    ):
+        self.source_path = source_path or settings.database_path
+        self.path = path or settings.sql_materialize_path
+        self.min_hits = min_hits or settings.sql_materialize_min_hits
+        self._conn: Optional[sqlite3.Connection] = None
+        self._executor: Optional[SQLExecutor] = None
+        self._views: Dict[str, Dict[str, Any]] = {}
+        self._stamp: Optional[Tuple] = None
+        self._lock = threading.RLock()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Opened on first use so handlers that never see an aggregate create no file.
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(f"file:{self.path}", uri=True, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.create_function("row_checksum", -1, _row_checksum, deterministic=True)
+            self._conn.execute("ATTACH DATABASE ? AS src", (f"file:{self.source_path}?mode=ro",))
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS materialized_shapes (
+                    key TEXT PRIMARY KEY,
+                    sql TEXT NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0,
+                    state TEXT NOT NULL DEFAULT 'pending',
+                    watermarks TEXT,
+                    schema_version INTEGER
+                )
+            """)
+            self._conn.commit()
+            for key, sql, hits, state, watermarks, schema_version in self._conn.execute(
+                "SELECT key, sql, hits, state, watermarks, schema_version FROM materialized_shapes"
+            ):
+                self._views[key] = {
+                    "sql": sql, "hits": hits, "state": state, "schema_version": schema_version,
+                    "watermarks": json.loads(watermarks) if watermarks else None,
+                }
+        return self._conn
+
+    @property
+    def executor(self) -> SQLExecutor:
+        """Read-only executor for rewritten queries, with the usual limits."""
+        with self._lock:
+            if self._executor is None:
+                self._connect()
+                self._executor = SQLExecutor(self.path)
+            return self._executor
+
+    def _schema_version(self) -> int:
+        return self._conn.execute("PRAGMA src.schema_version").fetchone()[0]
+
+    def _digest(self, table: str, sql: str, split: int, cache: Dict[Tuple, Tuple]) -> Tuple[List[int], List[int]]:
+        """``([rows, max rowid, checksum], [rows, checksum] up to rowid split)`` of a source table.
+
+        The checksum covers every column whose name occurs in ``sql``, so
+        edits that could change the query's result are caught as well as
+        deletions. Both digests come from one scan, cached in ``cache``.
+        """
+        text = sql.lower()
+        names = tuple(
+            column[1] for column in self._conn.execute(f'PRAGMA src.table_info("{table}")')
+            if column[1].lower() in text
+        )
+        key = (table.lower(), names, split)
+        if key not in cache:
+            columns = "".join(', "{}"'.format(name.replace('"', '""')) for name in names)
+            rows, max_rowid, checksum, below, below_checksum = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(MAX(r), 0), COALESCE(SUM(c), 0), "
+                "COALESCE(SUM(r <= :split), 0), COALESCE(SUM(CASE WHEN r <= :split THEN c END), 0) "
+                f'FROM (SELECT rowid AS r, row_checksum(rowid{columns}) AS c FROM src."{table}")',
+                {"split": split},
+            ).fetchone()
+            cache[key] = ([rows, max_rowid, checksum], [below, below_checksum])
+        return cache[key]
+
+    @staticmethod
+    def _split(view: Dict[str, Any], table: str) -> int:
+        """The rowid watermark stored for ``table``, or 0 if there is none."""
+        old = (view.get("watermarks") or {}).get(table)
+        return old[1] if old and len(old) == 3 else 0
+
+    def _watermarks(
+        self,
+        query: AggregateQuery,
+        view: Optional[Dict[str, Any]] = None,
+        cache: Optional[Dict[Tuple, Tuple]] = None,
+    ) -> Optional[Dict[str, List[int]]]:
+        """``table -> [rows, max rowid, checksum]`` of each source table, or None if incremental refresh is impossible."""
+        references = query.table_references()
+        tables = [table for table, _ in references]
+        if _OUTER_JOIN.search(_NON_CODE.sub(" ", query.clauses["from"])) or len(set(tables)) != len(tables):
+            return None
+        watermarks = {}
+        for table in tables:
+            row = self._conn.execute(
+                "SELECT type, sql FROM src.sqlite_master WHERE name = ? COLLATE NOCASE", (table,)
+            ).fetchone()
+            if not row or row[0] != "table" or "without rowid" in (row[1] or "").lower():
+                return None
+            split = self._split(view or {}, table)
+            watermarks[table] = self._digest(table, query.sql, split, {} if cache is None else cache)[0]
+        return watermarks
+
+    def record(self, sql: str) -> bool:
+        """Count an executed query's shape and materialize it once it is frequent.
+
+        Returns True if the shape has a usable summary table.
+        """
+        query = parse_aggregate_query(sql)
+        if query is None:
+            return False
+        try:
+            with self._lock:
+                conn = self._connect()
+                view = self._views.setdefault(
+                    query.key, {"sql": query.sql, "hits": 0, "state": "pending", "watermarks": None}
+                )
+                view["hits"] += 1
+                conn.execute(
+                    "INSERT INTO materialized_shapes (key, sql, hits) VALUES (?, ?, 1) "
+                    "ON CONFLICT(key) DO UPDATE SET hits = hits + 1",
+                    (query.key, query.sql),
+                )
+                conn.commit()
+                if view["state"] == "pending" and view["hits"] >= self.min_hits:
+                    self._materialize(query, view)
+                return view["state"] == "ready"
+        except sqlite3.Error as e:
+            logger.warning(f"Could not record aggregate query: {str(e)}")
+            return False
+
+    def _set_state(self, query: AggregateQuery, view: Dict[str, Any], state: str) -> None:
+        view["state"] = state
+        self._conn.execute(
+            "UPDATE materialized_shapes SET state = ?, watermarks = ?, schema_version = ? WHERE key = ?",
+            (state, json.dumps(view["watermarks"]) if view["watermarks"] else None, view.get("schema_version"), query.key),
+        )
+
+    def _build(
+        self, query: AggregateQuery, view: Dict[str, Any], watermarks: Optional[Dict[str, List[int]]] = None
+    ) -> None:
+        """(Re)create the summary table from scratch; the caller commits."""
+        columns = query.summary_columns()
+        keys = [column.name for column in columns if column.merge == "key"]
+        self._conn.execute(f'DROP TABLE IF EXISTS "{query.table}"')
+        self._conn.execute(f'CREATE TABLE "{query.table}" AS {query.summary_query()}')
+        self._conn.execute(
+            f'CREATE INDEX "{query.table}_keys" ON "{query.table}" ({", ".join(keys)})'
+        )
+        view["watermarks"] = watermarks if watermarks is not None else self._watermarks(query)
+        view["schema_version"] = self._schema_version()
+
+    def _materialize(self, query: AggregateQuery, view: Dict[str, Any]) -> None:
+        try:
+            self._conn.execute("BEGIN")
+            self._build(query, view)
+            # Results must match the original exactly, or the shape is never rewritten.
+            if not self._same_results(query.without_limit(), query.rewrite(limit=False)):
+                raise ValueError("rewritten query returns different rows")
+            self._set_state(query, view, "ready")
+            self._conn.commit()
+            logger.info(f"Materialized aggregate {query.table} for: {query.sql}")
+        except (sqlite3.Error, ValueError) as e:
+            self._conn.rollback()
+            logger.info(f"Not materializing {query.sql}: {str(e)}")
+            self._set_state(query, view, "rejected")
+            self._conn.commit()
+
+    def _same_results(self, original: str, rewritten: str) -> bool:
+        def rows(sql: str) -> Tuple[List[str], List[tuple]]:
+            cursor = self._conn.execute(sql)
+            values = [
+                tuple(round(value, 6) if isinstance(value, float) else value for value in row)
+                for row in cursor.fetchall()
+            ]
+            return [column[0] for column in cursor.description], sorted(values, key=repr)
+
+        return rows(original) == rows(rewritten)
+
+    def _merge_delta(self, query: AggregateQuery, view: Dict[str, Any], watermarks: Dict[str, List[int]]) -> int:
+        """Merge groups touched by rows past the stored watermarks into the summary table."""
+        columns = query.summary_columns()
+        keys = [column for column in columns if column.merge == "key"]
+        values = [column for column in columns if column.merge != "key"]
+        references = query.table_references()
+        merged = 0
+        # Each join row with at least one new source row is counted exactly once:
+        # by the first table (in FROM order) whose row is new.
+        for i, (table, name) in enumerate(references):
+            if watermarks[table][1] == view["watermarks"][table][1]:
+                continue
+            conditions = [f'{name}.rowid > {int(view["watermarks"][table][1])}']
+            conditions += [
+                f'{earlier}.rowid <= {int(view["watermarks"][earlier_table][1])}'
+                for earlier_table, earlier in references[:i]
+            ]
+            for row in self._conn.execute(query.summary_query(" AND ".join(conditions))).fetchall():
+                key_values, partials = row[:len(keys)], row[len(keys):]
+                where = " AND ".join(f"{column.name} IS ?" for column in keys)
+                current = self._conn.execute(
+                    f'SELECT {", ".join(column.name for column in values)} FROM "{query.table}" WHERE {where}',
+                    key_values,
+                ).fetchone()
+                if current is None:
+                    self._conn.execute(
+                        f'INSERT INTO "{query.table}" ({", ".join(column.name for column in columns)}) '
+                        f'VALUES ({", ".join("?" * len(columns))})',
+                        row,
+                    )
+                else:
+                    combined = [_MERGE[column.merge](old, new) for column, old, new in zip(values, current, partials)]
+                    self._conn.execute(
+                        f'UPDATE "{query.table}" SET {", ".join(f"{column.name} = ?" for column in values)} '
+                        f"WHERE {where}",
+                        combined + list(key_values),
+                    )
+                merged += 1
+        return merged
+
+    def _appended_only(
+        self,
+        query: AggregateQuery,
+        view: Dict[str, Any],
+        watermarks: Optional[Dict[str, List[int]]],
+        cache: Dict[Tuple, Tuple],
+    ) -> bool:
+        if not watermarks or not view["watermarks"] or set(watermarks) != set(view["watermarks"]):
+            return False
+        for table, old in view["watermarks"].items():
+            if len(old) != len(watermarks[table]) or watermarks[table][1] < old[1]:
+                return False
+            # Every row up to the old watermark must still be there, unchanged.
+            if self._digest(table, query.sql, old[1], cache)[1] != [old[0], old[2]]:
+                return False
+        return True
+
+    def refresh(self, full: bool = False) -> None:
+        """Bring every summary table up to date with the source database."""
+        with self._lock:
+            self._connect()
+            self._stamp = _file_stamp(self.source_path)
+            schema_version = self._schema_version()
+            # Views over the same tables share each table's scan.
+            digests: Dict[Tuple, Tuple] = {}
+            for key, view in self._views.items():
+                if view["state"] != "ready":
+                    continue
+                query = parse_aggregate_query(view["sql"])
+                try:
+                    self._conn.execute("BEGIN")
+                    watermarks = self._watermarks(query, view, digests)
+                    incremental = not full and schema_version == view["schema_version"]
+                    if incremental and watermarks is not None and watermarks == view["watermarks"]:
+                        self._conn.rollback()
+                        continue
+                    if incremental and self._appended_only(query, view, watermarks, digests):
+                        merged = self._merge_delta(query, view, watermarks)
+                        view["watermarks"] = watermarks
+                        logger.info(f"Refreshed {query.table} incrementally ({merged} group updates)")
+                    else:
+                        self._build(query, view, watermarks)
+                        logger.info(f"Rebuilt {query.table}")
+                    self._set_state(query, view, "ready")
+                    self._conn.commit()
+                except sqlite3.Error as e:
+                    self._conn.rollback()
+                    logger.warning(f"Dropping summary table {query.table}: {str(e)}")
+                    self._conn.execute(f'DROP TABLE IF EXISTS "{query.table}"')
+                    self._set_state(query, view, "rejected")
+                    self._conn.commit()
+
+    def rewrite(self, sql: str) -> Optional[str]:
+        """Return ``sql`` rewritten against its summary table, or None if it has none.
+
+        Summary tables are refreshed first if the source file has changed.
+        """
+        query = parse_aggregate_query(sql)
+        if query is None:
+            return None
+        try:
+            with self._lock:
+                self._connect()
+                view = self._views.get(query.key)
+                if not view or view["state"] != "ready":
+                    return None
+                if _file_stamp(self.source_path) != self._stamp:
+                    self.refresh()
+                if view["state"] != "ready" or not self._resolves(query):
+                    return None
+        except sqlite3.Error as e:
+            logger.warning(f"Summary tables unavailable, querying the source: {str(e)}")
+            return None
+        return query.rewrite()
+
+    def _resolves(self, query: AggregateQuery) -> bool:
+        """Whether the rewrite only reads group keys and aggregates the summary table stores.
+
+        Queries sharing a shape may select or order by other source columns,
+        which the summary table does not have.
+        """
+        try:
+            # Compiling is enough to resolve every column; parameters only appear as values.
+            self._conn.execute("EXPLAIN " + _PARAMETER.sub("NULL", query.rewrite(limit=False)))
+        except sqlite3.Error as e:
+            logger.info(f"Not rewriting {query.sql}: {str(e)}")
+            return False
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            states = [view["state"] for view in self._views.values()]
+        return {state: states.count(state) for state in ("pending", "ready", "rejected")}
@@ -0,0 +1,290 @@
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple
+import math
+import os
+import re
+import sqlite3
+import threading
+
+from config.settings import settings
+from utils.logging import get_logger
+from .executor import _NON_CODE
+from .schema import SchemaVersionTracker
+
+logger = get_logger(__name__)
+
+ADVISOR_INDEX_PREFIX = "advisor_"
+
+_SQL_KEYWORDS = {
+    "on", "where", "join", "inner", "left", "right", "outer", "cross", "natural", "group",
+    "order", "limit", "using", "union", "having", "as", "select", "from", "window",
+}
+_TABLE_REF = re.compile(r"(?:\bfrom\b|\bjoin\b|,)\s*([A-Za-z_]\w*)(?:\s+(?:as\s+)?([A-Za-z_]\w*))?", re.I)
+_PREDICATE_CLAUSE = re.compile(
+    r"\b(where|on|group\s+by|order\s+by|having)\b(.*?)(?=\b(?:select|from|join|inner|left|where|group\s+by|order\s+by|having|limit|union)\b|$)",
+    re.I | re.S,
+)
+
+class PlanStep(NamedTuple):
+    parent: int
+    detail: str
+    table: Optional[str]
+    access: str
+    factor: float
+
+class QueryPlan(NamedTuple):
+    steps: List[PlanStep]
+    cost: float
+
+    @property
+    def full_scans(self) -> List[str]:
+        return [step.table for step in self.steps if step.access == "scan" and step.table]
+
+    def describe(self) -> str:
+        return "; ".join(step.detail for step in self.steps) + f" (estimated cost {self.cost:,.0f})"
+
+class IndexRecommendation(NamedTuple):
+    table: str
+    key_columns: Tuple[str, ...]
+    columns: Tuple[str, ...]
+    scans: int
+
+    @property
+    def name(self) -> str:
+        return f"{ADVISOR_INDEX_PREFIX}{self.table}_{'_'.join(self.columns)}".lower()
+
+    @property
+    def ddl(self) -> str:
+        columns = ", ".join(f'"{column}"' for column in self.columns)
+        return f'CREATE INDEX IF NOT EXISTS "{self.name}" ON "{self.table}" ({columns})'
+
+def _blank_literals(sql: str) -> str:
+    # Subqueries have their own FROM clauses, so only literals and comments are blanked.
+    return _NON_CODE.sub(lambda m: " " * len(m.group()), sql)
+
+def table_aliases(sql: str, tables: Set[str]) -> Dict[str, str]:
+    """Map each name a query uses for a table (alias or table name) to the table."""
+    by_lower = {table.lower(): table for table in tables}
+    aliases = {}
+    for name, alias in _TABLE_REF.findall(_blank_literals(sql)):
+        table = by_lower.get(name.lower())
+        if table is None:
+            continue
+        aliases[table.lower()] = table
+        if alias and alias.lower() not in _SQL_KEYWORDS:
+            aliases[alias.lower()] = table
+    return aliases
+
+class QueryPlanner:
+    """Estimates query cost from ``EXPLAIN QUERY PLAN`` and table sizes.
+
+    Loops at the same level of the plan are nested, so their factors
+    multiply: a full scan costs the table's row count, an integer primary
+    key lookup ``log2(rows)`` and another index lookup ``sqrt(rows)``.
+    Subqueries add their own cost.
+    """
+
+    def __init__(self, database_path: Optional[str] = None):
+        self.database_path = database_path or settings.database_path
+        self.schema_tracker = SchemaVersionTracker(self.database_path)
+        self._conn = sqlite3.connect(
+            f"file:{self.database_path}?mode=ro", uri=True, check_same_thread=False
+        )
+        self._lock = threading.Lock()
+        self._version: Optional[int] = None
+        self._row_counts: Dict[str, int] = {}
+        self._columns: Dict[str, List[str]] = {}
+
+    def _refresh(self) -> None:
+        version = self.schema_tracker.version
+        if version == self._version:
+            return
+        tables = [
+            row[0] for row in self._conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+            )
+        ]
+        self._row_counts = {
+            table: self._conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+            for table in tables
+        }
+        self._columns = {
+            table: [row[1] for row in self._conn.execute(f'PRAGMA table_info("{table}")')]
+            for table in tables
+        }
+        self._version = version
+
+    @property
+    def columns(self) -> Dict[str, List[str]]:
+        with self._lock:
+            self._refresh()
+            return dict(self._columns)
+
+    def _step(self, parent: int, detail: str, aliases: Dict[str, str]) -> PlanStep:
+        match = re.match(r"(SCAN|SEARCH) (\S+)(.*)", detail)
+        if not match:
+            return PlanStep(parent, detail, None, "other", 1.0)
+        kind, name, rest = match.groups()
+        table = aliases.get(name.lower(), name if name in self._row_counts else None)
+        rows = max(self._row_counts.get(table, 1), 1)
+        if kind == "SEARCH":
+            lookup = math.log2(rows) + 1 if "PRIMARY KEY" in rest else math.sqrt(rows)
+            return PlanStep(parent, detail, table, "search", lookup)
+        if "COVERING INDEX" in rest:
+            return PlanStep(parent, detail, table, "index scan", rows / 2)
+        return PlanStep(parent, detail, table, "scan", rows)
+
+    def explain(self, sql: str, parameters: Optional[Dict[str, Any]] = None) -> QueryPlan:
+        """Return the plan and estimated cost; raises ``sqlite3.Error`` for invalid SQL."""
+        with self._lock:
+            self._refresh()
+            rows = self._conn.execute(
+                f"EXPLAIN QUERY PLAN {sql.strip().rstrip(';')}", parameters or {}
+            ).fetchall()
+            aliases = table_aliases(sql, set(self._row_counts))
+            steps = [self._step(parent, detail, aliases) for _, parent, _, detail in rows]
+
+        levels: Dict[int, float] = defaultdict(lambda: 1.0)
+        for step in steps:
+            if step.access != "other":
+                levels[step.parent] *= step.factor
+        return QueryPlan(steps, sum(levels.values()) if levels else 0.0)
+
+class IndexAdvisor:
+    """Tracks full table scans and recommends covering indexes for them.
+
+    Indexes are never created in the source database. When applied, they go
+    into a local copy (``copy_path``), which is refreshed from the source
+    whenever the source file changes.
+    """
+
+    def __init__(
+        self,
+        source_path: Optional[str] = None,
+        copy_path: Optional[str] = None,
+        min_scans: Optional[int] = None,
+    ):
+        self.source_path = source_path or settings.database_path
+        self.copy_path = copy_path or settings.sql_local_copy_path
+        self.min_scans = min_scans or settings.sql_index_advisor_min_scans
+        self._scans: Counter = Counter()
+        self._applied: Set[str] = set()
+        self._lock = threading.Lock()
+        # Serializes writers of the local copy.
+        self._apply_lock = threading.Lock()
+
+    def record(self, plan: QueryPlan, sql: str, columns: Dict[str, List[str]]) -> bool:
+        """Count the predicate and used columns of each fully scanned table.
+
+        Returns True when this made a new index recommendation.
+        """
+        recommended = False
+        code = _blank_literals(sql)
+        aliases = table_aliases(sql, set(columns))
+        predicate_text = " ".join(match.group(2) for match in _PREDICATE_CLAUSE.finditer(code))
+
+        for table in set(plan.full_scans):
+            names = {name for name, target in aliases.items() if target == table}
+            table_columns = {column.lower(): column for column in columns.get(table, [])}
+            key = self._referenced(predicate_text, names, table_columns, aliases)
+            used = self._referenced(code, names, table_columns, aliases)
+            if not key:
+                continue
+            covering = tuple(key + [column for column in used if column not in key])
+            with self._lock:
+                self._scans[(table, tuple(key), covering)] += 1
+                count = self._scans[(table, tuple(key), covering)]
+            logger.info(f"Full scan of {table} filtering on {', '.join(key)} (seen {count} times)")
+            if count == self.min_scans:
+                recommendation = IndexRecommendation(table, tuple(key), covering, count)
+                logger.info(f"Recommended index: {recommendation.ddl}")
+                recommended = True
+        return recommended
+
+    @staticmethod
+    def _referenced(text: str, names: Set[str], table_columns: Dict[str, str], aliases: Dict[str, str]) -> List[str]:
+        found = []
+        for qualifier, column in re.findall(r"(?:\b([A-Za-z_]\w*)\s*\.\s*)?\b([A-Za-z_]\w*)\b", text):
+            if column.lower() not in table_columns:
+                continue
+            # Unqualified names are attributed to this table; qualified ones must name it.
+            if qualifier and qualifier.lower() not in names and qualifier.lower() in aliases:
+                continue
+            name = table_columns[column.lower()]
+            if name not in found:
+                found.append(name)
+        return found
+
+    def recommendations(self) -> List[IndexRecommendation]:
+        with self._lock:
+            return [
+                IndexRecommendation(table, key, covering, count)
+                for (table, key, covering), count in self._scans.most_common()
+                if count >= self.min_scans
+            ]
+
+    def _copy_is_fresh(self) -> bool:
+        return (
+            os.path.exists(self.copy_path)
+            and os.path.getmtime(self.copy_path) >= os.path.getmtime(self.source_path)
+        )
+
+    @property
+    def active_path(self) -> str:
+        """Database to query: the indexed copy if it is current, else the source."""
+        return self.copy_path if self._copy_is_fresh() else self.source_path
+
+    def apply(self) -> List[str]:
+        """Create recommended indexes in the local copy; return the new index names."""
+        with self._apply_lock:
+            return self._apply()
+
+    def _apply(self) -> List[str]:
+        pending = [rec for rec in self.recommendations() if rec.name not in self._applied]
+        if not pending and self._copy_is_fresh():
+            return []
+
+        previous = []
+        if os.path.exists(self.copy_path):
+            conn = sqlite3.connect(self.copy_path)
+            try:
+                previous = [
+                    row[0] for row in conn.execute(
+                        "SELECT sql FROM sqlite_master WHERE type = 'index' AND name LIKE ?",
+                        (f"{ADVISOR_INDEX_PREFIX}%",),
+                    )
+                ]
+            finally:
+                conn.close()
+
+        if not self._copy_is_fresh():
+            logger.info(f"Refreshing local database copy at {self.copy_path}")
+            os.makedirs(os.path.dirname(self.copy_path) or ".", exist_ok=True)
+            source = sqlite3.connect(f"file:{self.source_path}?mode=ro", uri=True)
+            target = sqlite3.connect(self.copy_path)
+            try:
+                source.backup(target)
+            finally:
+                source.close()
+                target.close()
+
+        conn = sqlite3.connect(self.copy_path)
+        try:
+            if settings.sql_enable_wal:
+                # WAL lets queries read the copy while it is being re-indexed.
+                conn.execute("PRAGMA journal_mode=WAL")
+            for ddl in previous:
+                conn.execute(ddl.replace("CREATE INDEX", "CREATE INDEX IF NOT EXISTS", 1))
+            for rec in pending:
+                conn.execute(rec.ddl)
+                logger.info(f"Created covering index {rec.name} on {rec.table} ({', '.join(rec.columns)})")
+            conn.execute("ANALYZE")
+            conn.commit()
+        finally:
+            conn.close()
+        # The backup may share the source's mtime; make the copy visibly newer.
+        os.utime(self.copy_path)
+
+        with self._lock:
+            self._applied.update(rec.name for rec in pending)
+        return [rec.name for rec in pending]
@@ -0,0 +1,210 @@
+from itertools import product
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from config.settings import settings
+from utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+MAX_TEMPLATE_LITERALS = 4
+PLACEHOLDER = "{}"
+
+_QUOTED = re.compile(r"'([^']+)'|\"([^\"]+)\"")
+_TOKEN = re.compile(r"\S+")
+_NUMBER = re.compile(r"^\d+(?:\.\d+)?$")
+_EDGE_PUNCTUATION = "?!.,;:()"
+
+class CachedQuery(NamedTuple):
+    sql: str
+    parameters: Dict[str, Any]
+    source: str
+
+def normalize_question(question: str) -> str:
+    """Lowercase, collapse whitespace and drop trailing punctuation."""
+    return " ".join(question.lower().split()).rstrip(_EDGE_PUNCTUATION + " ")
+
+def extract_literals(question: str) -> List[str]:
+    """Find the values in a question that are likely to vary between askings.
+
+    Quoted strings, numbers and runs of capitalized words (other than the
+    first word of the question) are treated as literals, e.g. ``AC/DC`` in
+    "top albums by AC/DC" or ``Led Zeppelin`` in "tracks by Led Zeppelin".
+    """
+    found: List[Tuple[int, str]] = [
+        (match.start(), match.group(1) or match.group(2)) for match in _QUOTED.finditer(question)
+    ]
+    unquoted = _QUOTED.sub(lambda match: " " * len(match.group()), question)
+
+    run: List[Tuple[int, str]] = []
+    for position, match in enumerate(_TOKEN.finditer(unquoted)):
+        token = match.group().strip(_EDGE_PUNCTUATION)
+        if position > 0 and token and token[0].isupper() and not _NUMBER.match(token):
+            run.append((match.start(), token))
+            continue
+        if run:
+            found.append((run[0][0], " ".join(part for _, part in run)))
+            run = []
+        if _NUMBER.match(token):
+            found.append((match.start(), token))
+    if run:
+        found.append((run[0][0], " ".join(part for _, part in run)))
+    # Keep question order so placeholder positions line up with parameters.
+    literals = [literal for _, literal in sorted(found)]
+    return literals[:MAX_TEMPLATE_LITERALS]
+
+def _template_for(question: str, literals: List[str]) -> str:
+    template = question
+    for literal in literals:
+        template = re.sub(
+            rf"(?<![\w/])(['\"]?){re.escape(literal)}\1(?![\w/])", PLACEHOLDER, template, count=1
+        )
+    return normalize_question(template)
+
+def _coerce(literal: str) -> Any:
+    if _NUMBER.match(literal):
+        return float(literal) if "." in literal else int(literal)
+    return literal
+
+def parameterize_sql(sql: str, literals: List[str]) -> Tuple[str, List[str]]:
+    """Replace literals found in ``sql`` with named parameters.
+
+    Returns the rewritten SQL and the literals that were bound, in parameter
+    order (``:p0``, ``:p1``, ...).
+    """
+    bound: List[str] = []
+    for literal in literals:
+        name = f":p{len(bound)}"
+        escaped = re.escape(literal.replace("'", "''"))
+        patterns = [
+            (rf"'%{escaped}%'", f"'%' || {name} || '%'"),
+            (rf"'{escaped}'", name),
+        ]
+        if _NUMBER.match(literal):
+            patterns.append((rf"(?<![\w.':]){escaped}(?![\w.'])", name))
+        for pattern, replacement in patterns:
+            rewritten, count = re.subn(pattern, replacement, sql, flags=re.IGNORECASE)
+            if count:
+                sql = rewritten
+                bound.append(literal)
+                break
+    return sql, bound
+
+class SQLQueryCache:
+    """Persistent cache from questions to validated SQL.
+
+    Exact questions map directly to their SQL. Questions whose literals appear
+    in the generated SQL also produce a parameterized template, so a question
+    of the same shape with different values reuses the query with new bound
+    parameters. Entries are tagged with the schema version of the database
+    they were generated against and purged when it changes.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or settings.sql_cache_path
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._schema_version: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        with self._lock:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS questions (
+                    question TEXT PRIMARY KEY, sql TEXT NOT NULL,
+                    schema_version INTEGER NOT NULL, hits INTEGER DEFAULT 0, created REAL
+                );
+                CREATE TABLE IF NOT EXISTS templates (
+                    template TEXT PRIMARY KEY, sql TEXT NOT NULL,
+                    schema_version INTEGER NOT NULL, hits INTEGER DEFAULT 0, created REAL
+                );
+            """)
+            self._conn.commit()
+
+    def _check_version(self, schema_version: int) -> None:
+        if schema_version == self._schema_version:
+            return
+        removed = 0
+        for table in ("questions", "templates"):
+            removed += self._conn.execute(
+                f"DELETE FROM {table} WHERE schema_version != ?", (schema_version,)
+            ).rowcount
+        self._conn.commit()
+        if removed:
+            logger.info(f"Schema changed, invalidated {removed} cached SQL entries")
+        self._schema_version = schema_version
+
+    def lookup(self, question: str, schema_version: int) -> Optional[CachedQuery]:
+        """Return cached SQL for the question, or None if the LLM must be asked."""
+        normalized = normalize_question(question)
+        literals = extract_literals(question)
+        with self._lock:
+            self._check_version(schema_version)
+            row = self._conn.execute(
+                "SELECT sql FROM questions WHERE question = ?", (normalized,)
+            ).fetchone()
+            if row:
+                self._conn.execute(
+                    "UPDATE questions SET hits = hits + 1 WHERE question = ?", (normalized,)
+                )
+                self._conn.commit()
+                self.hits += 1
+                return CachedQuery(row[0], {}, "exact")
+
+            # Any subset of the literals may have been bound in a stored template.
+            candidates = {}
+            for mask in product((True, False), repeat=len(literals)):
+                used = [literal for literal, keep in zip(literals, mask) if keep]
+                if used:
+                    candidates[_template_for(question, used)] = used
+            if candidates:
+                placeholders = ",".join("?" * len(candidates))
+                row = self._conn.execute(
+                    f"SELECT template, sql FROM templates WHERE template IN ({placeholders}) "
+                    "ORDER BY hits DESC LIMIT 1",
+                    list(candidates),
+                ).fetchone()
+                if row:
+                    self._conn.execute(
+                        "UPDATE templates SET hits = hits + 1 WHERE template = ?", (row[0],)
+                    )
+                    self._conn.commit()
+                    self.hits += 1
+                    parameters = {
+                        f"p{i}": _coerce(literal) for i, literal in enumerate(candidates[row[0]])
+                    }
+                    return CachedQuery(row[1], parameters, "template")
+
+            self.misses += 1
+            return None
+
+    def store(self, question: str, sql: str, schema_version: int) -> None:
+        """Remember SQL that was generated for a question and executed successfully."""
+        now = time.time()
+        template_sql, bound = parameterize_sql(sql, extract_literals(question))
+        with self._lock:
+            self._check_version(schema_version)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO questions (question, sql, schema_version, created) "
+                "VALUES (?, ?, ?, ?)",
+                (normalize_question(question), sql, schema_version, now),
+            )
+            if bound:
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO templates (template, sql, schema_version, created) "
+                    "VALUES (?, ?, ?, ?)",
+                    (_template_for(question, bound), template_sql, schema_version, now),
+                )
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
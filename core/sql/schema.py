@@ -0,0 +1,94 @@
+from typing import Dict, List, Optional, Tuple
+import os
+import sqlite3
+import threading
+from langchain_community.utilities import SQLDatabase
+from sqlalchemy import MetaData, inspect
+
+from utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+def _file_stamp(database_path: str) -> Tuple:
+    """Cheap change marker for a SQLite file, including its WAL sidecar."""
+    stamp = []
+    for path in (database_path, f"{database_path}-wal"):
+        try:
+            stat = os.stat(path)
+            stamp.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            stamp.append(None)
+    return tuple(stamp)
+
+def read_schema_version(database_path: str) -> int:
+    """Return SQLite's ``PRAGMA schema_version`` for a database file."""
+    conn = sqlite3.connect(f"file:{database_path}?mode=ro", uri=True)
+    try:
+        return conn.execute("PRAGMA schema_version").fetchone()[0]
+    finally:
+        conn.close()
+
+class SchemaVersionTracker:
+    """Reports a SQLite file's schema version, re-reading it only when the file changes."""
+
+    def __init__(self, database_path: str):
+        self.database_path = database_path
+        self._stamp: Optional[Tuple] = None
+        self._version: Optional[int] = None
+        self._lock = threading.Lock()
+
+    @property
+    def version(self) -> int:
+        stamp = _file_stamp(self.database_path)
+        with self._lock:
+            if stamp != self._stamp or self._version is None:
+                self._version = read_schema_version(self.database_path)
+                self._stamp = stamp
+            return self._version
+
+class CachedSQLDatabase(SQLDatabase):
+    """SQLDatabase that caches reflected table info until the schema changes."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.schema_tracker = SchemaVersionTracker(self._engine.url.database)
+        self._table_info_cache: Dict[Tuple, str] = {}
+        self._cached_version: Optional[int] = self.schema_tracker.version
+
+    def refresh_schema(self) -> None:
+        """Re-reflect tables after the schema of the underlying file has changed."""
+        inspector = inspect(self._engine)
+        self._all_tables = set(
+            inspector.get_table_names(schema=self._schema)
+            + (inspector.get_view_names(schema=self._schema) if self._view_support else [])
+        )
+        usable_tables = self.get_usable_table_names()
+        self._usable_tables = set(usable_tables) if usable_tables else self._all_tables
+        self._metadata = MetaData()
+        self._metadata.reflect(
+            views=self._view_support,
+            bind=self._engine,
+            only=list(self._usable_tables),
+            schema=self._schema,
+        )
+        self._table_info_cache.clear()
+
+    def check_schema(self) -> int:
+        """Return the current schema version, refreshing cached info if it changed."""
+        version = self.schema_tracker.version
+        if version != self._cached_version:
+            logger.info(f"Database schema changed (version {version}), refreshing table info")
+            self.refresh_schema()
+            self._cached_version = version
+        return version
+
+    def get_table_info(
+        self, table_names: Optional[List[str]] = None, get_col_comments: bool = False
+    ) -> str:
+        self.check_schema()
+        key = (tuple(sorted(table_names)) if table_names else None, get_col_comments)
+        if key not in self._table_info_cache:
+            self._table_info_cache[key] = super().get_table_info(
+                table_names=table_names, get_col_comments=get_col_comments
+            )
+        return self._table_info_cache[key]
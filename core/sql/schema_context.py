@@ -0,0 +1,253 @@
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+import re
+import sqlite3
+import threading
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from config.settings import settings
+from utils.logging import get_logger
+from utils.tokens import count_tokens
+from .schema import SchemaVersionTracker
+
+logger = get_logger(__name__)
+
+_IDENTIFIER_PART = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+_WORD = re.compile(r"[a-z0-9]+")
+
+def split_identifier(name: str) -> List[str]:
+    """Split ``BillingCountry`` or ``billing_country`` into lowercase words."""
+    return [part.lower() for part in _IDENTIFIER_PART.findall(name)]
+
+def _stem(word: str) -> str:
+    return word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word
+
+class ColumnInfo(NamedTuple):
+    name: str
+    type: str
+    primary_key: bool
+    references: Optional[str]
+
+class TableInfo(NamedTuple):
+    name: str
+    columns: List[ColumnInfo]
+    rows: int
+
+    @property
+    def description(self) -> str:
+        names = ", ".join(" ".join(split_identifier(column.name)) for column in self.columns)
+        return f"{' '.join(split_identifier(self.name))} table with columns {names}"
+
+    def render(self, columns: List[ColumnInfo]) -> str:
+        parts = []
+        for column in columns:
+            text = f"{column.name} {column.type}".strip()
+            if column.primary_key:
+                text += " PK"
+            if column.references:
+                text += f" -> {column.references}"
+            parts.append(text)
+        return f"{self.name}({', '.join(parts)}) -- {self.rows} rows"
+
+def read_tables(database_path: str) -> Dict[str, TableInfo]:
+    """Read tables, column types, primary keys and foreign keys from SQLite."""
+    conn = sqlite3.connect(f"file:{database_path}?mode=ro", uri=True)
+    try:
+        names = [
+            row[0] for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' "
+                "ORDER BY name"
+            )
+        ]
+        tables = {}
+        for name in names:
+            references = {
+                row[3]: f"{row[2]}.{row[4] or row[3]}"
+                for row in conn.execute(f'PRAGMA foreign_key_list("{name}")')
+            }
+            columns = [
+                ColumnInfo(row[1], row[2] or "", bool(row[5]), references.get(row[1]))
+                for row in conn.execute(f'PRAGMA table_info("{name}")')
+            ]
+            rows = conn.execute(f'SELECT COUNT(*) FROM "{name}"').fetchone()[0]
+            tables[name] = TableInfo(name, columns, rows)
+        return tables
+    finally:
+        conn.close()
+
+class SchemaSelector:
+    """Builds a compact, question-specific schema for the SQL prompt.
+
+    Table and column descriptions are embedded once per schema version. For
+    each question the best matching tables are kept, plus any table needed
+    to join them through foreign keys, and rendered one line per table
+    within ``max_tokens``. Without an embedding function, tables are scored
+    by word overlap with their table and column names.
+    """
+
+    def __init__(
+        self,
+        database_path: Optional[str] = None,
+        embedding_function: Optional[Embeddings] = None,
+        max_tables: Optional[int] = None,
+        max_tokens: Optional[int] = None,
+        cache_size: Optional[int] = None,
+    ):
+        self.database_path = database_path or settings.database_path
+        self.embedding_function = embedding_function
+        self.max_tables = max_tables or settings.schema_max_tables
+        self.max_tokens = max_tokens or settings.schema_max_tokens
+        self.cache_size = cache_size or settings.schema_cache_size
+        self.schema_tracker = SchemaVersionTracker(self.database_path)
+        self._version: Optional[int] = None
+        self._tables: Dict[str, TableInfo] = {}
+        self._table_vectors: Optional[np.ndarray] = None
+        self._column_vectors: Dict[str, np.ndarray] = {}
+        self._contexts: "OrderedDict[Tuple[int, str], str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def set_embedding_function(self, embedding_function: Optional[Embeddings]) -> None:
+        with self._lock:
+            self.embedding_function = embedding_function
+            self._version = None
+            self._contexts.clear()
+
+    def warmup(self) -> None:
+        """Read and embed the schema now rather than on the first question."""
+        with self._lock:
+            self._refresh()
+
+    @staticmethod
+    def _normalize(vectors) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def _refresh(self) -> int:
+        version = self.schema_tracker.version
+        if version == self._version:
+            return version
+        logger.info(f"Indexing schema (version {version}) for table selection")
+        self._tables = read_tables(self.database_path)
+        self._contexts.clear()
+        self._table_vectors, self._column_vectors = None, {}
+        if self.embedding_function is not None and self._tables:
+            tables = list(self._tables.values())
+            texts = [table.description for table in tables]
+            for table in tables:
+                texts.extend(
+                    f"{' '.join(split_identifier(column.name))} of {' '.join(split_identifier(table.name))}"
+                    for column in table.columns
+                )
+            vectors = self._normalize(self.embedding_function.embed_documents(texts))
+            self._table_vectors, offset = vectors[:len(tables)], len(tables)
+            for table in tables:
+                self._column_vectors[table.name] = vectors[offset:offset + len(table.columns)]
+                offset += len(table.columns)
+        self._version = version
+        return version
+
+    def _lexical_scores(self, question: str) -> Dict[str, Tuple[float, List[float]]]:
+        words = {_stem(word) for word in _WORD.findall(question.lower())}
+        scores = {}
+        for table in self._tables.values():
+            table_words = {_stem(word) for word in split_identifier(table.name)}
+            column_scores = []
+            for column in table.columns:
+                column_words = {_stem(word) for word in split_identifier(column.name)}
+                column_scores.append(len(column_words & words) / len(column_words) if column_words else 0.0)
+            table_score = len(table_words & words) / len(table_words) if table_words else 0.0
+            scores[table.name] = (table_score, column_scores)
+        return scores
+
+    def _embedding_scores(self, question: str) -> Dict[str, Tuple[float, List[float]]]:
+        query = self._normalize(self.embedding_function.embed_query(question))
+        table_scores = self._table_vectors @ query
+        return {
+            name: (float(table_scores[i]), (self._column_vectors[name] @ query).tolist())
+            for i, name in enumerate(self._tables)
+        }
+
+    def _neighbours(self, name: str) -> Set[str]:
+        linked = {
+            column.references.split(".")[0]
+            for column in self._tables[name].columns if column.references
+        }
+        linked.update(
+            other.name for other in self._tables.values()
+            if any(column.references and column.references.split(".")[0] == name for column in other.columns)
+        )
+        return linked & set(self._tables)
+
+    def select(self, question: str) -> List[Tuple[TableInfo, List[ColumnInfo]]]:
+        """Pick tables for a question, each with its columns in relevance order."""
+        scores = (
+            self._embedding_scores(question)
+            if self._table_vectors is not None else self._lexical_scores(question)
+        )
+        relevance = {
+            name: max(table_score, max(column_scores, default=0.0))
+            for name, (table_score, column_scores) in scores.items()
+        }
+        ranked = sorted(relevance, key=relevance.get, reverse=True)
+        chosen = [name for name in ranked[:self.max_tables] if relevance[name] > 0] or ranked[:1]
+
+        # Add tables that connect two chosen tables, so joins can be written.
+        for first in list(chosen):
+            for second in list(chosen):
+                if first >= second or second in self._neighbours(first):
+                    continue
+                bridges = self._neighbours(first) & self._neighbours(second)
+                if bridges and not bridges & set(chosen):
+                    chosen.append(max(bridges, key=relevance.get))
+
+        selected = []
+        for name in chosen:
+            table = self._tables[name]
+            column_scores = scores[name][1]
+            order = sorted(
+                range(len(table.columns)),
+                key=lambda i: (
+                    not (table.columns[i].primary_key or table.columns[i].references),
+                    -column_scores[i],
+                    i,
+                ),
+            )
+            selected.append((table, [table.columns[i] for i in order]))
+        return selected
+
+    def render(self, selected: List[Tuple[TableInfo, List[ColumnInfo]]]) -> str:
+        """Render tables one per line, dropping low-ranked columns and tables to fit the budget."""
+        lines: List[str] = []
+        used = 0
+        for table, columns in selected:
+            keep = list(columns)
+            line = table.render(keep)
+            # Key columns come first, so trimming from the end keeps joins possible.
+            while used + count_tokens(line) > self.max_tokens and len(keep) > 1:
+                keep.pop()
+                line = table.render(sorted(keep, key=table.columns.index))
+            if used + count_tokens(line) > self.max_tokens and lines:
+                break
+            lines.append(table.render(sorted(keep, key=table.columns.index)))
+            used += count_tokens(lines[-1])
+        return "\n".join(lines)
+
+    def context(self, question: str) -> str:
+        """Return the cached compact schema for a question."""
+        with self._lock:
+            version = self._refresh()
+            key = (version, " ".join(question.lower().split()))
+            if key in self._contexts:
+                self._contexts.move_to_end(key)
+                self.hits += 1
+                return self._contexts[key]
+            self.misses += 1
+            text = self.render(self.select(question))
+            self._contexts[key] = text
+            if len(self._contexts) > self.cache_size:
+                self._contexts.popitem(last=False)
+            return text
@@ -0,0 +1,176 @@
+"""Run a file of questions through the agents with bounded concurrency.
+
+Input is JSONL, one ``{"id": ..., "question": ...}`` object (or a bare JSON
+string) per line. Repeated questions run once. Each result is appended to
+the output JSONL as soon as it finishes, so an interrupted run resumes by
+skipping the questions already answered in the output; questions that
+failed run again, and their new row supersedes the failed one.
+
+    python batch.py questions.jsonl [--output results.jsonl] [--concurrency 8]
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+import uuid
+from collections import Counter
+from typing import Dict, List, NamedTuple, Optional, Set, TextIO
+
+from config.settings import settings
+from core.agents.runner import AsyncSessionRunner, final_answer
+from core.registry import registry
+from utils.concurrency import run_in_thread
+from utils.logging import get_logger
+from utils.metrics import metrics
+from .server import LatencyRecorder, SwarmService
+
+logger = get_logger(__name__)
+
+class BatchItem(NamedTuple):
+    id: str
+    question: str
+    duplicate_ids: List[str]
+
+def question_key(question: str) -> str:
+    return " ".join(question.lower().split())
+
+def read_questions(path: str) -> List[BatchItem]:
+    """Read questions in file order, merging repeats into the first occurrence."""
+    items: Dict[str, BatchItem] = {}
+    with open(path) as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if isinstance(record, str):
+                record = {"question": record}
+            if not isinstance(record, dict):
+                logger.warning(f"Skipping line {line_number}: not a JSON object or string")
+                continue
+            question = (record.get("question") or record.get("query") or "").strip()
+            if not question:
+                logger.warning(f"Skipping line {line_number}: no question")
+                continue
+            item_id = str(record.get("id", line_number))
+            key = question_key(question)
+            if key in items:
+                items[key].duplicate_ids.append(item_id)
+            else:
+                items[key] = BatchItem(item_id, question, [])
+    return list(items.values())
+
+def read_results(path: str) -> List[dict]:
+    """One row per question in an output file, in the order first answered.
+
+    A later successful row replaces a failed one for the same question. A
+    last line cut short by a crash is truncated so its question runs again.
+    """
+    rows: Dict[str, dict] = {}
+    if not os.path.exists(path):
+        return []
+    with open(path, "rb+") as f:
+        complete = 0
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            complete += len(line)
+            row = json.loads(line)
+            key = question_key(row["question"])
+            if key not in rows or "error" in rows[key]:
+                rows[key] = row
+        f.truncate(complete)
+    return list(rows.values())
+
+def completed_questions(path: str) -> Set[str]:
+    """Keys of the questions answered without an error in an output file."""
+    return {question_key(row["question"]) for row in read_results(path) if "error" not in row}
+
+class BatchRunner:
+    """Runs questions as independent one-turn sessions and streams results to a file."""
+
+    def __init__(self, runner: AsyncSessionRunner, concurrency: Optional[int] = None, embeddings=None):
+        self.runner = runner
+        self.concurrency = concurrency or settings.batch_concurrency
+        self.embeddings = embeddings
+
+    async def _run_one(self, item: BatchItem, semaphore: asyncio.Semaphore, out: TextIO) -> dict:
+        session_id = f"batch-{uuid.uuid4().hex}"
+        row = {"id": item.id, "question": item.question, "duplicate_ids": item.duplicate_ids}
+        async with semaphore:
+            start = time.perf_counter()
+            with metrics.collect() as stages:
+                try:
+                    response = await self.runner.query(session_id, item.question)
+                    row["agent"] = response.agent.name if response.agent else None
+                    row["answer"] = final_answer(response.messages)
+                except Exception as e:
+                    logger.error(f"Error answering {item.id}: {str(e)}")
+                    row["error"] = str(e)
+                finally:
+                    self.runner.reset(session_id)
+            row["latency_ms"] = (time.perf_counter() - start) * 1000
+            row["stages_ms"] = stages
+        out.write(json.dumps(row) + "\n")
+        out.flush()
+        return row
+
+    async def run(self, items: List[BatchItem], output_path: str) -> dict:
+        """Answer ``items`` not yet in ``output_path`` and return aggregate stats."""
+        done = completed_questions(output_path)
+        pending = [item for item in items if question_key(item.question) not in done]
+        logger.info(f"{len(pending)} of {len(items)} unique questions to run, {len(items) - len(pending)} already done")
+
+        start = time.perf_counter()
+        if self.embeddings is not None and pending:
+            # One batched pass fills the query cache used by routing, the answer
+            # cache and schema selection.
+            with metrics.span("batch.embed"):
+                await run_in_thread(self.embeddings.embed_queries, [item.question for item in pending])
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        with open(output_path, "a") as out:
+            rows = await asyncio.gather(*(self._run_one(item, semaphore, out) for item in pending))
+        elapsed = time.perf_counter() - start
+
+        latency = LatencyRecorder()
+        for row in rows:
+            latency.record(row["latency_ms"] / 1000)
+        return {
+            "unique_questions": len(items),
+            "skipped": len(items) - len(pending),
+            "completed": len(rows),
+            "errors": sum(1 for row in rows if "error" in row),
+            "elapsed_s": elapsed,
+            "questions_per_second": len(rows) / elapsed if elapsed else 0.0,
+            "latency_ms": latency.percentiles(),
+            "agents": dict(Counter(row.get("agent") or "none" for row in rows)),
+        }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Answer a JSONL file of questions")
+    parser.add_argument("input", help="JSONL file of questions")
+    parser.add_argument("--output", help="results JSONL (default: <input>.results.jsonl)")
+    parser.add_argument("--concurrency", type=int, default=settings.batch_concurrency)
+    parser.add_argument("--restart", action="store_true", help="ignore results from an earlier run")
+    args = parser.parse_args()
+
+    output = args.output or f"{os.path.splitext(args.input)[0]}.results.jsonl"
+    if args.restart and os.path.exists(output):
+        os.remove(output)
+
+    items = read_questions(args.input)
+    service = SwarmService.from_agents()
+    embeddings = registry.embeddings() if settings.batch_embed_questions else None
+    summary = asyncio.run(BatchRunner(service.runner, args.concurrency, embeddings).run(items, output))
+
+    summary_path = f"{os.path.splitext(output)[0]}.summary.json"
+    with open(summary_path, "w") as f:
+        json.dump(summary, f, indent=2)
+    logger.info(
+        f"Answered {summary['completed']} questions ({summary['errors']} errors) in {summary['elapsed_s']:.1f}s, "
+        f"{summary['questions_per_second']:.2f} questions/s; results in {output}, summary in {summary_path}"
+    )
+
+if __name__ == "__main__":
+    main()
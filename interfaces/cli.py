@@ -1,107 +1,336 @@
-from typing import List
+from typing import List, Optional
+import threading
+import time
 from rich.console import Console
+from rich.live import Live
 from rich.markdown import Markdown
 from rich.panel import Panel
-from swarm import Swarm
+from rich.syntax import Syntax
+from rich.table import Table
 
+from config.settings import settings
+from utils.concurrency import start_background
+from utils.events import events
 from utils.logging import get_logger
-from core.agents.base import BaseSwarmAgent
-from core.agents.coordinator import CoordinatorAgent
-from core.agents.sql_agent import SQLAgent
-from core.agents.rag_agent import RAGAgent
+from utils.metrics import metrics
 
 logger = get_logger(__name__)
 
+STYLES = {
+    "user": ("bold blue", "📝 User"),
+    "Coordinator": ("bold yellow", "🎯 Coordinator"),
+    "SQL Agent": ("bold green", "💾 SQL Agent"),
+    "RAG Agent": ("bold magenta", "📚 RAG Agent"),
+}
+
+AGENT_TRANSFERS = {
+    "transfer_to_sql": "SQL Agent",
+    "transfer_to_rag": "RAG Agent",
+}
+
+def style_for(sender: str) -> tuple:
+    return STYLES.get(sender, ("bold white", sender))
+
+class StreamRenderer:
+    """Renders streamed agent output, tool calls and handler events as they arrive."""
+
+    def __init__(self, console: Console, start_time: float):
+        self.console = console
+        self.start_time = start_time
+        self.first_token_at: Optional[float] = None
+        self._live: Optional[Live] = None
+        self._sender: Optional[str] = None
+        self._title_suffix = ""
+        self._text = ""
+        self._lock = threading.RLock()
+
+    @property
+    def time_to_first_token(self) -> Optional[float]:
+        if self.first_token_at is None:
+            return None
+        return self.first_token_at - self.start_time
+
+    def _panel(self) -> Panel:
+        style, title = style_for(self._sender or "unknown")
+        return Panel(
+            Markdown(self._text),
+            title=f"{title}{self._title_suffix}",
+            style=style,
+            border_style=style,
+            padding=(1, 2)
+        )
+
+    def begin(self, sender: str, title_suffix: str = "") -> None:
+        with self._lock:
+            self.end()
+            self._sender = sender
+            self._title_suffix = title_suffix
+
+    def write(self, text: str) -> None:
+        with self._lock:
+            if self.first_token_at is None:
+                self.first_token_at = time.perf_counter()
+            self._text += text
+            if self._live is None:
+                self._live = Live(self._panel(), console=self.console, refresh_per_second=12)
+                self._live.start()
+            else:
+                self._live.update(self._panel())
+
+    def end(self) -> None:
+        with self._lock:
+            if self._live is not None:
+                self._live.update(self._panel(), refresh=True)
+                self._live.stop()
+                self._live = None
+            self._text = ""
+
+    def note(self, renderable) -> None:
+        with self._lock:
+            self.end()
+            self.console.print(renderable)
+
+    def on_delta(self, delta: dict) -> None:
+        """Handle a chunk from ``Swarm.run(stream=True)``."""
+        if delta.get("sender"):
+            self.begin(delta["sender"])
+        if delta.get("content"):
+            self.write(delta["content"])
+        for tool_call in delta.get("tool_calls") or []:
+            name = (tool_call.get("function") or {}).get("name")
+            if not name:
+                continue
+            if name in AGENT_TRANSFERS:
+                self.note(f"[bold cyan]🔀 Transferring to {AGENT_TRANSFERS[name]}[/bold cyan]")
+            else:
+                self.note(f"[cyan]🔧 {self._sender or 'Agent'} calling {name}[/cyan]")
+
+    def on_event(self, name: str, payload: dict) -> None:
+        """Handle an event published by a handler while a tool call runs."""
+        source = payload.get("source", "unknown")
+        if name == "token":
+            if self._sender != source or self._live is None:
+                self.begin(source, " (working)")
+            self.write(payload["text"])
+        elif name == "retrieval":
+            lines = "\n".join(f"  {i}. {snippet[:100]}" for i, snippet in enumerate(payload["snippets"], 1))
+            self.note(f"[magenta]📄 Retrieved {payload['num_docs']} document(s)[/magenta]\n{lines}")
+        elif name == "sql_query":
+            self.note(Syntax(payload["query"], "sql", word_wrap=True))
+        elif name == "sql_result":
+            self.note("[green]✅ SQL query executed[/green]")
+
 class SwarmCLI:
+    """Interactive console for the agents.
+
+    Agents, models and stores are heavy to import and build, so with
+    ``lazy_init`` they are loaded on first use, or by a background warmup
+    started once the prompt is shown.
+    """
+
     def __init__(self):
         self.console = Console()
-        self.client = Swarm()
-        self.messages: List[dict] = []
+        self.transcript: List[dict] = []
+        self._panels: List[Panel] = []
+        self._render_cursor = 0
+        self.last_time_to_first_token: Optional[float] = None
+        self._loaded = False
+        self._load_lock = threading.Lock()
+        self._warmup_thread: Optional[threading.Thread] = None
         
-        self.sql_agent = SQLAgent()
-        self.rag_agent = RAGAgent()
-        self.coordinator = CoordinatorAgent()
-        self.coordinator.set_transfer_functions(self.sql_agent, self.rag_agent)
+        if not settings.lazy_init:
+            self.warmup()
         
-    def print_message(self, message: dict) -> None:
-        sender = message.get("sender", message.get("role", "unknown"))
-        content = message.get("content", "")
-        
-        if not content:
+    def load(self) -> None:
+        """Import and build the model client, memory and agents, once."""
+        if self._loaded:
             return
-            
-        styles = {
-            "user": ("bold blue", "📝 User"),
-            "Coordinator": ("bold yellow", "🎯 Coordinator"),
-            "SQL Agent": ("bold green", "💾 SQL Agent"),
-            "RAG Agent": ("bold magenta", "📚 RAG Agent"),
-            "unknown": ("bold white", sender)
-        }
+        with self._load_lock:
+            if self._loaded:
+                return
+            with metrics.span("startup.agents"):
+                from swarm import Swarm
+                from core.registry import registry
+                from core.sessions.memory import ConversationMemory
+                
+                self._client = Swarm(client=registry.openai_client())
+                self._memory = ConversationMemory()
+                self._sql_agent = registry.sql_agent()
+                self._rag_agent = registry.rag_agent()
+                self._coordinator = registry.coordinator()
+            self._loaded = True
+        
+    def warmup(self) -> None:
+        """Load the agents, then the models and stores behind them."""
+        self.load()
+        self.coordinator.warmup()
+        
+    def start_warmup(self) -> None:
+        """Warm up in a background thread; a question asked meanwhile waits only for what it uses."""
+        if settings.warmup_in_background and self._warmup_thread is None:
+            self._warmup_thread = start_background(self.warmup, "swarmdb-warmup")
+        
+    @property
+    def client(self):
+        self.load()
+        return self._client
         
-        style, title = styles.get(sender, styles["unknown"])
+    @property
+    def memory(self):
+        self.load()
+        return self._memory
         
-        panel = Panel(
+    @property
+    def sql_agent(self):
+        self.load()
+        return self._sql_agent
+        
+    @property
+    def rag_agent(self):
+        self.load()
+        return self._rag_agent
+        
+    @property
+    def coordinator(self):
+        self.load()
+        return self._coordinator
+        
+    def _build_panel(self, message: dict) -> Panel:
+        sender = message.get("sender", message.get("role", "unknown"))
+        content = message.get("content", "")
+        style, title = style_for(sender)
+        
+        return Panel(
             Markdown(content) if sender != "user" else content,
             title=title,
             style=style,
             border_style=style,
             padding=(1, 2)
         )
-        self.console.print(panel)
+        
+    def print_message(self, message: dict) -> None:
+        if not message.get("content"):
+            return
+        self.console.print(self._build_panel(message))
+        
+    def print_reference(self, ref_id: str) -> None:
+        content = self.memory.reference(ref_id)
+        if content is None:
+            self.console.print(f"[bold red]No reference named {ref_id}[/bold red]")
+            return
+        self.console.print(Panel(Markdown(content), title=f"🔗 {ref_id}", padding=(1, 2)))
+        
+    def record_turn(self, user_input: str, new_messages: List[dict]) -> None:
+        """Add a turn's displayable messages to the transcript."""
+        self.transcript.append({"sender": "user", "content": user_input})
+        for message in new_messages:
+            if message.get("content"):
+                self.transcript.append({
+                    "sender": message.get("sender", message.get("role", "unknown")),
+                    "content": message["content"],
+                })
+        
+    def _panel(self, index: int) -> Panel:
+        # Transcript entries never change, so each panel is built (and its markdown parsed) once.
+        while len(self._panels) <= index:
+            self._panels.append(self._build_panel(self.transcript[len(self._panels)]))
+        return self._panels[index]
+        
+    def _print_range(self, start: int, end: int) -> None:
+        for index in range(start, end):
+            if self.transcript[index]["sender"] == "user" or index == start:
+                self.console.print("─" * 80)
+            self.console.print(self._panel(index))
         
     def print_conversation(self) -> None:
-        current_turn = []
+        """Print the messages added since the last call."""
+        end = len(self.transcript)
+        self._print_range(self._render_cursor, end)
+        self._render_cursor = end
         
-        for message in self.messages:
-            if message.get("content") is None:
-                continue
-            
-            sender = message.get("sender", message.get("role", "unknown"))
-            content = message.get("content", "")
-            
-            if sender == "user":
-                if current_turn:
-                    self.console.print("─" * 80)
-                    for turn_message in current_turn:
-                        self.print_message(turn_message)
-                    current_turn = []
-                current_turn.append({"sender": sender, "content": content})
-            else:
-                current_turn.append({"sender": sender, "content": content})
+    def replay(self) -> None:
+        """Redraw the whole conversation from cached panels."""
+        self.console.clear()
+        self._print_range(0, self._render_cursor)
+        
+    def print_metrics(self) -> None:
+        """Show per-stage latency and token totals recorded so far."""
+        snapshot = metrics.snapshot()
+        if not snapshot["stages"]:
+            self.console.print("[yellow]No metrics recorded yet[/yellow]")
+            return
+        tokens = {}
+        for row in snapshot["tokens"]:
+            tokens.setdefault(row["stage"], {})[row["kind"]] = row["count"]
+        table = Table(title="Stage latency")
+        for column in ("stage", "count", "mean ms", "p95 ms", "prompt tok", "completion tok"):
+            table.add_column(column, justify="left" if column == "stage" else "right")
+        for stage, stats in snapshot["stages"].items():
+            counts = tokens.get(stage, {})
+            table.add_row(
+                stage, str(stats["count"]), f"{stats['mean_ms']:.1f}", f"≤{stats['p95_ms']:g}",
+                str(counts.get("prompt", "")), str(counts.get("completion", "")),
+            )
+        self.console.print(table)
         
-        if current_turn:
-            self.console.print("─" * 80)
-            for turn_message in current_turn:
-                self.print_message(turn_message)
-                
     def run(self) -> None:
         try:
             self.console.print("[bold magenta]Welcome to the Swarm CLI![/bold magenta]")
-            self.console.print("[bold]Type 'quit' to exit[/bold]")
+            self.console.print("[bold]Type 'quit' to exit, 'replay' to redraw the conversation, "
+                               "'metrics' for stage timings[/bold]")
+            self.start_warmup()
             
-            agent = self.coordinator
+            agent = None
             
             while True:
                 user_input = self.console.input("\n[bold blue]Enter your question:[/bold blue] ").strip()
                 
                 if user_input.lower() == "quit":
+                    self._log_router_stats()
                     self.console.print("\n[bold yellow]Gracefully shutting down...[/bold yellow]")
                     break
                     
                 if user_input.lower() == "clear":
                     self.console.clear()
-                    self.messages = []
+                    self.memory.clear()
+                    self.transcript, self._panels, self._render_cursor = [], [], 0
                     continue
                 
-                self.messages.append({"role": "user", "content": user_input})
+                if user_input.lower() == "replay":
+                    self.replay()
+                    continue
+                
+                if user_input.lower() == "metrics":
+                    self.print_metrics()
+                    continue
+                
+                if user_input.lower().startswith("ref "):
+                    self.print_reference(user_input[4:].strip())
+                    continue
                 
                 try:
+                    routed = self.coordinator.pre_route(user_input)
+                    if routed is not None:
+                        agent = self._get_agent_from_response(routed)
+                    agent = agent or self.coordinator
+                    
+                    messages = self.memory.begin_turn(user_input)
+                    if settings.cli_streaming:
+                        response = self._run_streaming(agent, messages)
+                        self.memory.end_turn(response.messages)
+                        self.record_turn(user_input, response.messages)
+                        # Already shown live while streaming.
+                        self._render_cursor = len(self.transcript)
+                        agent = self._get_agent_from_response(response.agent)
+                        continue
+                    
                     with self.console.status(
                         "[bold cyan]🤔 Processing your query...[/bold cyan]", 
                         spinner="dots12"
                     ):
-                        response = self.client.run(agent=agent.agent, messages=self.messages)
-                        self.messages = response.messages
+                        response = self.client.run(agent=agent.agent, messages=messages)
+                        self.memory.end_turn(response.messages)
+                        self.record_turn(user_input, response.messages)
                         agent = self._get_agent_from_response(response.agent)
                         
                     self.print_conversation()
@@ -111,12 +340,48 @@ class SwarmCLI:
                     self.console.print(f"[bold red]Error:[/bold red] {str(e)}")
                     
         except KeyboardInterrupt:
+            self._log_router_stats()
             self.console.print("\n[bold yellow]Gracefully shutting down...[/bold yellow]")
         except Exception as e:
             logger.error(f"Unexpected error in CLI: {str(e)}")
             self.console.print(f"[bold red]Unexpected error:[/bold red] {str(e)}")
             
-    def _get_agent_from_response(self, agent) -> BaseSwarmAgent:
+    def _run_streaming(self, agent: "BaseSwarmAgent", messages: List[dict]):
+        """Run one turn with ``stream=True``, rendering output as it arrives."""
+        renderer = StreamRenderer(self.console, time.perf_counter())
+        unsubscribe = events.subscribe(renderer.on_event)
+        response = None
+        try:
+            self.console.print("─" * 80)
+            for chunk in self.client.run(agent=agent.agent, messages=messages, stream=True):
+                if "response" in chunk:
+                    response = chunk["response"]
+                elif chunk.get("delim") == "end":
+                    renderer.end()
+                elif "delim" not in chunk:
+                    renderer.on_delta(chunk)
+        finally:
+            unsubscribe()
+            renderer.end()
+        
+        self.last_time_to_first_token = renderer.time_to_first_token
+        if self.last_time_to_first_token is not None:
+            logger.info(f"Time to first token: {self.last_time_to_first_token * 1000:.0f} ms")
+        return response
+
+    def _log_router_stats(self) -> None:
+        if not self._loaded or self.coordinator.router is None:
+            return
+        stats = self.coordinator.router.stats()
+        saved = "n/a" if stats["latency_saved_ms"] is None else f"{stats['latency_saved_ms']:.0f} ms"
+        logger.info(
+            f"Router: {stats['routed']}/{stats['queries']} queries routed locally "
+            f"(hit rate {stats['hit_rate']:.0%}), latency saved: {saved}"
+        )
+
+    def _get_agent_from_response(self, agent) -> "BaseSwarmAgent":
+        from core.agents.base import BaseSwarmAgent
+        
         if agent is None:
             return self.coordinator
         
@@ -0,0 +1,203 @@
+import argparse
+import json
+import multiprocessing
+import time
+import uuid
+from collections import deque
+from typing import Callable, Dict, Optional
+from aiohttp import web
+
+from config.settings import settings
+from core.agents.runner import AsyncSessionRunner, final_answer
+from core.registry import registry
+from utils.concurrency import start_background
+from utils.logging import get_logger
+from utils.metrics import metrics
+
+logger = get_logger(__name__)
+
+class LatencyRecorder:
+    """Keeps recent request latencies and reports percentiles."""
+
+    def __init__(self, max_samples: int = 10000):
+        self._samples = deque(maxlen=max_samples)
+        self.count = 0
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+        self.count += 1
+
+    def percentiles(self, points=(50, 90, 95, 99)) -> Dict[str, float]:
+        samples = sorted(self._samples)
+        if not samples:
+            return {f"p{point}": 0.0 for point in points}
+        return {
+            f"p{point}": samples[min(len(samples) - 1, int(len(samples) * point / 100))] * 1000
+            for point in points
+        }
+
+class SwarmService:
+    """Agents and runner shared by every HTTP session in a worker process."""
+
+    def __init__(self, runner: AsyncSessionRunner, router=None, warmup: Optional[Callable[[], None]] = None):
+        self.runner = runner
+        self.router = router
+        self.warmup = warmup
+        self.latency = LatencyRecorder()
+
+    @classmethod
+    def from_agents(cls) -> "SwarmService":
+        sql_agent = registry.sql_agent()
+        rag_agent = registry.rag_agent()
+        coordinator = registry.coordinator()
+        runner = AsyncSessionRunner(
+            coordinator.agent,
+            agents=[sql_agent.agent, rag_agent.agent],
+            pre_route=coordinator.apre_route,
+        )
+        return cls(runner, router=coordinator.router, warmup=coordinator.warmup)
+
+SERVICE = web.AppKey("service", SwarmService)
+
+async def _read_query(request: web.Request) -> tuple:
+    try:
+        body = await request.json()
+    except json.JSONDecodeError:
+        raise web.HTTPBadRequest(text="Request body must be JSON")
+    if not isinstance(body, dict):
+        raise web.HTTPBadRequest(text="Request body must be a JSON object")
+    query = body.get("query") or ""
+    if not isinstance(query, str):
+        raise web.HTTPBadRequest(text="'query' must be a string")
+    query = query.strip()
+    if not query:
+        raise web.HTTPBadRequest(text="Missing 'query'")
+    session_id = body.get("session_id") or uuid.uuid4().hex
+    if not isinstance(session_id, str):
+        raise web.HTTPBadRequest(text="'session_id' must be a string")
+    return session_id, query
+
+async def handle_query(request: web.Request) -> web.Response:
+    service: SwarmService = request.app[SERVICE]
+    session_id, query = await _read_query(request)
+    start = time.perf_counter()
+    try:
+        with metrics.collect() as stages:
+            response = await service.runner.query(session_id, query)
+    except Exception as e:
+        logger.error(f"Error processing query: {str(e)}")
+        raise web.HTTPInternalServerError(text=str(e))
+    elapsed = time.perf_counter() - start
+    service.latency.record(elapsed)
+    return web.json_response({
+        "session_id": session_id,
+        "agent": response.agent.name if response.agent else None,
+        "answer": final_answer(response.messages),
+        "messages": response.messages,
+        "latency_ms": elapsed * 1000,
+        "stages_ms": stages,
+    })
+
+async def handle_stream(request: web.Request) -> web.StreamResponse:
+    """Stream a turn as newline-delimited JSON chunks."""
+    service: SwarmService = request.app[SERVICE]
+    session_id, query = await _read_query(request)
+    start = time.perf_counter()
+
+    stream = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+    await stream.prepare(request)
+    try:
+        async for chunk in service.runner.stream(session_id, query):
+            if "response" in chunk:
+                response = chunk["response"]
+                chunk = {
+                    "session_id": session_id,
+                    "agent": response.agent.name if response.agent else None,
+                    "answer": final_answer(response.messages),
+                    "latency_ms": (time.perf_counter() - start) * 1000,
+                }
+            await stream.write((json.dumps(chunk) + "\n").encode("utf-8"))
+    except Exception as e:
+        logger.error(f"Error streaming query: {str(e)}")
+        await stream.write((json.dumps({"error": str(e)}) + "\n").encode("utf-8"))
+    service.latency.record(time.perf_counter() - start)
+    await stream.write_eof()
+    return stream
+
+async def handle_delete_session(request: web.Request) -> web.Response:
+    request.app[SERVICE].runner.reset(request.match_info["session_id"])
+    return web.json_response({"deleted": request.match_info["session_id"]})
+
+async def handle_stats(request: web.Request) -> web.Response:
+    service: SwarmService = request.app[SERVICE]
+    stats = {
+        "requests": service.latency.count,
+        "latency_ms": service.latency.percentiles(),
+        "resources": registry.stats(),
+    }
+    if service.router is not None:
+        stats["router"] = service.router.stats()
+    return web.json_response(stats)
+
+async def handle_metrics(request: web.Request) -> web.Response:
+    """Stage latencies, token counts and counters; Prometheus text unless ``?format=json``."""
+    if request.query.get("format") == "json":
+        return web.json_response(metrics.snapshot())
+    return web.Response(text=metrics.to_prometheus(), content_type="text/plain", charset="utf-8")
+
+async def handle_health(request: web.Request) -> web.Response:
+    return web.json_response({"status": "ok"})
+
+async def _start_warmup(app: web.Application) -> None:
+    """Load models and stores in the background so the first requests don't pay for it."""
+    service = app[SERVICE]
+    if service.warmup is not None and settings.warmup_in_background:
+        start_background(service.warmup, "swarmdb-warmup")
+
+def create_app(service: SwarmService) -> web.Application:
+    app = web.Application()
+    app[SERVICE] = service
+    app.on_startup.append(_start_warmup)
+    app.add_routes([
+        web.post("/query", handle_query),
+        web.post("/query/stream", handle_stream),
+        web.delete("/sessions/{session_id}", handle_delete_session),
+        web.get("/stats", handle_stats),
+        web.get("/metrics", handle_metrics),
+        web.get("/health", handle_health),
+    ])
+    return app
+
+def _serve(host: str, port: int, reuse_port: bool) -> None:
+    app = create_app(SwarmService.from_agents())
+    web.run_app(app, host=host, port=port, reuse_port=reuse_port, print=None)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve the Swarm agents over HTTP")
+    parser.add_argument("--host", default=settings.server_host)
+    parser.add_argument("--port", type=int, default=settings.server_port)
+    parser.add_argument("--workers", type=int, default=settings.server_workers)
+    args = parser.parse_args()
+
+    logger.info(f"Serving on http://{args.host}:{args.port} with {args.workers} worker(s)")
+    if args.workers <= 1:
+        _serve(args.host, args.port, reuse_port=False)
+        return
+
+    if settings.session_store == "memory":
+        logger.warning("In-memory sessions are not shared between workers; use session_store=sqlite")
+    workers = [
+        multiprocessing.Process(target=_serve, args=(args.host, args.port, True))
+        for _ in range(args.workers)
+    ]
+    for worker in workers:
+        worker.start()
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        for worker in workers:
+            worker.terminate()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+from core.agents.coordinator import CoordinatorAgent
+
+class SlowSQLHandler:
+    async def agenerate_response(self, question):
+        await asyncio.sleep(0.2)
+        return f"rows for {question}"
+
+class SlowVectorStoreHandler:
+    async def aretrieve_and_generate(self, question):
+        await asyncio.sleep(0.2)
+        return f"passages for {question}", 1, []
+
+class FailingSQLHandler:
+    async def agenerate_response(self, question):
+        raise RuntimeError("database is locked")
+
+class TestCoordinatorFanOut:
+    def test_branches_run_concurrently(self):
+        """Test the SQL and RAG branches overlap and both results are returned."""
+        coordinator = CoordinatorAgent()
+        coordinator._sql_agent = SimpleNamespace(sql_handler=SlowSQLHandler())
+        coordinator._rag_agent = SimpleNamespace(vectorstore_handler=SlowVectorStoreHandler())
+
+        start = time.perf_counter()
+        result = asyncio.run(coordinator.aanswer_from_sources("top artists", "attention"))
+
+        assert time.perf_counter() - start < 0.35
+        assert "rows for top artists" in result and "passages for attention" in result
+
+    def test_failed_branch_keeps_other_result(self):
+        """Test an exception in one branch is reported without losing the other branch's answer."""
+        coordinator = CoordinatorAgent()
+        coordinator._sql_agent = SimpleNamespace(sql_handler=FailingSQLHandler())
+        coordinator._rag_agent = SimpleNamespace(vectorstore_handler=SlowVectorStoreHandler())
+
+        result = asyncio.run(coordinator.aanswer_from_sources("top artists", "attention"))
+
+        assert "Error: could not query the database: database is locked" in result
+        assert "passages for attention" in result
@@ -0,0 +1,50 @@
+import pytest
+
+from benchmarks.fixtures import create_sample_chinook
+from config.settings import settings
+from core.registry import ResourceRegistry, registry
+
+@pytest.fixture
+def offline_registry(tmp_path, monkeypatch):
+    for name, value in {
+        "model_provider": "fake",
+        "embedding_provider": "fake",
+        "lazy_init": True,
+        "database_path": create_sample_chinook(str(tmp_path / "chinook.db")),
+        "vector_store_path": str(tmp_path / "chroma"),
+        "bm25_index_path": str(tmp_path / "bm25.sqlite"),
+        "embedding_cache_path": str(tmp_path / "embedding_cache"),
+        "sql_cache_path": str(tmp_path / "sql_cache.db"),
+    }.items():
+        monkeypatch.setattr(settings, name, value)
+    registry.reset()
+    yield registry
+    registry.reset()
+
+class TestResourceRegistry:
+    def test_resources_are_built_once_per_key(self):
+        """Test each resource is built on first request and then reused."""
+        resources = ResourceRegistry()
+        built = []
+
+        def factory():
+            built.append(True)
+            return object()
+
+        first = resources.get("engine", "sqlite:///a.db", factory)
+        assert resources.get("engine", "sqlite:///a.db", factory) is first
+        assert resources.get("engine", "sqlite:///b.db", factory) is not first
+        assert len(built) == 2
+        assert resources.stats() == {"engine": 2}
+
+    def test_agents_share_models_and_handlers(self, offline_registry):
+        """Test agents built from the registry share one chat model, embedder and SQL Agent."""
+        coordinator = offline_registry.coordinator()
+        sql_agent, rag_agent = offline_registry.sql_agent(), offline_registry.rag_agent()
+        transfer_to_sql = next(f for f in rag_agent.agent.functions if f.__name__ == "transfer_to_sql")
+
+        assert transfer_to_sql() is sql_agent.agent
+        assert sql_agent.sql_handler.llm is rag_agent.vectorstore_handler.llm
+        assert sql_agent.sql_handler.schema_selector.embedding_function is coordinator.router.embedding_function
+        assert offline_registry.stats()["chat_model"] == 1
+        assert offline_registry.stats()["agent"] == 3
@@ -0,0 +1,58 @@
+import re
+import zlib
+
+import numpy as np
+import pytest
+from langchain_core.embeddings import Embeddings
+
+from core.agents.coordinator import QueryRouter
+
+class BagOfWordsEmbeddings(Embeddings):
+    """Hashes words into a fixed-size count vector."""
+
+    def embed_query(self, text):
+        vector = np.zeros(256)
+        for word in re.findall(r"\w+", text.lower()):
+            vector[zlib.crc32(word.encode()) % 256] += 1
+        return vector.tolist()
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+@pytest.fixture
+def router():
+    return QueryRouter(BagOfWordsEmbeddings(), threshold=0.2)
+
+class TestQueryRouter:
+    def test_routes_obvious_queries(self, router):
+        """Test clear SQL and RAG questions are routed with confidence."""
+        assert router.route("How many tracks are in each genre?").target == "sql"
+        assert router.route("How does attention work in transformer models?").target == "rag"
+
+    def test_ambiguous_query_falls_back(self, router):
+        """Test a query matching neither side is left to the LLM."""
+        decision = router.route("Hello, who are you?")
+        assert decision.target is None
+        assert decision.confidence < 0.2
+
+    def test_stats_report_hit_rate_and_savings(self, router):
+        """Test hit rate and saved latency are derived from recorded routes."""
+        router.route("List the top artists by album sales")
+        router.route("Hello there")
+        router.record_llm_route(0.5)
+
+        stats = router.stats()
+        assert stats["hit_rate"] == 0.5
+        assert stats["llm_routing_ms"] == pytest.approx(500)
+        assert 0 < stats["latency_saved_ms"] <= 500
+
+    def test_keyword_only_without_embeddings(self):
+        """Test the router works from keywords alone."""
+        router = QueryRouter(threshold=0.5)
+        assert router.route("Total sales per customer in the database").target == "sql"
+        assert router.route("What is the capital of France?").target is None
+
+    def test_mixed_query_is_left_to_the_coordinator(self, router):
+        """Test a question needing both the database and the papers is not routed locally."""
+        decision = router.route("Which artists in the database relate to the attention paper?")
+        assert decision.target is None
@@ -1,13 +1,30 @@
 import pytest
 from unittest.mock import Mock, patch
 
+from config.settings import settings
+from core.registry import registry
 from interfaces.cli import SwarmCLI
 
 @pytest.fixture
-def cli():
+def cli(tmp_path, monkeypatch):
+    for name, value in {
+        "vector_store_path": str(tmp_path / "chroma"),
+        "ingestion_manifest_path": str(tmp_path / "ingestion_manifest.json"),
+        "bm25_index_path": str(tmp_path / "bm25.sqlite"),
+        "embedding_cache_path": str(tmp_path / "embedding_cache"),
+        "sql_cache_path": str(tmp_path / "sql_cache.db"),
+        "sql_local_copy_path": str(tmp_path / "chinook.indexed.db"),
+        "sql_materialize_path": str(tmp_path / "chinook.aggregates.db"),
+        "session_store_path": str(tmp_path / "sessions.db"),
+    }.items():
+        monkeypatch.setattr(settings, name, value)
     with patch('interfaces.cli.Console'), \
-         patch('interfaces.cli.Swarm'):
-        return SwarmCLI()
+         patch('swarm.Swarm'), \
+         patch('core.models.get_openai_client'):
+        registry.reset()
+        cli = SwarmCLI()
+        cli.load()
+        return cli
 
 class TestAgentMapping:
     def test_get_agent_from_response_coordinator(self, cli):
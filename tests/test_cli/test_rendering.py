@@ -0,0 +1,39 @@
+import pytest
+from unittest.mock import patch
+
+from interfaces.cli import SwarmCLI
+
+@pytest.fixture
+def cli():
+    with patch('interfaces.cli.Console'):
+        return SwarmCLI()
+
+def answer(content):
+    return [{"role": "assistant", "sender": "SQL Agent", "content": content}]
+
+class TestIncrementalRendering:
+    def test_only_new_messages_are_printed(self, cli):
+        """Test each turn prints only the messages added since the last one."""
+        cli.record_turn("first", answer("one"))
+        cli.print_conversation()
+        cli.console.print.reset_mock()
+
+        cli.record_turn("second", answer("two"))
+        cli.print_conversation()
+
+        panels = [c.args[0] for c in cli.console.print.call_args_list if not isinstance(c.args[0], str)]
+        assert [panel.renderable for panel in panels][0] == "second"
+        assert len(panels) == 2
+
+    def test_replay_reuses_cached_panels(self, cli):
+        """Test replay redraws the full history without rebuilding panels."""
+        cli.record_turn("first", answer("one"))
+        cli.record_turn("second", answer("two"))
+        cli.print_conversation()
+        cached = list(cli._panels)
+        cli.console.print.reset_mock()
+
+        cli.replay()
+
+        printed = [c.args[0] for c in cli.console.print.call_args_list if not isinstance(c.args[0], str)]
+        assert printed == cached
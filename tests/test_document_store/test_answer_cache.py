@@ -0,0 +1,67 @@
+import pytest
+from langchain_core.embeddings import Embeddings
+
+from core.document_store import answer_cache
+from core.document_store.answer_cache import SemanticAnswerCache
+
+class LookupEmbeddings(Embeddings):
+    """Embeds each known question as a fixed 2-d vector."""
+
+    VECTORS = {
+        "what is attention": [1.0, 0.0],
+        "what's attention": [0.96, 0.28],
+        "what is a transformer": [0.9, 0.436],
+        "what is mantis": [0.0, 1.0],
+        "who wrote mantis": [-1.0, 0.0],
+    }
+
+    def embed_documents(self, texts):
+        return [self.VECTORS[text] for text in texts]
+
+    def embed_query(self, text):
+        return self.VECTORS[text]
+
+@pytest.fixture
+def cache():
+    return SemanticAnswerCache(LookupEmbeddings(), threshold=0.95, max_entries=2, ttl_seconds=60)
+
+class TestSemanticAnswerCache:
+    def test_hit_above_threshold_and_miss_below(self, cache):
+        """Test a paraphrase above the threshold hits and a related question below it misses."""
+        cache.store("what is attention", "answer")
+        assert cache.lookup("what's attention") == "answer"
+        assert cache.lookup("what is a transformer") is None
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_entries_expire_after_ttl(self, cache, monkeypatch):
+        """Test entries older than the TTL are no longer returned."""
+        now = [1000.0]
+        monkeypatch.setattr(answer_cache.time, "monotonic", lambda: now[0])
+        cache.store("what is attention", "answer")
+        now[0] += 59
+        assert cache.lookup("what is attention") == "answer"
+        now[0] += 2
+        assert cache.lookup("what is attention") is None
+        assert len(cache) == 0
+
+    def test_least_recently_used_entry_is_evicted(self, cache):
+        """Test storing past capacity evicts the entry looked up least recently."""
+        cache.store("what is attention", "attention answer")
+        cache.store("what is mantis", "mantis answer")
+        assert cache.lookup("what is attention") == "attention answer"
+        cache.store("who wrote mantis", "authors")
+        assert len(cache) == 2
+        assert cache.lookup("what is mantis") is None
+        assert cache.lookup("what is attention") == "attention answer"
+        assert cache.lookup("who wrote mantis") == "authors"
+
+    def test_invalidate_on_corpus_change(self, cache):
+        """Test entries survive the same corpus version and are dropped when it changes."""
+        cache.invalidate("v1")
+        cache.store("what is attention", "answer")
+        cache.invalidate("v1")
+        assert cache.lookup("what is attention") == "answer"
+        cache.invalidate("v2")
+        assert cache.lookup("what is attention") is None
+        assert cache.corpus_version == "v2"
@@ -0,0 +1,37 @@
+import pytest
+from langchain_core.documents import Document
+
+from core.document_store.bm25 import BM25Index
+from core.document_store.retrieval import reciprocal_rank_fusion
+
+@pytest.fixture
+def index(tmp_path):
+    index = BM25Index(str(tmp_path / "bm25.sqlite"))
+    index.add_documents(
+        [
+            Document(page_content="The Transformer relies entirely on self-attention."),
+            Document(page_content="Recurrent networks process tokens sequentially."),
+            Document(page_content="Mantis plants prompt injections in decoy services."),
+        ],
+        ["a", "b", "c"],
+    )
+    return index
+
+class TestBM25Index:
+    def test_search_ranks_matching_chunks(self, index):
+        """Test the chunk sharing rare query terms ranks first."""
+        results = index.search("decoy prompt injections", k=2)
+        assert [doc.id for doc, _ in results] == ["c"]
+
+    def test_delete_and_persistence(self, index, tmp_path):
+        """Test deleted chunks disappear and the index survives reopening."""
+        index.delete(["a"])
+        reopened = BM25Index(str(tmp_path / "bm25.sqlite"))
+        assert reopened.count() == 2
+        assert reopened.search("self-attention transformer", k=3) == []
+
+    def test_reciprocal_rank_fusion(self):
+        """Test documents ranked well by both lists come first."""
+        a, b, c = (Document(id=i, page_content=i) for i in "abc")
+        fused = reciprocal_rank_fusion([[a, b, c], [b, c, a]])
+        assert [doc.id for doc in fused] == ["b", "a", "c"]
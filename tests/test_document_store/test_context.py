@@ -0,0 +1,36 @@
+from langchain_core.documents import Document
+
+from core.document_store.context import ContextPacker, merge_overlap
+
+FIRST = "The encoder maps an input sequence to representations. Each layer has two sub-layers of equal width."
+SECOND = "Each layer has two sub-layers of equal width. The first is multi-head self-attention."
+
+class TestContextPacker:
+    def test_merge_overlapping_chunks(self):
+        """Test neighbouring chunks sharing an overlap are joined once."""
+        merged = merge_overlap(FIRST, SECOND)
+        assert merged.count("Each layer has two sub-layers of equal width.") == 1
+        assert merged.endswith("multi-head self-attention.")
+        assert merge_overlap(FIRST, "Unrelated text that does not overlap at all with the first.") is None
+
+    def test_pack_drops_duplicates_and_irrelevant_sentences(self):
+        """Test duplicates are removed and only matching sentences are kept."""
+        docs = [
+            Document(page_content=FIRST, metadata={"source": "a.pdf"}),
+            Document(page_content=SECOND, metadata={"source": "a.pdf"}),
+            Document(page_content=FIRST, metadata={"source": "b.pdf"}),
+            Document(page_content="Training used eight GPUs. Dropout was 0.1.", metadata={"source": "a.pdf"}),
+        ]
+        packed = ContextPacker(max_tokens=1000).pack("What is multi-head self-attention?", docs)
+
+        assert packed.duplicates == 1
+        assert "multi-head self-attention" in packed.text
+        assert "GPUs" not in packed.text
+        assert packed.tokens_after < packed.tokens_before
+
+    def test_pack_respects_token_budget(self):
+        """Test the packed context fits the token budget."""
+        sentence = "Attention weights are computed with a softmax over scaled dot products. "
+        docs = [Document(page_content=sentence * 50, metadata={"source": "a.pdf"})]
+        packed = ContextPacker(max_tokens=100).pack("How are attention weights computed?", docs)
+        assert 0 < packed.tokens_after <= 100
@@ -0,0 +1,69 @@
+import pytest
+from langchain_core.embeddings import Embeddings
+
+from core.document_store.embeddings import CachedEmbeddings, EmbeddingCache
+
+class RecordingEmbeddings(Embeddings):
+    def __init__(self):
+        self.batches = []
+
+    def embed_documents(self, texts):
+        self.batches.append(list(texts))
+        return [[float(len(text)), 1.0, 0.5] for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+@pytest.fixture
+def base():
+    return RecordingEmbeddings()
+
+@pytest.fixture
+def embeddings(base, tmp_path):
+    return CachedEmbeddings(base, "test-model", cache_dir=str(tmp_path), batch_size=2)
+
+class TestCachedEmbeddings:
+    def test_batches_are_sorted_by_length(self, embeddings, base):
+        """Test misses are embedded in length-sorted batches."""
+        embeddings.embed_documents(["ccc", "a", "bb"])
+        assert base.batches == [["a", "bb"], ["ccc"]]
+
+    def test_repeated_texts_hit_cache(self, embeddings, base):
+        """Test repeated documents and queries are not recomputed."""
+        first = embeddings.embed_documents(["alpha", "beta"])
+        second = embeddings.embed_documents(["beta", "alpha"])
+        assert second == [first[1], first[0]]
+        embeddings.embed_query("what is alpha")
+        embeddings.embed_query("what is alpha")
+        assert len(base.batches) == 2
+        assert embeddings.stats()["hits"] == 3
+        assert embeddings.stats()["misses"] == 3
+
+    def test_cache_persists_across_instances(self, base, tmp_path):
+        """Test vectors are reloaded from disk by a new instance."""
+        CachedEmbeddings(base, "test-model", cache_dir=str(tmp_path)).embed_documents(["alpha"])
+        reloaded = CachedEmbeddings(base, "test-model", cache_dir=str(tmp_path))
+        assert reloaded.embed_documents(["alpha"]) == [[5.0, 1.0, 0.5]]
+        assert reloaded.hits == 1
+        assert len(base.batches) == 1
+
+    def test_cache_grows_past_initial_capacity(self, embeddings):
+        """Test the memory-mapped matrix grows as entries are added."""
+        texts = [f"text {i}" for i in range(1500)]
+        vectors = embeddings.embed_documents(texts)
+        assert embeddings.embed_documents(texts) == vectors
+        assert embeddings.stats()["cached_vectors"] == 1500
+
+    def test_duplicate_puts_keep_rows_across_restarts(self, tmp_path):
+        """Test storing a key twice neither drops it nor lets new keys overwrite existing rows."""
+        cache = EmbeddingCache(str(tmp_path), "test-model")
+        cache.put_many({"a": [1.0, 0.0], "b": [2.0, 0.0]})
+        cache.put_many({"b": [9.0, 9.0], "c": [3.0, 0.0]})
+        assert len(cache) == 3
+
+        reopened = EmbeddingCache(str(tmp_path), "test-model")
+        reopened.put_many({"d": [4.0, 0.0]})
+        found = reopened.get_many(["a", "b", "c", "d"])
+        assert {key: vector.tolist() for key, vector in found.items()} == {
+            "a": [1.0, 0.0], "b": [2.0, 0.0], "c": [3.0, 0.0], "d": [4.0, 0.0],
+        }
@@ -0,0 +1,46 @@
+import pytest
+
+from core.document_store.manifest import IngestionManifest
+
+@pytest.fixture
+def manifest(tmp_path):
+    return IngestionManifest(str(tmp_path / "manifest.json"))
+
+class TestIngestionManifest:
+    def test_chunk_ids_are_stable(self):
+        """Test chunk IDs only depend on source and content."""
+        first = IngestionManifest.chunk_ids_for("a.pdf", ["one", "two"])
+        second = IngestionManifest.chunk_ids_for("a.pdf", ["zero", "one", "two"])
+        assert first == second[1:]
+
+    def test_duplicate_chunks_get_distinct_ids(self):
+        """Test repeated chunk text within a file gets separate IDs."""
+        pairs = IngestionManifest.chunk_ids_for("a.pdf", ["same", "same"])
+        assert pairs[0][0] != pairs[1][0]
+        assert pairs[0][1] == pairs[1][1]
+
+    def test_update_file_returns_diff(self, manifest):
+        """Test updating a file reports only added and removed chunks."""
+        old = IngestionManifest.chunk_ids_for("a.pdf", ["one", "two"])
+        new = IngestionManifest.chunk_ids_for("a.pdf", ["one", "three"])
+        manifest.update_file("a.pdf", "h1", old)
+        added, removed = manifest.update_file("a.pdf", "h2", new)
+        assert added == [new[1][0]]
+        assert removed == [old[1][0]]
+
+    def test_save_and_reload(self, manifest):
+        """Test manifest round-trips through disk and tracks unchanged files."""
+        manifest.update_file("a.pdf", "h1", IngestionManifest.chunk_ids_for("a.pdf", ["one"]))
+        manifest.save()
+        reloaded = IngestionManifest(manifest.path)
+        assert reloaded.is_unchanged("a.pdf", "h1")
+        assert not reloaded.is_unchanged("a.pdf", "h2")
+        assert reloaded.fingerprint == manifest.fingerprint
+
+    def test_remove_file_changes_fingerprint(self, manifest):
+        """Test removing a file returns its chunks and changes the fingerprint."""
+        chunks = IngestionManifest.chunk_ids_for("a.pdf", ["one", "two"])
+        manifest.update_file("a.pdf", "h1", chunks)
+        before = manifest.fingerprint
+        assert manifest.remove_file("a.pdf") == [chunk_id for chunk_id, _ in chunks]
+        assert manifest.fingerprint != before
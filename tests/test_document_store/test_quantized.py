@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from core.document_store.quantized import QuantizedIndex, quantize
+
+@pytest.fixture
+def vectors():
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(20, 64))
+    vectors = centers[rng.integers(0, 20, 2000)] + 0.8 * rng.normal(size=(2000, 64))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+def build(directory, vectors, **kwargs):
+    index = QuantizedIndex(str(directory), nprobe=4, rescore_factor=4, min_train=500, **kwargs)
+    ids = [str(i) for i in range(len(vectors))]
+    index.add(ids, vectors, [f"chunk {i}" for i in ids], [{"n": int(i)} for i in ids])
+    return index
+
+class TestQuantizedIndex:
+    def test_quantize_round_trip(self, vectors):
+        """Test int8 codes reconstruct vectors to within one quantization step."""
+        codes, scales = quantize(vectors)
+        assert np.abs(codes * scales[:, None] - vectors).max() <= scales.max() / 2 + 1e-6
+
+    def test_search_matches_exact(self, tmp_path, vectors):
+        """Test IVF search with float re-scoring finds the exact nearest neighbours."""
+        index = build(tmp_path, vectors)
+        assert index.trained
+        recall = 0
+        for query in vectors[:50]:
+            truth = set(np.argsort(-(vectors @ query))[:5])
+            hits = index.search(query, 5)
+            recall += len({row for row, _ in hits} & truth)
+            assert hits[0][1] == pytest.approx(1.0, abs=1e-5)
+        assert recall / 250 >= 0.95
+
+    def test_delete_compact_and_reopen(self, tmp_path, vectors):
+        """Test deleted vectors are never returned, even after compaction and reopening."""
+        index = build(tmp_path, vectors)
+        assert index.delete([str(i) for i in range(1500)]) == 1500
+        reopened = QuantizedIndex(str(tmp_path))
+        assert len(reopened) == 500
+        row, score = reopened.search(vectors[1700], 1)[0]
+        assert reopened.records([row])[row] == ("1700", "chunk 1700", {"n": 1700})
+        assert all(int(reopened.records([r])[r][0]) >= 1500 for r, _ in reopened.search(vectors[0], 10))
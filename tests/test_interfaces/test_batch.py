@@ -0,0 +1,72 @@
+import asyncio
+import json
+
+from swarm import Agent
+
+from core.agents.runner import AsyncSessionRunner, AsyncSwarm
+from core.models.fake import AsyncFakeOpenAIClient
+from core.sessions.store import InMemorySessionStore
+from interfaces.batch import BatchRunner, read_questions, read_results
+
+def write_questions(path, questions):
+    path.write_text("".join(json.dumps(question) + "\n" for question in questions))
+    return str(path)
+
+def batch_runner(client):
+    runner = AsyncSessionRunner(
+        Agent(name="Coordinator"),
+        swarm=AsyncSwarm(client=client),
+        store=InMemorySessionStore(max_sessions=10),
+    )
+    return BatchRunner(runner, concurrency=2)
+
+class TestBatchRunner:
+    def test_repeated_questions_run_once(self, tmp_path):
+        """Test questions differing only in case and spacing are merged."""
+        path = write_questions(tmp_path / "questions.jsonl", [
+            {"id": "a", "question": "How many albums are there?"},
+            {"id": "b", "question": "how many  albums are there?"},
+            "What is attention?",
+            42,
+            ["not", "a", "question"],
+        ])
+        items = read_questions(path)
+        assert [(item.id, item.duplicate_ids) for item in items] == [("a", ["b"]), ("3", [])]
+
+    def test_resumes_after_interrupted_run(self, tmp_path):
+        """Test finished questions are skipped and a half-written line is rerun."""
+        items = read_questions(write_questions(tmp_path / "questions.jsonl", [
+            {"id": str(i), "question": f"Question {i}?"} for i in range(4)
+        ]))
+        output = tmp_path / "results.jsonl"
+        first = json.dumps({"id": "0", "question": "Question 0?", "answer": "done"})
+        output.write_text(first + "\n" + '{"id": "1", "quest')
+        client = AsyncFakeOpenAIClient()
+
+        summary = asyncio.run(batch_runner(client).run(items, str(output)))
+
+        rows = [json.loads(line) for line in output.read_text().splitlines()]
+        assert summary["skipped"] == 1 and summary["completed"] == 3
+        assert sorted(row["id"] for row in rows) == ["0", "1", "2", "3"]
+        assert all("latency_ms" in row for row in rows[1:])
+        assert len(client.requests) == 3
+
+    def test_failed_questions_run_again(self, tmp_path):
+        """Test a resumed run retries failed questions and the success supersedes the failure."""
+        items = read_questions(write_questions(tmp_path / "questions.jsonl", [
+            {"id": "0", "question": "Question 0?"}, {"id": "1", "question": "Question 1?"},
+        ]))
+        output = tmp_path / "results.jsonl"
+        output.write_text(
+            json.dumps({"id": "0", "question": "Question 0?", "answer": "done"}) + "\n"
+            + json.dumps({"id": "1", "question": "Question 1?", "error": "timed out"}) + "\n"
+        )
+        client = AsyncFakeOpenAIClient()
+
+        summary = asyncio.run(batch_runner(client).run(items, str(output)))
+
+        assert summary["skipped"] == 1 and summary["completed"] == 1
+        assert len(client.requests) == 1
+        rows = read_results(str(output))
+        assert [row["id"] for row in rows] == ["0", "1"]
+        assert "error" not in rows[1] and "answer" in rows[1]
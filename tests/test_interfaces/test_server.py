@@ -0,0 +1,121 @@
+import asyncio
+import json
+
+import pytest
+from aiohttp import test_utils
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+from swarm import Agent
+
+from core.agents.runner import AsyncSessionRunner, AsyncSwarm
+from core.sessions.store import InMemorySessionStore
+from interfaces.server import SwarmService, create_app
+
+class StubCompletions:
+    """Answers every request by echoing the last message."""
+
+    async def create(self, model, messages, stream=False, **kwargs):
+        content = f"echo: {messages[-1]['content']} ({len(messages) - 1} messages)"
+        if not stream:
+            return ChatCompletion.model_validate({
+                "id": "stub", "created": 0, "model": model, "object": "chat.completion",
+                "choices": [{
+                    "index": 0, "finish_reason": "stop",
+                    "message": {"role": "assistant", "content": content},
+                }],
+            })
+
+        async def chunks():
+            for i, word in enumerate(content.split(" ")):
+                yield ChatCompletionChunk.model_validate({
+                    "id": "stub", "created": 0, "model": model, "object": "chat.completion.chunk",
+                    "choices": [{
+                        "index": 0, "finish_reason": None,
+                        "delta": {"role": "assistant", "content": word if i == 0 else f" {word}"},
+                    }],
+                })
+        return chunks()
+
+class StubClient:
+    def __init__(self):
+        self.chat = type("Chat", (), {"completions": StubCompletions()})()
+
+@pytest.fixture
+def service():
+    runner = AsyncSessionRunner(
+        Agent(name="Coordinator"),
+        swarm=AsyncSwarm(client=StubClient()),
+        store=InMemorySessionStore(max_sessions=10),
+    )
+    return SwarmService(runner)
+
+def run_with_client(service, scenario):
+    async def main():
+        async with test_utils.TestClient(test_utils.TestServer(create_app(service))) as client:
+            return await scenario(client)
+    return asyncio.run(main())
+
+class TestServerEndpoints:
+    def test_query_keeps_session_history(self, service):
+        """Test a session's history is reused on the next turn."""
+        async def scenario(client):
+            first = await (await client.post("/query", json={"query": "hi", "session_id": "s1"})).json()
+            second = await (await client.post("/query", json={"query": "again", "session_id": "s1"})).json()
+            return first, second
+
+        first, second = run_with_client(service, scenario)
+        assert first["answer"] == "echo: hi (1 messages)"
+        assert second["answer"] == "echo: again (3 messages)"
+        assert second["agent"] == "Coordinator"
+
+    def test_malformed_bodies_are_rejected(self, service):
+        """Test JSON bodies that are not objects with a string query get a 400."""
+        async def scenario(client):
+            bodies = [[], "hi", {"query": 5}, {"query": "hi", "session_id": ["s1"]}]
+            return [(await client.post("/query", json=body)).status for body in bodies]
+
+        assert run_with_client(service, scenario) == [400, 400, 400, 400]
+
+    def test_session_locks_are_released(self, service):
+        """Test per-session locks do not outlive the turns that use them."""
+        async def scenario(client):
+            await asyncio.gather(*(
+                client.post("/query", json={"query": "hi", "session_id": f"s{i}"}) for i in range(5)
+            ))
+
+        run_with_client(service, scenario)
+        assert len(service.runner._locks) == 0
+
+    def test_stream_yields_chunks_then_summary(self, service):
+        """Test the streaming endpoint emits deltas followed by the final answer."""
+        async def scenario(client):
+            response = await client.post("/query/stream", json={"query": "hi"})
+            return [json.loads(line) for line in (await response.text()).splitlines()]
+
+        lines = run_with_client(service, scenario)
+        assert lines[0] == {"delim": "start"}
+        assert "".join(line.get("content") or "" for line in lines[1:-2]) == "echo: hi (1 messages)"
+        assert lines[-1]["answer"] == "echo: hi (1 messages)"
+
+    def test_stats_report_latency_percentiles(self, service):
+        """Test request latencies are reported as percentiles."""
+        async def scenario(client):
+            await client.post("/query", json={"query": "hi"})
+            assert (await client.post("/query", json={})).status == 400
+            return await (await client.get("/stats")).json()
+
+        stats = run_with_client(service, scenario)
+        assert stats["requests"] == 1
+        assert set(stats["latency_ms"]) == {"p50", "p90", "p95", "p99"}
+
+    def test_metrics_endpoint_exports_stage_timings(self, service):
+        """Test stage timings are exported as Prometheus text and JSON."""
+        async def scenario(client):
+            answer = await (await client.post("/query", json={"query": "hi"})).json()
+            text = await (await client.get("/metrics")).text()
+            dump = await (await client.get("/metrics", params={"format": "json"})).json()
+            return answer, text, dump
+
+        answer, text, dump = run_with_client(service, scenario)
+        assert set(answer["stages_ms"]) == {"turn", "llm.completion"}
+        assert 'swarm_stage_seconds_count{stage="turn"}' in text
+        assert dump["stages"]["llm.completion"]["count"] >= 1
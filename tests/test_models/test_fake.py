@@ -0,0 +1,53 @@
+import asyncio
+
+import numpy as np
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+from swarm import Agent
+
+from core.agents.runner import AsyncSwarm
+from core.models.fake import AsyncFakeOpenAIClient, FakeChatModel, HashingEmbeddings
+
+class TestFakeModels:
+    def test_hashing_embeddings_are_deterministic(self):
+        """Test vectors are repeatable and similar texts score higher."""
+        embeddings = HashingEmbeddings(size=64)
+        query = np.array(embeddings.embed_query("total sales by country"))
+        related, unrelated = np.array(embeddings.embed_documents([
+            "sales by billing country", "positional encodings use sinusoids",
+        ]))
+
+        assert embeddings.embed_query("total sales by country") == query.tolist()
+        assert query @ related > query @ unrelated
+
+    def test_chat_model_writes_sql_for_sql_prompts(self):
+        """Test the fake model answers SQL prompts with scripted SQL."""
+        prompt = ChatPromptTemplate.from_messages([("system", "Table info: ..."), ("human", "{input}")])
+        chain = prompt | FakeChatModel() | StrOutputParser()
+        sql = chain.invoke({"input": "How many tracks are there per genre?\nSQLQuery: "})
+        assert sql.startswith("SELECT g.Name, COUNT(*)")
+
+    def test_swarm_follows_scripted_tool_calls(self):
+        """Test the fake client transfers, calls the tool and answers."""
+        calls = []
+
+        def generate_response(question: str) -> str:
+            calls.append(question)
+            return "Columns: Name\n[('AC/DC',)]"
+
+        sql_agent = Agent(name="SQL Agent", functions=[generate_response])
+
+        def transfer_to_sql() -> Agent:
+            return sql_agent
+
+        coordinator = Agent(name="Coordinator", functions=[transfer_to_sql])
+        client = AsyncFakeOpenAIClient()
+
+        response = asyncio.run(AsyncSwarm(client).run(
+            coordinator, [{"role": "user", "content": "Which artists have albums?"}]
+        ))
+
+        assert calls == ["Which artists have albums?"]
+        assert response.agent.name == "SQL Agent"
+        assert "AC/DC" in response.messages[-1]["content"]
+        assert len(client.requests) == 3
@@ -0,0 +1,20 @@
+from core.models import LazyEmbeddings
+from core.models.fake import HashingEmbeddings
+
+class TestLazyEmbeddings:
+    def test_model_is_built_once_on_first_use(self):
+        """Test the wrapped model is only built when first needed."""
+        built = []
+
+        def factory():
+            built.append(True)
+            return HashingEmbeddings(size=16)
+
+        embeddings = LazyEmbeddings(factory, "hashing-16")
+        assert not embeddings.loaded and built == []
+
+        vector = embeddings.embed_query("total sales")
+        embeddings.embed_documents(["total sales", "albums"])
+
+        assert built == [True]
+        assert vector == HashingEmbeddings(size=16).embed_query("total sales")
@@ -0,0 +1,57 @@
+import threading
+
+from core.sessions.memory import ConversationMemory
+
+def tool_turn(memory, question, rows):
+    """Run one turn that calls the SQL tool and answers."""
+    memory.begin_turn(question)
+    memory.end_turn([
+        {"role": "assistant", "sender": "SQL Agent", "content": None, "tool_calls": [
+            {"id": "call", "type": "function",
+             "function": {"name": "generate_response", "arguments": "{}"}},
+        ]},
+        {"role": "tool", "tool_call_id": "call", "tool_name": "generate_response",
+         "content": "Results:\n" + "\n".join(f"('row {i}', {i})" for i in range(rows))},
+        {"role": "assistant", "sender": "SQL Agent", "content": f"There are {rows} rows."},
+    ])
+
+class TestConversationMemory:
+    def test_old_tool_results_become_references(self):
+        """Test tool results of older turns are replaced by reference stubs."""
+        memory = ConversationMemory(max_tokens=100000, full_turns=1, summarize=False)
+        tool_turn(memory, "first", 50)
+        tool_turn(memory, "second", 50)
+        memory.begin_turn("third")
+
+        tool_messages = [m for m in memory.messages if m["role"] == "tool"]
+        assert tool_messages[0]["content"].startswith("[ref:sql-1]")
+        assert memory.reference("sql-1").startswith("Results:")
+        assert not tool_messages[1]["content"].startswith("[ref:")
+
+    def test_prompt_tokens_stay_within_budget(self):
+        """Test prompt size stays flat over a long session."""
+        memory = ConversationMemory(max_tokens=800, full_turns=1, summarize=False)
+        for i in range(30):
+            tool_turn(memory, f"question {i}", 40)
+
+        assert max(memory.prompt_token_counts) <= 800
+        assert "question 0" not in str(memory.messages)
+        assert "question 29" in str(memory.messages)
+        assert "User asked" in memory.summary
+
+    def test_summary_is_condensed_in_background(self):
+        """Test evicted turns are summarized by the summarizer off the request path."""
+        done = threading.Event()
+
+        def summarizer(notes):
+            done.set()
+            return "condensed"
+
+        memory = ConversationMemory(max_tokens=400, full_turns=0, summarizer=summarizer)
+        for i in range(15):
+            tool_turn(memory, f"question {i}", 40)
+        assert done.wait(timeout=5)
+        memory._pending.result()
+
+        assert memory.messages[0]["role"] == "system"
+        assert memory.summary.startswith("condensed")
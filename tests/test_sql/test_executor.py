@@ -0,0 +1,72 @@
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from core.sql.executor import SQLExecutor, apply_row_limit
+
+@pytest.fixture
+def executor(tmp_path):
+    path = str(tmp_path / "test.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE Artist (ArtistId INTEGER PRIMARY KEY, Name TEXT)")
+    conn.executemany("INSERT INTO Artist (Name) VALUES (?)", [(f"Artist {i}",) for i in range(100)])
+    conn.commit()
+    conn.close()
+    return SQLExecutor(path, pool_size=2, timeout=0.2, max_rows=10, max_bytes=10000)
+
+class TestSQLExecutor:
+    def test_apply_row_limit(self):
+        """Test a LIMIT is added only to SELECTs without a top-level one."""
+        assert apply_row_limit("SELECT * FROM Artist;", 10) == "SELECT * FROM Artist LIMIT 11"
+        assert apply_row_limit("SELECT * FROM Artist LIMIT 5", 10) == "SELECT * FROM Artist LIMIT 5"
+        assert apply_row_limit(
+            "SELECT * FROM (SELECT * FROM Artist LIMIT 50)", 10
+        ) == "SELECT * FROM (SELECT * FROM Artist LIMIT 50) LIMIT 11"
+        assert apply_row_limit("SELECT 'no limit here'", 10) == "SELECT 'no limit here' LIMIT 11"
+
+    def test_results_are_capped(self, executor):
+        """Test large results are truncated and flagged."""
+        result = executor.execute("SELECT Name FROM Artist")
+        assert len(result.rows) == 10
+        assert result.truncated == "row limit of 10 reached"
+        assert len(list(executor.stream("SELECT Name FROM Artist"))) == 10
+
+    def test_writes_are_rejected(self, executor):
+        """Test connections cannot modify the database."""
+        assert executor.run("DELETE FROM Artist").startswith("Error:")
+        assert executor.execute("SELECT COUNT(*) FROM Artist").rows == [(100,)]
+
+    def test_slow_query_is_interrupted(self, executor):
+        """Test a runaway query is stopped at the time budget."""
+        result = executor.run("SELECT COUNT(*) FROM Artist a, Artist b, Artist c, Artist d")
+        assert result == "Error: query exceeded the 0.2s time budget"
+
+    def test_failed_connects_free_their_slot(self, executor, monkeypatch):
+        """Test failed connects do not use up pool slots and the source gets no WAL files."""
+        def unavailable():
+            raise sqlite3.OperationalError("unable to open database file")
+
+        connect = executor.pool._connect
+        monkeypatch.setattr(executor.pool, "_connect", unavailable)
+        for _ in range(3):
+            assert executor.run("SELECT 1") == "Error: unable to open database file"
+        monkeypatch.setattr(executor.pool, "_connect", connect)
+        assert executor.execute("SELECT COUNT(*) FROM Artist").rows == [(100,)]
+        assert not any(path.name.endswith(("-wal", "-shm")) for path in Path(executor.database_path).parent.iterdir())
+
+    def test_closed_pool_closes_returned_connections(self, executor):
+        """Test connections in use when the pool closes are closed on return and waiters fail fast."""
+        pool = executor.pool
+        with pool.connection() as first, pool.connection() as second:
+            with ThreadPoolExecutor(max_workers=1) as threads:
+                waiter = threads.submit(executor.run, "SELECT 1")
+                time.sleep(0.05)
+                pool.close()
+                assert waiter.result(timeout=1) == "Error: Connection pool is closed"
+        for conn in (first, second):
+            with pytest.raises(sqlite3.ProgrammingError):
+                conn.execute("SELECT 1")
+        assert executor.run("SELECT 1") == "Error: Connection pool is closed"
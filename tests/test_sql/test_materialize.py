@@ -0,0 +1,102 @@
+import sqlite3
+
+import pytest
+
+from core.sql.materialize import AggregateMaterializer, parse_aggregate_query
+
+BY_COUNTRY = (
+    "SELECT c.Country, SUM(i.Total) AS Sales, AVG(i.Total), COUNT(*) FROM Invoice i "
+    "JOIN Customer c ON c.CustomerId = i.CustomerId GROUP BY c.Country HAVING COUNT(*) > 1 "
+    "ORDER BY Sales DESC;"
+)
+
+@pytest.fixture
+def database(tmp_path):
+    path = str(tmp_path / "test.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE Customer (CustomerId INTEGER PRIMARY KEY, Country TEXT)")
+    conn.execute("CREATE TABLE Invoice (InvoiceId INTEGER PRIMARY KEY, CustomerId INTEGER, Total REAL)")
+    conn.executemany("INSERT INTO Customer (Country) VALUES (?)", [(f"C{i % 5}",) for i in range(50)])
+    conn.executemany(
+        "INSERT INTO Invoice (CustomerId, Total) VALUES (?, ?)",
+        [(i % 50 + 1, i % 7 + 0.5) for i in range(1000)],
+    )
+    conn.commit()
+    conn.close()
+    return path
+
+def rows(path, sql):
+    conn = sqlite3.connect(path)
+    try:
+        return sorted(
+            tuple(round(value, 6) if isinstance(value, float) else value for value in row)
+            for row in conn.execute(sql)
+        )
+    finally:
+        conn.close()
+
+class TestAggregateMaterializer:
+    def test_parse_shapes(self):
+        """Test queries differing only in ORDER BY and LIMIT share a shape and others are rejected."""
+        ranked = parse_aggregate_query(
+            "SELECT BillingCountry, SUM(Total) FROM Invoice GROUP BY BillingCountry ORDER BY 2 DESC LIMIT 5"
+        )
+        plain = parse_aggregate_query("select BillingCountry, sum(Total) from Invoice group by 1")
+        assert ranked.key == plain.key
+        assert parse_aggregate_query("SELECT Name FROM Artist LIMIT 5") is None
+        assert parse_aggregate_query("SELECT Country, COUNT(DISTINCT CustomerId) FROM Customer GROUP BY Country") is None
+        assert parse_aggregate_query("SELECT Country, COUNT(*) FROM Customer WHERE Country = :p0 GROUP BY Country") is None
+
+    def test_rewrite_after_repeated_queries(self, database, tmp_path):
+        """Test a frequent shape is rewritten to its summary table with identical results."""
+        materializer = AggregateMaterializer(database, str(tmp_path / "aggregates.db"), min_hits=2)
+        assert not materializer.record(BY_COUNTRY)
+        assert materializer.rewrite(BY_COUNTRY) is None
+        assert materializer.record(BY_COUNTRY)
+
+        rewritten = materializer.rewrite(BY_COUNTRY)
+        assert "mv_" in rewritten and "Invoice" not in rewritten
+        assert rows(str(tmp_path / "aggregates.db"), rewritten) == rows(database, BY_COUNTRY)
+
+    def test_no_rewrite_for_columns_outside_summary(self, database, tmp_path):
+        """Test a query of a ready shape selecting a column that is not a group key is not rewritten."""
+        by_customer = (
+            "SELECT c.CustomerId, SUM(i.Total) FROM Invoice i JOIN Customer c ON c.CustomerId = i.CustomerId "
+            "GROUP BY c.CustomerId"
+        )
+        with_name = by_customer.replace("SELECT c.CustomerId,", "SELECT c.FirstName,")
+        materializer = AggregateMaterializer(database, str(tmp_path / "aggregates.db"), min_hits=1)
+        assert materializer.record(by_customer)
+        assert parse_aggregate_query(with_name).key == parse_aggregate_query(by_customer).key
+        assert materializer.rewrite(by_customer)
+        assert materializer.rewrite(with_name) is None
+
+    def test_refresh_after_source_changes(self, database, tmp_path):
+        """Test appended rows are merged in and deleted or edited rows, even alongside appends, trigger a rebuild."""
+        materializer = AggregateMaterializer(database, str(tmp_path / "aggregates.db"), min_hits=1)
+        materializer.record(BY_COUNTRY)
+        conn = sqlite3.connect(database)
+        conn.execute("INSERT INTO Customer (Country) VALUES ('C9')")
+        conn.executemany("INSERT INTO Invoice (CustomerId, Total) VALUES (?, ?)", [(51, 100.0), (51, 1.0), (1, 3.0)])
+        conn.commit()
+
+        rewritten = materializer.rewrite(BY_COUNTRY)
+        assert rows(str(tmp_path / "aggregates.db"), rewritten) == rows(database, BY_COUNTRY)
+
+        conn.execute("DELETE FROM Invoice WHERE CustomerId = 2")
+        conn.commit()
+        rewritten = materializer.rewrite(BY_COUNTRY)
+        assert rows(str(tmp_path / "aggregates.db"), rewritten) == rows(database, BY_COUNTRY)
+
+        conn.execute("UPDATE Invoice SET Total = Total * 2 WHERE CustomerId = 3")
+        conn.commit()
+        rewritten = materializer.rewrite(BY_COUNTRY)
+        assert rows(str(tmp_path / "aggregates.db"), rewritten) == rows(database, BY_COUNTRY)
+
+        # An edit hidden among appended rows must not be merged over.
+        conn.execute("UPDATE Customer SET Country = 'C8' WHERE CustomerId = 4")
+        conn.execute("INSERT INTO Invoice (CustomerId, Total) VALUES (5, 7.0)")
+        conn.commit()
+        conn.close()
+        rewritten = materializer.rewrite(BY_COUNTRY)
+        assert rows(str(tmp_path / "aggregates.db"), rewritten) == rows(database, BY_COUNTRY)
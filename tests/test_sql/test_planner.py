@@ -0,0 +1,73 @@
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from core.sql.planner import IndexAdvisor, QueryPlanner
+
+@pytest.fixture
+def database(tmp_path):
+    path = str(tmp_path / "test.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE Customer (CustomerId INTEGER PRIMARY KEY, Country TEXT)")
+    conn.execute(
+        "CREATE TABLE Invoice (InvoiceId INTEGER PRIMARY KEY, CustomerId INTEGER, "
+        "BillingCountry TEXT, Total REAL)"
+    )
+    conn.executemany("INSERT INTO Customer (Country) VALUES (?)", [(f"C{i % 5}",) for i in range(50)])
+    conn.executemany(
+        "INSERT INTO Invoice (CustomerId, BillingCountry, Total) VALUES (?, ?, ?)",
+        [(i % 50 + 1, f"C{i % 5}", i * 0.5) for i in range(1000)],
+    )
+    conn.commit()
+    conn.close()
+    return path
+
+class TestQueryPlanner:
+    def test_cost_reflects_plan_shape(self, database):
+        """Test cartesian products cost far more than primary key joins."""
+        planner = QueryPlanner(database)
+        joined = planner.explain(
+            "SELECT c.Country, SUM(i.Total) FROM Invoice i "
+            "JOIN Customer c ON c.CustomerId = i.CustomerId GROUP BY c.Country"
+        )
+        cartesian = planner.explain("SELECT COUNT(*) FROM Invoice a, Invoice b")
+
+        assert joined.full_scans == ["Invoice"]
+        assert joined.cost < 10 * 1000
+        assert cartesian.cost == 1000 * 1000
+
+    def test_advisor_recommends_covering_index(self, database, tmp_path):
+        """Test repeated full scans produce a covering index recommendation."""
+        planner = QueryPlanner(database)
+        advisor = IndexAdvisor(database, str(tmp_path / "copy.db"), min_scans=2)
+        sql = "SELECT SUM(Total) FROM Invoice WHERE BillingCountry = 'C1'"
+
+        assert advisor.record(planner.explain(sql), sql, planner.columns) is False
+        assert advisor.record(planner.explain(sql), sql, planner.columns) is True
+        [recommendation] = advisor.recommendations()
+        assert recommendation.table == "Invoice"
+        assert recommendation.columns == ("BillingCountry", "Total")
+
+    def test_indexes_go_into_local_copy(self, database, tmp_path):
+        """Test applied indexes change the plan of the copy but not the source."""
+        planner = QueryPlanner(database)
+        advisor = IndexAdvisor(database, str(tmp_path / "copy.db"), min_scans=1)
+        sql = "SELECT SUM(Total) FROM Invoice WHERE BillingCountry = 'C1'"
+        advisor.record(planner.explain(sql), sql, planner.columns)
+
+        assert advisor.apply() == ["advisor_invoice_billingcountry_total"]
+        assert advisor.active_path == advisor.copy_path
+        assert QueryPlanner(advisor.copy_path).explain(sql).full_scans == []
+        assert planner.explain(sql).full_scans == ["Invoice"]
+
+    def test_concurrent_applies_build_copy_once(self, database, tmp_path):
+        """Test overlapping applies write the copy one at a time and create each index once."""
+        planner = QueryPlanner(database)
+        advisor = IndexAdvisor(database, str(tmp_path / "copy.db"), min_scans=1)
+        sql = "SELECT SUM(Total) FROM Invoice WHERE BillingCountry = 'C1'"
+        advisor.record(planner.explain(sql), sql, planner.columns)
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            results = list(pool.map(lambda _: advisor.apply(), range(4)))
+        assert sorted(results) == [[], [], [], ["advisor_invoice_billingcountry_total"]]
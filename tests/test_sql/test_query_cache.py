@@ -0,0 +1,53 @@
+import pytest
+
+from core.sql.query_cache import SQLQueryCache, extract_literals, parameterize_sql
+
+ALBUMS_SQL = (
+    "SELECT Album.Title FROM Album JOIN Artist ON Album.ArtistId = Artist.ArtistId "
+    "WHERE Artist.Name = 'AC/DC' LIMIT 5;"
+)
+
+@pytest.fixture
+def cache(tmp_path):
+    return SQLQueryCache(str(tmp_path / "sql_cache.db"))
+
+class TestLiterals:
+    def test_extract_literals_in_question_order(self):
+        """Test literals are returned in the order they appear."""
+        question = "How many tracks by Led Zeppelin in 'Rock' since 2009?"
+        assert extract_literals(question) == ["Led Zeppelin", "Rock", "2009"]
+
+    def test_parameterize_sql_binds_found_literals(self):
+        """Test only literals present in the SQL become parameters."""
+        sql = "SELECT * FROM Customer WHERE Country LIKE '%Brazil%' LIMIT 10;"
+        rewritten, bound = parameterize_sql(sql, ["10", "Brazil", "Chinook"])
+        assert rewritten == "SELECT * FROM Customer WHERE Country LIKE '%' || :p1 || '%' LIMIT :p0;"
+        assert bound == ["10", "Brazil"]
+
+class TestSQLQueryCache:
+    def test_exact_question_hit(self, cache):
+        """Test the same question, modulo case and punctuation, hits the cache."""
+        cache.store("Top albums by AC/DC?", ALBUMS_SQL, schema_version=1)
+        cached = cache.lookup("top albums by AC/DC", schema_version=1)
+        assert cached.sql == ALBUMS_SQL
+        assert cached.source == "exact"
+
+    def test_template_hit_binds_new_value(self, cache):
+        """Test a question of the same shape reuses the parameterized SQL."""
+        cache.store("Top albums by AC/DC", ALBUMS_SQL, schema_version=1)
+        cached = cache.lookup("Top albums by Queen", schema_version=1)
+        assert cached.source == "template"
+        assert ":p0" in cached.sql
+        assert cached.parameters == {"p0": "Queen"}
+
+    def test_schema_change_invalidates(self, cache):
+        """Test entries from an older schema version are discarded."""
+        cache.store("Top albums by AC/DC", ALBUMS_SQL, schema_version=1)
+        assert cache.lookup("Top albums by AC/DC", schema_version=2) is None
+        assert cache.lookup("Top albums by AC/DC", schema_version=1) is None
+
+    def test_entries_persist(self, cache):
+        """Test cached SQL survives reopening the cache file."""
+        cache.store("Top albums by AC/DC", ALBUMS_SQL, schema_version=1)
+        reopened = SQLQueryCache(cache.path)
+        assert reopened.lookup("Top albums by Queen", schema_version=1).parameters == {"p0": "Queen"}
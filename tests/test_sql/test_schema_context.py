@@ -0,0 +1,52 @@
+import sqlite3
+
+import pytest
+
+from core.sql.schema_context import SchemaSelector, split_identifier
+
+@pytest.fixture
+def database(tmp_path):
+    path = str(tmp_path / "test.db")
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE Artist (ArtistId INTEGER PRIMARY KEY, Name TEXT);
+        CREATE TABLE Album (AlbumId INTEGER PRIMARY KEY, Title TEXT,
+            ArtistId INTEGER REFERENCES Artist (ArtistId));
+        CREATE TABLE Track (TrackId INTEGER PRIMARY KEY, Name TEXT, Composer TEXT,
+            AlbumId INTEGER REFERENCES Album (AlbumId));
+        CREATE TABLE Employee (EmployeeId INTEGER PRIMARY KEY, FirstName TEXT, HireDate TEXT);
+    """)
+    conn.commit()
+    conn.close()
+    return path
+
+class TestSchemaSelector:
+    def test_split_identifier(self):
+        """Test identifiers are split into lowercase words."""
+        assert split_identifier("BillingCountry") == ["billing", "country"]
+        assert split_identifier("invoice_line_id") == ["invoice", "line", "id"]
+
+    def test_selects_relevant_tables_and_join_path(self, database):
+        """Test only matching tables are kept, plus the table joining them."""
+        context = SchemaSelector(database, max_tables=2).context("Which tracks has each artist recorded?")
+        lines = context.splitlines()
+
+        assert [line.split("(")[0] for line in lines] == ["Artist", "Track", "Album"]
+        assert "ArtistId INTEGER -> Artist.ArtistId" in context
+        assert "Employee" not in context
+
+    def test_context_is_cached_until_schema_changes(self, database):
+        """Test repeated questions hit the cache and schema changes invalidate it."""
+        selector = SchemaSelector(database)
+        question = "List employees by hire date"
+        first = selector.context(question)
+        assert selector.context(question) == first
+        assert selector.hits == 1
+
+        conn = sqlite3.connect(database)
+        conn.execute("ALTER TABLE Employee ADD COLUMN Title TEXT")
+        conn.commit()
+        conn.close()
+
+        assert "Title" in selector.context(question)
+        assert selector.misses == 2
@@ -0,0 +1,50 @@
+import asyncio
+
+from utils.concurrency import run_in_thread
+from utils.metrics import Metrics
+
+class TestMetrics:
+    def test_spans_export_as_prometheus_histograms(self):
+        """Test stage timings and tokens appear in the Prometheus text."""
+        metrics = Metrics(enabled=True, buckets=(0.01, 0.1))
+        metrics.observe("sql.execute", 0.005)
+        metrics.observe("sql.execute", 0.05)
+        metrics.add_tokens("sql.generate", "prompt", 120)
+        metrics.increment("handoffs", source="Coordinator", target="SQL Agent")
+
+        text = metrics.to_prometheus()
+        assert 'swarm_stage_seconds_bucket{stage="sql.execute",le="0.01"} 1' in text
+        assert 'swarm_stage_seconds_bucket{stage="sql.execute",le="+Inf"} 2' in text
+        assert 'swarm_stage_seconds_count{stage="sql.execute"} 2' in text
+        assert 'swarm_tokens_total{stage="sql.generate",kind="prompt"} 120' in text
+        assert 'swarm_handoffs_total{source="Coordinator",target="SQL Agent"} 1' in text
+        assert metrics.snapshot()["stages"]["sql.execute"]["count"] == 2
+
+    def test_disabled_metrics_record_nothing(self):
+        """Test spans are no-ops when metrics are disabled."""
+        metrics = Metrics(enabled=False)
+        with metrics.span("rag.retrieve") as span:
+            span.tokens("prompt", "some text")
+        assert metrics.span("rag.retrieve") is metrics.span("sql.execute")
+        assert metrics.snapshot()["stages"] == {}
+
+    def test_collect_separates_concurrent_requests(self):
+        """Test each request collects only its own stages, including threaded work."""
+        metrics = Metrics(enabled=True)
+
+        def work(stage):
+            with metrics.span(stage):
+                pass
+
+        async def request(stage):
+            with metrics.collect() as stages:
+                await run_in_thread(work, stage)
+                await asyncio.sleep(0)
+            return stages
+
+        async def main():
+            return await asyncio.gather(request("sql.execute"), request("rag.retrieve"))
+
+        first, second = asyncio.run(main())
+        assert list(first) == ["sql.execute"]
+        assert list(second) == ["rag.retrieve"]
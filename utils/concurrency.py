@@ -0,0 +1,66 @@
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import Executor
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+
+from utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=_loop.run_forever, name="swarmdb-event-loop", daemon=True
+            ).start()
+        return _loop
+
+def run_sync(coro: Awaitable[T]) -> T:
+    """Run a coroutine to completion from synchronous code.
+
+    Coroutines run on a single long-lived background event loop, so async
+    clients (e.g. the OpenAI HTTP pool) are always used from the same loop.
+    """
+    loop = _background_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        raise RuntimeError("run_sync cannot be called from the background event loop")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+async def run_in_thread(
+    func: Callable[..., T], *args: Any, executor: Optional[Executor] = None, **kwargs: Any
+) -> T:
+    """Run a blocking function in a thread pool without blocking the event loop.
+
+    The caller's context variables are visible to the function, as with
+    ``asyncio.to_thread``.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        executor, functools.partial(context.run, func, *args, **kwargs)
+    )
+
+def start_background(func: Callable[[], Any], name: str) -> threading.Thread:
+    """Run ``func`` in a daemon thread, logging rather than raising its errors."""
+    def target() -> None:
+        try:
+            func()
+        except Exception as e:
+            logger.error(f"Background task {name} failed: {str(e)}")
+
+    thread = threading.Thread(target=target, name=name, daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,63 @@
+import threading
+from typing import Any, Callable, List
+
+from utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+Listener = Callable[[str, dict], Any]
+
+class EventBus:
+    """Minimal publish/subscribe hub for progress events from handlers.
+
+    Handlers check ``active`` before doing extra work (such as streaming a
+    chain instead of invoking it), so publishing costs nothing when nobody
+    is listening.
+    """
+
+    def __init__(self):
+        self._listeners: List[Listener] = []
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> bool:
+        return bool(self._listeners)
+
+    def subscribe(self, listener: Listener) -> Callable[[], None]:
+        """Register a listener and return a function that removes it."""
+        with self._lock:
+            self._listeners = self._listeners + [listener]
+
+        def unsubscribe() -> None:
+            with self._lock:
+                self._listeners = [l for l in self._listeners if l is not listener]
+
+        return unsubscribe
+
+    def emit(self, name: str, **payload: Any) -> None:
+        for listener in self._listeners:
+            try:
+                listener(name, payload)
+            except Exception as e:
+                logger.error(f"Error in event listener for {name}: {str(e)}")
+
+# Create a global event bus instance
+events = EventBus()
+
+async def ainvoke_streaming(runnable: Any, inputs: Any, source: str) -> Any:
+    """Invoke a LangChain runnable, publishing its LLM tokens as ``token`` events.
+
+    Falls back to a plain ``ainvoke`` when nobody is listening.
+    """
+    if not events.active:
+        return await runnable.ainvoke(inputs)
+
+    output = None
+    async for event in runnable.astream_events(inputs, version="v2"):
+        if event["event"] == "on_chat_model_stream":
+            text = event["data"]["chunk"].content
+            if text:
+                events.emit("token", source=source, text=text)
+        elif event["event"] == "on_chain_end" and not event.get("parent_ids"):
+            output = event["data"]["output"]
+    return output
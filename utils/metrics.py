@@ -0,0 +1,222 @@
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, TypeVar
+import threading
+import time
+
+from config.settings import settings
+from utils.tokens import count_tokens
+
+T = TypeVar("T")
+
+# Upper bounds in seconds, from cache hits to slow completions.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Stage durations of the request being handled, if it is being collected.
+_request_stages: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_stages", default=None)
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus layout."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        total, rows = 0, []
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            rows.append(("+Inf" if bound == float("inf") else f"{bound:g}", total))
+        return rows
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile as the upper bound of the bucket containing it."""
+        target, total = q * self.count, 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            if total >= target:
+                return bound
+        return self.buckets[-1]
+
+class Span:
+    """Times one stage; use as a context manager."""
+
+    __slots__ = ("metrics", "stage", "start")
+
+    def __init__(self, metrics: "Metrics", stage: str):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self) -> "Span":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.metrics.observe(self.stage, time.perf_counter() - self.start)
+
+    def tokens(self, kind: str, text: str) -> None:
+        """Count the tokens of ``text`` as ``prompt`` or ``completion`` tokens of this stage."""
+        self.metrics.add_tokens(self.stage, kind, count_tokens(text))
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+    def tokens(self, kind: str, text: str) -> None:
+        pass
+
+_NOOP_SPAN = _NoopSpan()
+
+class Metrics:
+    """Process-wide stage timings, token counts and counters.
+
+    ``span(stage)`` times a block into a per-stage histogram. Stage names
+    are dotted, e.g. ``sql.generate`` or ``rag.retrieve``. When disabled,
+    ``span`` returns a shared no-op object and nothing is recorded.
+    """
+
+    def __init__(self, enabled: Optional[bool] = None, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.enabled = settings.metrics_enabled if enabled is None else enabled
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stages: Dict[str, Histogram] = {}
+            self._tokens: Dict[Tuple[str, str], int] = defaultdict(int)
+            self._counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = defaultdict(float)
+
+    def span(self, stage: str):
+        if not self.enabled:
+            return _NOOP_SPAN
+        return Span(self, stage)
+
+    def timed_iter(self, stage: str, iterable: Iterable[T]) -> Iterable[T]:
+        """Iterate over ``iterable``, timing how long each item takes to produce."""
+        if not self.enabled:
+            return iterable
+        return self._timed_iter(stage, iter(iterable))
+
+    def _timed_iter(self, stage: str, iterator: Iterator[T]) -> Iterator[T]:
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            self.observe(stage, time.perf_counter() - start)
+            yield item
+
+    def observe(self, stage: str, seconds: float) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self._stages.get(stage)
+            if histogram is None:
+                histogram = self._stages[stage] = Histogram(self.buckets)
+            histogram.observe(seconds)
+        stages = _request_stages.get()
+        if stages is not None:
+            stages[stage] = stages.get(stage, 0.0) + seconds * 1000
+
+    def add_tokens(self, stage: str, kind: str, count: int) -> None:
+        """Count ``prompt`` or ``completion`` tokens spent in a stage."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._tokens[(stage, kind)] += count
+
+    def increment(self, name: str, value: float = 1.0, **labels: str) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[(name, tuple(sorted(labels.items())))] += value
+
+    @contextmanager
+    def collect(self) -> Iterator[Dict[str, float]]:
+        """Collect milliseconds per stage for the code run inside the block.
+
+        Context is copied into tasks and ``run_in_thread`` calls, so stages
+        of concurrent requests stay separate.
+        """
+        stages: Dict[str, float] = {}
+        token = _request_stages.set(stages)
+        try:
+            yield stages
+        finally:
+            _request_stages.reset(token)
+
+    def snapshot(self) -> Dict:
+        """JSON-serializable dump of every metric."""
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "stages": {
+                    stage: {
+                        "count": histogram.count,
+                        "sum_ms": histogram.sum * 1000,
+                        "mean_ms": histogram.sum / histogram.count * 1000,
+                        "p50_ms": histogram.quantile(0.5) * 1000,
+                        "p95_ms": histogram.quantile(0.95) * 1000,
+                        "buckets": dict(histogram.cumulative()),
+                    }
+                    for stage, histogram in sorted(self._stages.items())
+                },
+                "tokens": [
+                    {"stage": stage, "kind": kind, "count": count}
+                    for (stage, kind), count in sorted(self._tokens.items())
+                ],
+                "counters": [
+                    {"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in sorted(self._counters.items())
+                ],
+            }
+
+    def to_prometheus(self, prefix: str = "swarm") -> str:
+        """Render metrics in the Prometheus text exposition format."""
+        def label_text(labels: Dict[str, str]) -> str:
+            return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+        lines = []
+        with self._lock:
+            name = f"{prefix}_stage_seconds"
+            lines += [f"# HELP {name} Time spent per processing stage.", f"# TYPE {name} histogram"]
+            for stage, histogram in sorted(self._stages.items()):
+                for bound, count in histogram.cumulative():
+                    lines.append(f"{name}_bucket{label_text({'stage': stage, 'le': bound})} {count}")
+                lines.append(f"{name}_sum{label_text({'stage': stage})} {histogram.sum:.6f}")
+                lines.append(f"{name}_count{label_text({'stage': stage})} {histogram.count}")
+
+            name = f"{prefix}_tokens_total"
+            lines += [f"# HELP {name} Tokens sent to or received from models.", f"# TYPE {name} counter"]
+            for (stage, kind), count in sorted(self._tokens.items()):
+                lines.append(f"{name}{label_text({'stage': stage, 'kind': kind})} {count}")
+
+            counters: Dict[str, List[str]] = defaultdict(list)
+            for (counter, labels), value in sorted(self._counters.items()):
+                counters[counter].append(f"{prefix}_{counter}_total{label_text(dict(labels))} {value:g}")
+            for counter, rows in counters.items():
+                lines.append(f"# TYPE {prefix}_{counter}_total counter")
+                lines += rows
+        return "\n".join(lines) + "\n"
+
+# Process-wide metrics shared by all agents and handlers.
+metrics = Metrics()
@@ -0,0 +1,41 @@
+import json
+from functools import lru_cache
+from typing import List, Optional
+
+from config.settings import settings
+from utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Overhead the chat format adds per message (role, separators).
+TOKENS_PER_MESSAGE = 4
+
+@lru_cache(maxsize=None)
+def _encoding(model_name: str):
+    try:
+        import tiktoken
+        try:
+            return tiktoken.encoding_for_model(model_name)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.warning(f"Tokenizer unavailable, estimating token counts: {str(e)}")
+        return None
+
+def count_tokens(text: str, model_name: Optional[str] = None) -> int:
+    """Count tokens with tiktoken, or estimate (~4 characters per token) if it is unavailable."""
+    if not text:
+        return 0
+    encoding = _encoding(model_name or settings.model_name)
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+def count_message_tokens(messages: List[dict], model_name: Optional[str] = None) -> int:
+    """Count the prompt tokens of chat messages, including tool calls."""
+    total = 0
+    for message in messages:
+        total += TOKENS_PER_MESSAGE + count_tokens(message.get("content") or "", model_name)
+        if message.get("tool_calls"):
+            total += count_tokens(json.dumps(message["tool_calls"]), model_name)
+    return total